@@ -3,9 +3,24 @@ config.component_('Tier0Feeder')
 config.Tier0Feeder.namespace = "T0Component.Tier0Feeder.Tier0Feeder"
 config.Tier0Feeder.componentDir = config.General.workDir + "/Tier0Feeder"
 config.Tier0Feeder.pollInterval = 30
+config.Tier0Feeder.adaptivePolling = True
+config.Tier0Feeder.minPollInterval = 1
+config.Tier0Feeder.maxPollInterval = 300
+config.Tier0Feeder.maxBusyCycles = 10
 config.Tier0Feeder.tier0ConfigFile = "TIER0_CONFIG_FILE"
 config.Tier0Feeder.specDirectory = "TIER0_SPEC_DIR"
 config.Tier0Feeder.requestDBName = "t0_request_local"
+config.Tier0Feeder.metricsHistory = 100
+config.Tier0Feeder.hltConfigCacheSize = 100
+config.Tier0Feeder.hltConfigCacheDir = config.Tier0Feeder.componentDir + "/HLTConfigCache"
+config.Tier0Feeder.workloadTemplateCacheSize = 0
+config.Tier0Feeder.specBuilderProcesses = 0
+config.Tier0Feeder.recoReleaseMaxRuns = 10
+config.Tier0Feeder.loopIntervals = { 'RunConfig' : 300,
+                                     'T0DataSvc' : 600,
+                                     'Monitoring' : 300,
+                                     'SMNotification' : 300,
+                                     'ConditionUpload' : 300 }
 
 config.JobSubmitter.LsfPluginQueue = "cmsrepack"
 config.JobSubmitter.LsfPluginResourceReq = "select[type==SLC5_64] rusage[pool=10000,mem=1800]"
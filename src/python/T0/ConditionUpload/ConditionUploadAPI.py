@@ -15,7 +15,7 @@ import subprocess
 
 from T0.ConditionUpload import upload
 
-from WMCore.DAOFactory import DAOFactory
+from T0.WMBS.DAORegistry import getDAOFactory
 
 
 def uploadConditions(username, password, serviceProxy):
@@ -41,9 +41,9 @@ def uploadConditions(username, password, serviceProxy):
     logging.debug("uploadConditions()")
     myThread = threading.currentThread()
 
-    daoFactory = DAOFactory(package = "T0.WMBS",
-                            logger = logging,
-                            dbinterface = myThread.dbi)
+    daoFactory = getDAOFactory(package = "T0.WMBS",
+                               logger = logging,
+                               dbinterface = myThread.dbi)
 
     getConditionsDAO = daoFactory(classname = "ConditionUpload.GetConditions")
     completeFilesDAO = daoFactory(classname = "ConditionUpload.CompleteFiles")
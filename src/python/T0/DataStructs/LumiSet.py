@@ -0,0 +1,270 @@
+"""
+_LumiSet_
+
+Compact set of lumi sections
+
+Lumis of a run come in long consecutive ranges (everything repacked
+so far, empty lumis declared by StorageManager), so the set stores
+closed ranges (first, last) instead of one entry per lumi. Memory
+and the cost of union and gap iteration scale with the number of
+ranges, membership is a binary search over the range starts.
+
+"""
+import bisect
+
+
+class LumiSet(object):
+    """
+    _LumiSet_
+
+    Set of lumis stored as sorted, disjoint and
+    non adjacent closed ranges of lumis
+
+    """
+    def __init__(self, lumis = None):
+        """
+        _init_
+
+        """
+        self.firsts = []
+        self.lasts = []
+
+        if lumis != None:
+            self.setRanges(rangesFromLumis(lumis))
+
+        return
+
+    @classmethod
+    def fromRanges(cls, ranges):
+        """
+        _fromRanges_
+
+        Create the set from closed (first, last) lumi ranges
+        in any order, overlapping or adjacent ranges are merged
+
+        """
+        lumiSet = cls()
+        lumiSet.setRanges(mergeRanges(sorted(ranges)))
+
+        return lumiSet
+
+    def setRanges(self, ranges):
+        """
+        _setRanges_
+
+        Replace the content by already merged and sorted ranges
+
+        """
+        self.firsts = [ x[0] for x in ranges ]
+        self.lasts = [ x[1] for x in ranges ]
+
+        return
+
+    def ranges(self):
+        """
+        _ranges_
+
+        List of closed (first, last) lumi ranges
+
+        """
+        return list(zip(self.firsts, self.lasts))
+
+    def add(self, lumi):
+        """
+        _add_
+
+        """
+        if lumi not in self:
+            self.update([ lumi ])
+
+        return
+
+    def update(self, lumis):
+        """
+        _update_
+
+        Add all lumis from another LumiSet or any iterable of lumis
+
+        """
+        if isinstance(lumis, LumiSet):
+            otherRanges = lumis.ranges()
+        else:
+            otherRanges = rangesFromLumis(lumis)
+
+        if len(otherRanges) > 0:
+            self.setRanges(mergeRanges(mergeSorted(self.ranges(), otherRanges)))
+
+        return
+
+    def union(self, other):
+        """
+        _union_
+
+        """
+        lumiSet = LumiSet()
+        lumiSet.setRanges(self.ranges())
+        lumiSet.update(other)
+
+        return lumiSet
+
+    def __or__(self, other):
+        return self.union(other)
+
+    def __ior__(self, other):
+        self.update(other)
+        return self
+
+    def __contains__(self, lumi):
+        index = bisect.bisect_right(self.firsts, lumi) - 1
+        return index >= 0 and lumi <= self.lasts[index]
+
+    def __iter__(self):
+        for first, last in zip(self.firsts, self.lasts):
+            for lumi in range(first, last + 1):
+                yield lumi
+
+    def __len__(self):
+        return sum([ last - first + 1 for first, last in zip(self.firsts, self.lasts) ])
+
+    def __bool__(self):
+        return len(self.firsts) > 0
+
+    __nonzero__ = __bool__
+
+    def __eq__(self, other):
+        if isinstance(other, LumiSet):
+            return self.firsts == other.firsts and self.lasts == other.lasts
+        elif isinstance(other, (set, frozenset)):
+            return self == LumiSet(other)
+        return NotImplemented
+
+    def __ne__(self, other):
+        result = self.__eq__(other)
+        if result is NotImplemented:
+            return result
+        return not result
+
+    def __repr__(self):
+        return "LumiSet.fromRanges(%s)" % repr(self.ranges())
+
+    def min(self):
+        """
+        _min_
+
+        Lowest lumi, None if the set is empty
+
+        """
+        if len(self.firsts) == 0:
+            return None
+        return self.firsts[0]
+
+    def max(self):
+        """
+        _max_
+
+        Highest lumi, None if the set is empty
+
+        """
+        if len(self.lasts) == 0:
+            return None
+        return self.lasts[-1]
+
+    def contiguousEnd(self, lumi):
+        """
+        _contiguousEnd_
+
+        Highest lumi such that all lumis from lumi up to it
+        are in the set, lumi - 1 if lumi is not in the set
+
+        """
+        index = bisect.bisect_right(self.firsts, lumi) - 1
+        if index >= 0 and lumi <= self.lasts[index]:
+            return self.lasts[index]
+        return lumi - 1
+
+    def gaps(self, first = 1, last = None):
+        """
+        _gaps_
+
+        Generate the closed (first, last) ranges of lumis between
+        first and last (default the highest lumi) not in the set
+
+        """
+        if last == None:
+            last = self.max() or 0
+
+        index = max(0, bisect.bisect_right(self.firsts, first) - 1)
+        current = first
+        while current <= last:
+            if index < len(self.firsts) and self.firsts[index] <= last:
+                rangeFirst = self.firsts[index]
+                rangeLast = self.lasts[index]
+                index += 1
+                if rangeLast < current:
+                    continue
+                if rangeFirst > current:
+                    yield (current, rangeFirst - 1)
+                current = rangeLast + 1
+            else:
+                yield (current, last)
+                break
+
+        return
+
+
+def rangesFromLumis(lumis):
+    """
+    _rangesFromLumis_
+
+    Sorted, merged closed ranges from an iterable of lumis
+
+    """
+    ranges = []
+    for lumi in sorted(set(lumis)):
+        if len(ranges) > 0 and lumi == ranges[-1][1] + 1:
+            ranges[-1][1] = lumi
+        else:
+            ranges.append([ lumi, lumi ])
+
+    return [ tuple(x) for x in ranges ]
+
+
+def mergeSorted(ranges, otherRanges):
+    """
+    _mergeSorted_
+
+    Merge two lists of ranges sorted by range start
+
+    """
+    merged = []
+    i = j = 0
+    while i < len(ranges) and j < len(otherRanges):
+        if ranges[i] <= otherRanges[j]:
+            merged.append(ranges[i])
+            i += 1
+        else:
+            merged.append(otherRanges[j])
+            j += 1
+    merged.extend(ranges[i:])
+    merged.extend(otherRanges[j:])
+
+    return merged
+
+
+def mergeRanges(ranges):
+    """
+    _mergeRanges_
+
+    Merge overlapping and adjacent ranges of a
+    list of ranges sorted by range start
+
+    """
+    merged = []
+    for first, last in ranges:
+        if len(merged) > 0 and first <= merged[-1][1] + 1:
+            if last > merged[-1][1]:
+                merged[-1][1] = last
+        else:
+            merged.append([ first, last ])
+
+    return [ tuple(x) for x in merged ]
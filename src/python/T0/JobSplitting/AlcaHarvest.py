@@ -10,7 +10,7 @@ import logging
 from WMCore.WMBS.File import File
 
 from WMCore.JobSplitting.JobFactory import JobFactory
-from WMCore.DAOFactory import DAOFactory
+from T0.WMBS.DAORegistry import getDAOFactory
 from WMCore.Services.UUID import makeUUID
 
 class AlcaHarvest(JobFactory):
@@ -37,9 +37,9 @@ class AlcaHarvest(JobFactory):
 
         myThread = threading.currentThread()
 
-        self.daoFactory = DAOFactory(package = "T0.WMBS",
-                                     logger = logging,
-                                     dbinterface = myThread.dbi)
+        self.daoFactory = getDAOFactory(package = "T0.WMBS",
+                                        logger = logging,
+                                        dbinterface = myThread.dbi)
 
         fileset = self.subscription.getFileset()
         fileset.load()
@@ -11,7 +11,7 @@ import time
 from WMCore.WMBS.File import File
 
 from WMCore.JobSplitting.JobFactory import JobFactory
-from WMCore.DAOFactory import DAOFactory
+from T0.WMBS.DAORegistry import getDAOFactory
 
 
 class Condition(JobFactory):
@@ -38,9 +38,9 @@ class Condition(JobFactory):
         stream = kwargs['streamName']
 
         myThread = threading.currentThread()
-        daoFactory = DAOFactory(package = "T0.WMBS",
-                                logger = logging,
-                                dbinterface = myThread.dbi)
+        daoFactory = getDAOFactory(package = "T0.WMBS",
+                                   logger = logging,
+                                   dbinterface = myThread.dbi)
 
         # data discovery
         getFilesDAO = daoFactory(classname = "Subscriptions.GetAvailableConditionFiles")
@@ -10,7 +10,8 @@ import threading
 from WMCore.WMBS.File import File
 
 from WMCore.JobSplitting.JobFactory import JobFactory
-from WMCore.DAOFactory import DAOFactory
+from T0.WMBS.DAORegistry import getDAOFactory
+from T0.JobSplitting.FirstFit import packFirstFit
 from WMCore.Services.UUID import makeUUID
 
 
@@ -38,9 +39,9 @@ class Express(JobFactory):
                     self.getPerformanceParameters(kwargs.get('performance', {}))
         
         myThread = threading.currentThread()
-        daoFactory = DAOFactory(package = "T0.WMBS",
-                                logger = logging,
-                                dbinterface = myThread.dbi)
+        daoFactory = getDAOFactory(package = "T0.WMBS",
+                                   logger = logging,
+                                   dbinterface = myThread.dbi)
 
         # keep for later
         self.insertSplitLumisDAO = daoFactory(classname = "JobSplitting.InsertSplitLumis")
@@ -94,41 +95,15 @@ class Express(JobFactory):
                 self.markFailed(lumiStreamerList)
                 continue
 
-            createdJobs = 0
-            nFiles = len(lumiStreamerList)
-            while len(lumiStreamerList) > 0:
-
-                eventsTotal = 0
-                sizeTotal = 0
-                streamerList = []
-
-                for streamer in lumiStreamerList:
-
-                    # if first streamer, always use it
-                    if len(streamerList) == 0:
-                        eventsTotal = streamer['events']
-                        sizeTotal = streamer['filesize']
-                        streamerList.append(streamer)
-                    # otherwise calculate new totals and check if to use streamer
-                    else:
-                        newEventsTotal = eventsTotal + streamer['events']
-                        newSizeTotal = sizeTotal + streamer['filesize']
-
-                        if newEventsTotal <= self.maxInputEvents:
-                            eventsTotal = newEventsTotal
-                            sizeTotal = newSizeTotal
-                            streamerList.append(streamer)
+            jobs = packFirstFit(lumiStreamerList,
+                                maxEvents = self.maxInputEvents)
 
+            for streamerList, eventsTotal, sizeTotal in jobs:
                 self.createJob(streamerList, eventsTotal, sizeTotal, timePerEvent, sizePerEvent, memoryRequirement)
 
-                for streamer in streamerList:
-                    lumiStreamerList.remove(streamer)
-
-                createdJobs += 1
-
-            if createdJobs > 1:
+            if len(jobs) > 1:
                 splitLumis.append( { 'SUB' : self.subscription["id"],
-                                     'LUMI' : lumi, 'NFILES' : nFiles } )
+                                     'LUMI' : lumi, 'NFILES' : len(lumiStreamerList) } )
 
         if len(splitLumis) > 0:
             self.insertSplitLumisDAO.execute(binds = splitLumis)
@@ -11,7 +11,8 @@ import time
 from WMCore.WMBS.File import File
 
 from WMCore.JobSplitting.JobFactory import JobFactory
-from WMCore.DAOFactory import DAOFactory
+from T0.WMBS.DAORegistry import getDAOFactory
+from T0.DataStructs.LumiSet import LumiSet
 from WMCore.Services.UUID import makeUUID
 
 
@@ -38,9 +39,9 @@ class ExpressMerge(JobFactory):
         self.createdGroup = False
 
         myThread = threading.currentThread()
-        daoFactory = DAOFactory(package = "T0.WMBS",
-                                logger = logging,
-                                dbinterface = myThread.dbi)
+        daoFactory = getDAOFactory(package = "T0.WMBS",
+                                   logger = logging,
+                                   dbinterface = myThread.dbi)
 
         # data discovery
         getFilesDAO = daoFactory(classname = "Subscriptions.GetAvailableExpressMergeFiles")
@@ -87,11 +88,12 @@ class ExpressMerge(JobFactory):
         #     if self.maxLatency is 0, merge lumi by lumi
         #
 
-        lastLumi = 0
+        lumiSet = LumiSet(filesByLumi.keys())
+
         jobSizeTotal = 0
         jobFileList = []
 
-        for lumi in sorted(filesByLumi.keys()):
+        for lumi in lumiSet:
 
             lumiFileList = filesByLumi[lumi]
 
@@ -114,7 +116,6 @@ class ExpressMerge(JobFactory):
             if len(jobFileList) == 0:
                 if lumiAge > self.maxLatency:
                     jobFileList.extend(lumiFileList)
-                    lastLumi = lumi
                     jobSizeTotal = lumiSizeTotal
                 else:
                     break
@@ -122,16 +123,14 @@ class ExpressMerge(JobFactory):
             elif self.maxLatency == 0:
                 self.createJob(jobFileList, jobSizeTotal)
                 jobFileList = lumiFileList
-                lastLumi = lumi
                 jobSizeTotal = lumiSizeTotal
             # observe strict lumi order and sequence broken => expressmerge
             # triggers new age check on next out of sequence lumi
             # bail if not old enough
-            elif lumi != lastLumi + 1:
+            elif lumi - 1 not in lumiSet:
                 self.createJob(jobFileList, jobSizeTotal)
                 if lumiAge > self.maxLatency:
                     jobFileList = lumiFileList
-                    lastLumi = lumi
                     jobSizeTotal = lumiSizeTotal
                 else:
                     jobFileList = []
@@ -140,13 +139,11 @@ class ExpressMerge(JobFactory):
             elif newFileCount <= self.maxInputFiles and \
                      newSizeTotal <= self.maxInputSize:
                 jobFileList.extend(lumiFileList)
-                lastLumi = lumi
                 jobSizeTotal = newSizeTotal
             # over limits => expressmerge
             else:
                 self.createJob(jobFileList, jobSizeTotal)
                 jobFileList = lumiFileList
-                lastLumi = lumi
                 jobSizeTotal = lumiSizeTotal
 
         # sequential leftovers that are old enough
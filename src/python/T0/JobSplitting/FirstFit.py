@@ -0,0 +1,118 @@
+"""
+_FirstFit_
+
+First fit packing of the files of a lumi that is too large for a
+single job, shared by the Repack, Express and RepackMerge splitters
+
+The splitters used to build one job at a time by going over all
+remaining files of the lumi, always taking the first one and every
+later one that still fits, and then removing the used files from the
+list. That is the same as first fit packing, every file goes into the
+first job (in order of creation) it still fits into or starts a new
+job, which can be done in a single pass over the files.
+
+With only a few jobs the first one a file fits into is found by going
+over the jobs. Beyond that a tree over the jobs holding the largest
+remaining size and event capacity of each subtree is used, so a lookup
+only descends into subtrees that have room for the file.
+
+"""
+
+# number of jobs up to which they are searched one by one
+LINEAR_SEARCH_JOBS = 64
+
+
+def packFirstFit(fileList, maxSize = None, maxEvents = None):
+    """
+    _packFirstFit_
+
+    Pack files (dictionaries with filesize and events) into jobs
+    with at most maxSize bytes and maxEvents events (None for no
+    limit), a file that alone is over the limits gets its own job.
+
+    Returns a list of (fileList, eventsTotal, sizeTotal) in the order
+    the jobs were started, files within a job keep their order.
+
+    """
+    if len(fileList) == 0:
+        return []
+
+    if maxSize == None:
+        maxSize = float("inf")
+    if maxEvents == None:
+        maxEvents = float("inf")
+
+    # jobs are [ fileList, eventsTotal, sizeTotal ]
+    jobs = []
+
+    # leaves of the tree are the remaining capacities of the jobs in
+    # order of creation, leaves without a job have negative capacity
+    # and never match, no tree (capacity 0) while searching linearly
+    capacity = 0
+    sizeTree = []
+    eventsTree = []
+
+    for fileInfo in fileList:
+
+        fileEvents = fileInfo['events']
+        fileSize = fileInfo['filesize']
+
+        index = None
+        if capacity == 0:
+            for jobIndex, job in enumerate(jobs):
+                if job[2] + fileSize <= maxSize and job[1] + fileEvents <= maxEvents:
+                    index = jobIndex
+                    break
+        elif sizeTree[1] >= fileSize and eventsTree[1] >= fileEvents:
+            # depth first, left subtree first => lowest job index
+            pending = [ 1 ]
+            while len(pending) > 0:
+                node = pending.pop()
+                if sizeTree[node] < fileSize or eventsTree[node] < fileEvents:
+                    continue
+                if node >= capacity:
+                    index = node - capacity
+                    break
+                pending.append(2 * node + 1)
+                pending.append(2 * node)
+
+        if index == None:
+            index = len(jobs)
+            job = [ [ fileInfo ], fileEvents, fileSize ]
+            jobs.append(job)
+
+            # switch to (or grow) the tree, built from all jobs
+            if index >= LINEAR_SEARCH_JOBS and index >= capacity:
+                capacity = max(2 * capacity, 2 * LINEAR_SEARCH_JOBS)
+                sizeTree = [ -1 ] * (2 * capacity)
+                eventsTree = [ -1 ] * (2 * capacity)
+                for jobIndex, job in enumerate(jobs):
+                    sizeTree[capacity + jobIndex] = maxSize - job[2]
+                    eventsTree[capacity + jobIndex] = maxEvents - job[1]
+                for node in range(capacity - 1, 0, -1):
+                    sizeTree[node] = max(sizeTree[2 * node], sizeTree[2 * node + 1])
+                    eventsTree[node] = max(eventsTree[2 * node], eventsTree[2 * node + 1])
+                continue
+
+        else:
+            job = jobs[index]
+            job[0].append(fileInfo)
+            job[1] += fileEvents
+            job[2] += fileSize
+
+        if capacity > 0:
+            node = capacity + index
+            sizeTree[node] = maxSize - job[2]
+            eventsTree[node] = maxEvents - job[1]
+            node //= 2
+            # stop once the subtree maxima do not change anymore
+            while node > 0:
+                sizeMax = max(sizeTree[2 * node], sizeTree[2 * node + 1])
+                eventsMax = max(eventsTree[2 * node], eventsTree[2 * node + 1])
+                if sizeTree[node] == sizeMax and eventsTree[node] == eventsMax:
+                    break
+                sizeTree[node] = sizeMax
+                eventsTree[node] = eventsMax
+                node //= 2
+
+    return [ tuple(job) for job in jobs ]
@@ -0,0 +1,71 @@
+"""
+_LumiScan_
+
+Lumi scan for the Repack and RepackMerge splitters
+
+The splitters walk through all lumis of a run in order, classifying
+each lumi as having available data, being used (already processed
+or declared empty) or being a hole (neither) and act on the data
+collected so far whenever they hit a used lumi or a hole.
+
+Between two lumis with available data only the first lumi of the gap
+triggers an action (the collected data is handed off or dropped there),
+all following lumis of the gap just decide whether the splitter is
+behind a lumi hole, which only depends on the last lumi of the gap.
+
+scanLumis therefore only reports the lumis with data and the first
+and last lumi of every gap. The cost scales with the number of lumis
+with available data, not with the highest lumi of the run.
+
+Behind a used lumi the splitters have no data collected and are not
+behind a lumi hole, which is the same state as at the start of a run.
+When all lumis up to some lumi are used (the lumi cursor), the scan
+can therefore start right after it.
+
+"""
+
+LUMI_DATA = "data"
+LUMI_USED = "used"
+LUMI_HOLE = "hole"
+
+
+def scanLumis(availableLumis, usedLumis, maxUsedLumi = None, firstLumi = 1):
+    """
+    _scanLumis_
+
+    Generate (lumi, type) in lumi order, equivalent for the splitters
+    to classifying every lumi from firstLumi to the highest available
+    or used lumi. usedLumis only needs to support membership tests, the
+    highest used lumi is calculated if not passed in.
+
+    """
+    if maxUsedLumi == None:
+        maxUsedLumi = max(usedLumis) if usedLumis else 0
+
+    def lumiType(lumi):
+        if lumi in usedLumis:
+            return LUMI_USED
+        return LUMI_HOLE
+
+    def gap(firstLumi, lastLumi):
+        if firstLumi > lastLumi:
+            return
+        firstType = lumiType(firstLumi)
+        yield (firstLumi, firstType)
+        if lastLumi > firstLumi:
+            lastType = lumiType(lastLumi)
+            if lastType != firstType:
+                yield (lastLumi, lastType)
+        return
+
+    previousLumi = firstLumi - 1
+    for lumi in sorted(availableLumis):
+        for item in gap(previousLumi + 1, lumi - 1):
+            yield item
+        yield (lumi, LUMI_DATA)
+        previousLumi = lumi
+
+    for item in gap(previousLumi + 1, maxUsedLumi):
+        yield item
+
+    return
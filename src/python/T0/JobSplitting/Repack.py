@@ -11,7 +11,9 @@ import threading
 from WMCore.WMBS.File import File
 
 from WMCore.JobSplitting.JobFactory import JobFactory
-from WMCore.DAOFactory import DAOFactory
+from T0.WMBS.DAORegistry import getDAOFactory
+from T0.JobSplitting.LumiScan import scanLumis, LUMI_DATA, LUMI_USED
+from T0.JobSplitting.FirstFit import packFirstFit
 from WMCore.Services.UUID import makeUUID
 
 
@@ -35,6 +37,7 @@ class Repack(JobFactory):
         self.maxInputEvents = kwargs['maxInputEvents']
         self.maxInputFiles = kwargs['maxInputFiles']
         self.maxLatency = kwargs['maxLatency']
+        self.useLumiCursor = kwargs.get('useLumiCursor', False)
 
         self.currentTime = time.time()
 
@@ -44,9 +47,9 @@ class Repack(JobFactory):
                     self.getPerformanceParameters(kwargs.get('performance', {}))
         
         myThread = threading.currentThread()
-        daoFactory = DAOFactory(package = "T0.WMBS",
-                                logger = logging,
-                                dbinterface = myThread.dbi)
+        daoFactory = getDAOFactory(package = "T0.WMBS",
+                                   logger = logging,
+                                   dbinterface = myThread.dbi)
 
         # keep for later
         self.insertSplitLumisDAO = daoFactory(classname = "JobSplitting.InsertSplitLumis")
@@ -59,15 +62,6 @@ class Repack(JobFactory):
         if len(availableFiles) == 0:
             return
 
-        # data discovery for already used lumis
-        getUsedLumisDAO = daoFactory(classname = "Subscriptions.GetUsedLumis")
-        usedLumis = getUsedLumisDAO.execute(self.subscription["id"], False)
-
-        # empty lumis (as declared by StorageManager) are treated the
-        # same way as used lumis, ie. we process around them
-        getEmptyLumisDAO = daoFactory(classname = "Subscriptions.GetLumiHolesForRepack")
-        usedLumis |= getEmptyLumisDAO.execute(self.subscription["id"])
-
         # sort available files by lumi
         availableFileLumiDict = {}
         for result in availableFiles:
@@ -76,19 +70,41 @@ class Repack(JobFactory):
                 availableFileLumiDict[lumi] = []
             availableFileLumiDict[lumi].append(result)
 
+        # all lumis up to the lumi cursor are used or empty,
+        # only the lumis above it need to be looked at
+        lumiCursor = 0
+        if self.useLumiCursor:
+            getLumiCursorDAO = daoFactory(classname = "JobSplitting.GetLumiCursor")
+            lumiCursor = getLumiCursorDAO.execute(self.subscription["id"])
+            # should not happen, but if there is data at or
+            # below the lumi cursor look at the whole run again
+            if min(availableFileLumiDict.keys()) <= lumiCursor:
+                lumiCursor = 0
+
+        # data discovery for already used lumis
+        getUsedLumisDAO = daoFactory(classname = "Subscriptions.GetUsedLumis")
+        usedLumis = getUsedLumisDAO.execute(self.subscription["id"], False, lumiCursor)
+
+        # empty lumis (as declared by StorageManager) are treated the
+        # same way as used lumis, ie. we process around them
+        getEmptyLumisDAO = daoFactory(classname = "Subscriptions.GetLumiHolesForRepack")
+        usedLumis |= getEmptyLumisDAO.execute(self.subscription["id"], lumiCursor)
+
         # loop through lumis in order
         haveLumiHole = False
         filesByLumi = {}
-        maxUsedLumi = max(usedLumis) if usedLumis else 0
-        for lumi in range(1, 1+max(maxUsedLumi,max(availableFileLumiDict.keys()))):
+        # only lumis with data and the boundaries of the used lumi
+        # ranges and lumi holes between them are looked at, which
+        # is equivalent to looping over every lumi of the run
+        for lumi, lumiType in scanLumis(availableFileLumiDict.keys(), usedLumis, usedLumis.max() or 0, lumiCursor + 1):
 
             # lumi contains data => remember it for potential processing
-            if lumi in availableFileLumiDict:
+            if lumiType == LUMI_DATA:
 
                 filesByLumi[lumi] = availableFileLumiDict[lumi]
 
             # lumi is used and we have data => trigger processing
-            elif lumi in usedLumis:
+            elif lumiType == LUMI_USED:
 
                 if len(filesByLumi) > 0:
 
@@ -129,6 +145,15 @@ class Repack(JobFactory):
 
                 haveLumiHole = True
 
+        # move the lumi cursor over the used lumis following it, but not
+        # beyond any data (lumis used by this pass are picked up next pass)
+        if self.useLumiCursor:
+            newLumiCursor = min(usedLumis.contiguousEnd(lumiCursor + 1),
+                                min(availableFileLumiDict.keys()) - 1)
+            if newLumiCursor > lumiCursor:
+                updateLumiCursorDAO = daoFactory(classname = "JobSplitting.UpdateLumiCursor")
+                updateLumiCursorDAO.execute(self.subscription["id"], newLumiCursor)
+
         # now handle whatever data is still left (at the high end of the lumi range)
         if haveLumiHole:
             if self.getDataAge(filesByLumi) > self.maxLatency:
@@ -196,43 +221,16 @@ class Repack(JobFactory):
                     jobEventsTotal = 0
                     jobStreamerList = []
 
-                createdJobs = 0
-                nFiles = len(lumiStreamerList)
-                while len(lumiStreamerList) > 0:
-
-                    eventsTotal = 0
-                    sizeTotal = 0
-                    streamerList = []
-                    for streamer in lumiStreamerList:
-
-                        # if first streamer, always use it
-                        if len(streamerList) == 0:
-                            eventsTotal = streamer['events']
-                            sizeTotal = streamer['filesize']
-                            streamerList.append(streamer)
-
-                        # otherwise calculate new totals and check if to use streamer
-                        else:
-                            newEventsTotal = eventsTotal + streamer['events']
-                            newSizeTotal = sizeTotal + streamer['filesize']                        
-
-                            if newSizeTotal <= self.maxSizeSingleLumi and \
-                                    newEventsTotal <= self.maxInputEvents:
-
-                                eventsTotal = newEventsTotal
-                                sizeTotal = newSizeTotal
-                                streamerList.append(streamer)
+                jobs = packFirstFit(lumiStreamerList,
+                                    maxSize = self.maxSizeSingleLumi,
+                                    maxEvents = self.maxInputEvents)
 
+                for streamerList, eventsTotal, sizeTotal in jobs:
                     self.createJob(streamerList, eventsTotal, sizeTotal, memoryRequirement)
 
-                    for streamer in streamerList:
-                        lumiStreamerList.remove(streamer)
-
-                    createdJobs += 1
-
-                if createdJobs > 1:
+                if len(jobs) > 1:
                     splitLumis.append( { 'SUB' : self.subscription["id"],
-                                         'LUMI' : lumi, 'NFILES' : nFiles } )
+                                         'LUMI' : lumi, 'NFILES' : len(lumiStreamerList) } )
 
             # lumi is smaller than split limits
             # check if it can be combined with previous lumi(s)
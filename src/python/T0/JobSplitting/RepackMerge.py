@@ -11,7 +11,9 @@ import threading
 from WMCore.WMBS.File import File
 
 from WMCore.JobSplitting.JobFactory import JobFactory
-from WMCore.DAOFactory import DAOFactory
+from T0.WMBS.DAORegistry import getDAOFactory
+from T0.JobSplitting.LumiScan import scanLumis, LUMI_DATA, LUMI_USED
+from T0.JobSplitting.FirstFit import packFirstFit
 from WMCore.Services.UUID import makeUUID
 
 
@@ -37,6 +39,7 @@ class RepackMerge(JobFactory):
         self.maxEdmSize = kwargs['maxEdmSize']
         self.maxOverSize = kwargs['maxOverSize']
         self.maxLatency = kwargs['maxLatency']
+        self.useLumiCursor = kwargs.get('useLumiCursor', False)
 
         # catch configuration errors
         if self.maxOverSize > self.maxEdmSize:
@@ -47,9 +50,9 @@ class RepackMerge(JobFactory):
         self.createdGroup = False
 
         myThread = threading.currentThread()
-        daoFactory = DAOFactory(package = "T0.WMBS",
-                                logger = logging,
-                                dbinterface = myThread.dbi)
+        daoFactory = getDAOFactory(package = "T0.WMBS",
+                                   logger = logging,
+                                   dbinterface = myThread.dbi)
 
         # data discovery
         getAvailableFilesDAO = daoFactory(classname = "Subscriptions.GetAvailableRepackMergeFiles")
@@ -59,15 +62,6 @@ class RepackMerge(JobFactory):
         if len(availableFiles) == 0:
             return
 
-        # data discovery for already used lumis
-        getUsedLumisDAO = daoFactory(classname = "Subscriptions.GetUsedLumis")
-        usedLumis = getUsedLumisDAO.execute(self.subscription["id"], True)
-
-        # empty lumis (as declared by StorageManager) are treated the
-        # same way as used lumis, ie. we process around them
-        getEmptyLumisDAO = daoFactory(classname = "Subscriptions.GetLumiHolesForRepackMerge")
-        usedLumis |= getEmptyLumisDAO.execute(self.subscription["id"])
-
         # sort available files by lumi
         availableFileLumiDict = {}
         for result in availableFiles:
@@ -77,19 +71,41 @@ class RepackMerge(JobFactory):
                 if lumi == result['first_lumi']:
                     availableFileLumiDict[lumi].append(result)
 
+        # all lumis up to the lumi cursor are used or empty,
+        # only the lumis above it need to be looked at
+        lumiCursor = 0
+        if self.useLumiCursor:
+            getLumiCursorDAO = daoFactory(classname = "JobSplitting.GetLumiCursor")
+            lumiCursor = getLumiCursorDAO.execute(self.subscription["id"])
+            # should not happen, but if there is data at or
+            # below the lumi cursor look at the whole run again
+            if min(availableFileLumiDict.keys()) <= lumiCursor:
+                lumiCursor = 0
+
+        # data discovery for already used lumis
+        getUsedLumisDAO = daoFactory(classname = "Subscriptions.GetUsedLumis")
+        usedLumis = getUsedLumisDAO.execute(self.subscription["id"], True, lumiCursor)
+
+        # empty lumis (as declared by StorageManager) are treated the
+        # same way as used lumis, ie. we process around them
+        getEmptyLumisDAO = daoFactory(classname = "Subscriptions.GetLumiHolesForRepackMerge")
+        usedLumis |= getEmptyLumisDAO.execute(self.subscription["id"], lumiCursor)
+
         # loop through lumis in order
         haveLumiHole = False
         filesByLumi = {}
-        maxUsedLumi = max(usedLumis) if usedLumis else 0
-        for lumi in range(1, 1+max(maxUsedLumi,max(availableFileLumiDict.keys()))):
+        # only lumis with data and the boundaries of the used lumi
+        # ranges and lumi holes between them are looked at, which
+        # is equivalent to looping over every lumi of the run
+        for lumi, lumiType in scanLumis(availableFileLumiDict.keys(), usedLumis, usedLumis.max() or 0, lumiCursor + 1):
 
             # lumi contains data => remember it for potential processing
-            if lumi in availableFileLumiDict:
+            if lumiType == LUMI_DATA:
 
                 filesByLumi[lumi] = availableFileLumiDict[lumi]
 
             # lumi is used and we have data => trigger processing
-            elif lumi in usedLumis:
+            elif lumiType == LUMI_USED:
 
                 if len(filesByLumi) > 0:
 
@@ -130,6 +146,15 @@ class RepackMerge(JobFactory):
 
                 haveLumiHole = True
 
+        # move the lumi cursor over the used lumis following it, but not
+        # beyond any data (lumis used by this pass are picked up next pass)
+        if self.useLumiCursor:
+            newLumiCursor = min(usedLumis.contiguousEnd(lumiCursor + 1),
+                                min(availableFileLumiDict.keys()) - 1)
+            if newLumiCursor > lumiCursor:
+                updateLumiCursorDAO = daoFactory(classname = "JobSplitting.UpdateLumiCursor")
+                updateLumiCursorDAO.execute(self.subscription["id"], newLumiCursor)
+
         # now handle whatever data is still left (at the high end of the lumi range)
         if haveLumiHole:
             if self.getDataAge(filesByLumi) > self.maxLatency:
@@ -198,36 +223,9 @@ class RepackMerge(JobFactory):
                     jobInputFiles = 0
                     jobFileList = []
 
-                while len(lumiFileList) > 0:
-
-                    eventsTotal = 0
-                    sizeTotal = 0
-                    fileList = []
-                    for fileInfo in lumiFileList:
-
-                        # if first file, always use it
-                        if len(fileList) == 0:
-                            eventsTotal = fileInfo['events']
-                            sizeTotal = fileInfo['filesize']
-                            fileList.append(fileInfo)
-
-                        # otherwise calculate new totals and check if to use file
-                        else:
-
-                            newEventsTotal = eventsTotal + fileInfo['events']
-                            newSizeTotal = sizeTotal + fileInfo['filesize']
-
-                            if newSizeTotal <= self.maxEdmSize:
-
-                                eventsTotal = newEventsTotal
-                                sizeTotal = newSizeTotal
-                                fileList.append(fileInfo)
-
+                for fileList, eventsTotal, sizeTotal in packFirstFit(lumiFileList, maxSize = self.maxEdmSize):
                     self.createJob(fileList, eventsTotal, errorDataset = True)
 
-                    for fileInfo in fileList:
-                        lumiFileList.remove(fileInfo)
-
             elif lumiSizeTotal > self.maxInputSize or \
                     lumiEventsTotal > self.maxInputEvents or \
                     lumiInputFiles > self.maxInputFiles:
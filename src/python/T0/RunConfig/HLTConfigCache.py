@@ -0,0 +1,157 @@
+"""
+_HLTConfigCache_
+
+LRU cache for HLT configurations keyed by HLT key
+
+Retrieving the HLT configuration for a run is an expensive query
+against the HLT configuration database, but consecutive runs very
+often use the same HLT key. Configurations are cached in memory and
+optionally in a directory on disk, so that they survive a restart
+of the component.
+
+Only usable configurations (with process name and stream mapping)
+are cached, so that failed or incomplete lookups are retried.
+
+"""
+import os
+import hashlib
+import logging
+
+try:
+    import cPickle as pickle
+except ImportError:
+    import pickle
+
+
+class HLTConfigCache(object):
+    """
+    _HLTConfigCache_
+
+    Memory (and optionally disk) LRU cache of HLT configurations
+
+    """
+    def __init__(self, loader, size = 100, cacheDir = None):
+        """
+        _init_
+
+        loader is called with the HLT key on a cache miss and
+        returns the HLT configuration, ie. GetHLTConfig.execute
+
+        """
+        self.loader = loader
+        self.size = max(1, size)
+        self.cacheDir = cacheDir
+
+        # keys in order of use, least recently used first
+        self.cache = {}
+        self.order = []
+
+        self.hits = 0
+        self.misses = 0
+
+        if self.cacheDir != None and not os.path.isdir(self.cacheDir):
+            os.makedirs(self.cacheDir)
+
+        return
+
+    def get(self, hltkey, **kwargs):
+        """
+        _get_
+
+        Return the HLT configuration for the HLT key, extra
+        arguments are passed to the loader on a cache miss
+
+        """
+        hltConfig = self.cache.get(hltkey)
+        if hltConfig == None:
+            hltConfig = self.readDiskCache(hltkey)
+
+        if hltConfig != None:
+            self.hits += 1
+        else:
+            self.misses += 1
+            hltConfig = self.loader(hltkey, **kwargs)
+            if not isUsable(hltConfig):
+                return hltConfig
+            self.writeDiskCache(hltkey, hltConfig)
+
+        if hltkey in self.cache:
+            self.order.remove(hltkey)
+        self.cache[hltkey] = hltConfig
+        self.order.append(hltkey)
+        while len(self.order) > self.size:
+            del self.cache[self.order.pop(0)]
+
+        return hltConfig
+
+    def diskCacheFile(self, hltkey):
+        """
+        _diskCacheFile_
+
+        """
+        return os.path.join(self.cacheDir, "%s.pkl" % hashlib.sha1(hltkey.encode("utf-8")).hexdigest())
+
+    def readDiskCache(self, hltkey):
+        """
+        _readDiskCache_
+
+        """
+        if self.cacheDir == None:
+            return None
+
+        cacheFile = self.diskCacheFile(hltkey)
+        if not os.path.isfile(cacheFile):
+            return None
+
+        try:
+            with open(cacheFile, "rb") as fd:
+                cachedKey, hltConfig = pickle.load(fd)
+        except Exception:
+            logging.exception("Cannot read HLT configuration cache file %s" % cacheFile)
+            return None
+
+        if cachedKey != hltkey or not isUsable(hltConfig):
+            return None
+
+        # keep recently used files from being evicted
+        os.utime(cacheFile, None)
+
+        return hltConfig
+
+    def writeDiskCache(self, hltkey, hltConfig):
+        """
+        _writeDiskCache_
+
+        Store the HLT configuration on disk and evict
+        the least recently used files above the cache size
+
+        """
+        if self.cacheDir == None:
+            return
+
+        cacheFile = self.diskCacheFile(hltkey)
+        try:
+            tmpFile = "%s.tmp" % cacheFile
+            with open(tmpFile, "wb") as fd:
+                pickle.dump((hltkey, hltConfig), fd, pickle.HIGHEST_PROTOCOL)
+            os.rename(tmpFile, cacheFile)
+
+            cacheFiles = [ os.path.join(self.cacheDir, x) for x in os.listdir(self.cacheDir) if x.endswith(".pkl") ]
+            if len(cacheFiles) > self.size:
+                cacheFiles.sort(key = os.path.getmtime)
+                for cacheFile in cacheFiles[:len(cacheFiles) - self.size]:
+                    os.remove(cacheFile)
+        except Exception:
+            logging.exception("Cannot write HLT configuration cache file %s" % cacheFile)
+
+        return
+
+
+def isUsable(hltConfig):
+    """
+    _isUsable_
+
+    Check that an HLT configuration has a process name and stream mapping
+
+    """
+    return hltConfig != None and hltConfig.get('process') != None and len(hltConfig.get('mapping', {})) > 0
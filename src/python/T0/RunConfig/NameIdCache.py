@@ -0,0 +1,151 @@
+"""
+_NameIdCache_
+
+Write-through cache of name to id mappings for the stream,
+primary_dataset, trigger_label and cmssw_version tables
+
+Names in these tables are never deleted or renamed, so once a name
+is known its id can be used directly. Only names missing from the
+cache are inserted, their ids are then read back and become part
+of the cache once the surrounding transaction is committed (ids
+inserted in a rolled back transaction are discarded).
+
+There is one cache per database interface, each table is loaded
+completely the first time it is used (or when warmed explicitly).
+
+"""
+import logging
+import threading
+
+from T0.WMBS.DAORegistry import getDAOFactory
+
+
+class NameIdCache(object):
+    """
+    _NameIdCache_
+
+    Name to id cache for one database
+
+    """
+    # table -> (insert DAO, bind name of the insert DAO)
+    insertDAOs = { 'stream' : ("RunConfig.InsertStream", 'STREAM'),
+                   'primary_dataset' : ("RunConfig.InsertPrimaryDataset", 'PRIMDS'),
+                   'trigger_label' : ("RunConfig.InsertTrigger", 'TRIG'),
+                   'cmssw_version' : ("RunConfig.InsertCMSSWVersion", 'VERSION') }
+
+    def __init__(self, dbinterface):
+        """
+        _init_
+
+        """
+        self.daoFactory = getDAOFactory(package = "T0.WMBS",
+                                        logger = logging,
+                                        dbinterface = dbinterface)
+
+        self.nameIds = {}
+        self.pending = {}
+
+        return
+
+    def warm(self, tables = None):
+        """
+        _warm_
+
+        Load the complete name to id mapping of the tables
+
+        """
+        getNameIdsDAO = self.daoFactory(classname = "RunConfig.GetNameIds")
+
+        for table in tables or self.insertDAOs.keys():
+            self.nameIds[table] = getNameIdsDAO.execute(table, transaction = False)
+            logging.debug("Loaded %d %s names into name to id cache" % (len(self.nameIds[table]), table))
+
+        return
+
+    def getIds(self, table, names, conn = None, transaction = False):
+        """
+        _getIds_
+
+        Return the name to id mapping for the names, inserting
+        names that don't exist yet. Call commit() or rollback()
+        after the surrounding transaction.
+
+        """
+        if table not in self.nameIds:
+            self.warm([ table ])
+
+        nameIds = {}
+        missing = set()
+        for name in names:
+            if name in self.nameIds[table]:
+                nameIds[name] = self.nameIds[table][name]
+            elif name in self.pending.get(table, {}):
+                nameIds[name] = self.pending[table][name]
+            else:
+                missing.add(name)
+
+        if len(missing) > 0:
+
+            daoName, bindName = self.insertDAOs[table]
+
+            insertDAO = self.daoFactory(classname = daoName)
+            insertDAO.execute([ { bindName : name } for name in sorted(missing) ],
+                              conn = conn, transaction = transaction)
+
+            getNameIdsDAO = self.daoFactory(classname = "RunConfig.GetNameIds")
+            newNameIds = getNameIdsDAO.execute(table, sorted(missing),
+                                               conn = conn, transaction = transaction)
+
+            if len(newNameIds) != len(missing):
+                raise RuntimeError("Problem in NameIdCache : can't find ids for %s names %s" % (table, sorted(missing - set(newNameIds.keys()))))
+
+            self.pending.setdefault(table, {}).update(newNameIds)
+            nameIds.update(newNameIds)
+
+        return nameIds
+
+    def commit(self):
+        """
+        _commit_
+
+        Add the ids of names inserted in the committed transaction
+
+        """
+        for table, nameIds in self.pending.items():
+            self.nameIds[table].update(nameIds)
+        self.pending = {}
+
+        return
+
+    def rollback(self):
+        """
+        _rollback_
+
+        Discard the ids of names inserted in the rolled back transaction
+
+        """
+        self.pending = {}
+
+        return
+
+
+_caches = {}
+_cachesLock = threading.Lock()
+
+
+def getNameIdCache(dbinterface):
+    """
+    _getNameIdCache_
+
+    Return the shared name to id cache for this database interface
+
+    """
+    # the cache holds a reference to the database
+    # interface, so its id can't be reused while cached
+    with _cachesLock:
+        cache = _caches.get(id(dbinterface))
+        if cache == None:
+            cache = NameIdCache(dbinterface)
+            _caches[id(dbinterface)] = cache
+
+    return cache
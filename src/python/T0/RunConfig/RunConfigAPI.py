@@ -8,14 +8,18 @@ import logging
 import threading
 import time
 
-from WMCore.DAOFactory import DAOFactory
+from T0.WMBS.DAORegistry import getDAOFactory
 
 from WMCore.WorkQueue.WMBSHelper import WMBSHelper
 from WMCore.WMBS.Fileset import Fileset
 
+from T0.RunConfig.Tier0Config import retrieveStreamConfig
 from T0.RunConfig.Tier0Config import retrieveDatasetConfig
-from T0.RunConfig.Tier0Config import addRepackConfig
+from T0.RunConfig.Tier0Config import applyRepackConfig
 from T0.RunConfig.Tier0Config import deleteStreamConfig
+from T0.RunConfig.Tier0Config import RunDependentParameter
+from T0.RunConfig.Tier0Config import ConfigOverlay
+from T0.RunConfig.NameIdCache import getNameIdCache
 
 from T0.WMSpec.StdSpecs.Repack import RepackWorkloadFactory
 from T0.WMSpec.StdSpecs.Express import ExpressWorkloadFactory
@@ -27,8 +31,13 @@ def extractConfigParameter(configParameter, era, run):
 
     Checks if configParameter is era or run dependent. If it is, use the
     provided era and run information to extract the correct parameter.
+
+    Parameters precompiled when loading the configuration
+    are resolved through their memoized lookup.
     """
-    if isinstance(configParameter, dict):
+    if isinstance(configParameter, RunDependentParameter):
+        return configParameter.resolve(era, run)
+    elif isinstance(configParameter, dict):
         if 'acqEra' in configParameter and era in configParameter['acqEra']:
             return configParameter['acqEra'][era]
         elif 'maxRun' in configParameter:
@@ -53,55 +62,106 @@ def configureRun(tier0Config, run, hltConfig, referenceHltConfig = None):
 
     """
     logging.debug("configureRun() : %d" % run)
-    myThread = threading.currentThread()
-
-    daoFactory = DAOFactory(package = "T0.WMBS",
-                            logger = logging,
-                            dbinterface = myThread.dbi)
-
-    # dao to update global run settings
-    insertStorageNodeDAO = daoFactory(classname = "RunConfig.InsertStorageNode")
-    updateRunDAO = daoFactory(classname = "RunConfig.UpdateRun")
 
     # workaround to make unit test work without HLTConfDatabase
     if hltConfig == None and referenceHltConfig != None:
         hltConfig = referenceHltConfig
 
+    runBinds = buildRunBinds(tier0Config, run, hltConfig)
+
+    insertRunBinds([ runBinds ])
+
+    return
+
+def configureRuns(tier0Config, runHltConfigs, chunkSize = 50):
+    """
+    _configureRuns_
+
+    Called by Tier0Feeder for new runs.
+
+    Bulk version of configureRun for a dictionary of run to
+    HLT configuration. Binds of up to chunkSize runs are merged
+    (shared stream, dataset and trigger names only inserted once)
+    and written in a single transaction. If a chunk fails, its runs
+    are configured one by one to isolate the problematic run.
+
+    Returns the list of successfully configured runs
+
+    """
+    logging.debug("configureRuns() : %d runs" % len(runHltConfigs))
+
+    configuredRuns = []
+
+    runs = sorted(runHltConfigs.keys())
+    for chunk in [ runs[i:i+chunkSize] for i in range(0, len(runs), chunkSize) ]:
+
+        chunkBinds = []
+        for run in chunk:
+            try:
+                chunkBinds.append(buildRunBinds(tier0Config, run, runHltConfigs[run]))
+            except Exception:
+                logging.exception("Can't configure for run %d" % run)
+
+        if len(chunkBinds) == 0:
+            continue
+
+        try:
+            insertRunBinds(chunkBinds)
+        except Exception:
+            if len(chunkBinds) == 1:
+                logging.exception("Can't configure for run %d" % chunkBinds[0]['run'])
+                continue
+            logging.error("Bulk configuration of runs %s failed, configuring them one by one" % [ x['run'] for x in chunkBinds ])
+            for runBinds in chunkBinds:
+                try:
+                    insertRunBinds([ runBinds ])
+                except Exception:
+                    logging.exception("Can't configure for run %d" % runBinds['run'])
+                else:
+                    configuredRuns.append(runBinds['run'])
+        else:
+            configuredRuns.extend([ x['run'] for x in chunkBinds ])
+
+    return configuredRuns
+
+def buildRunBinds(tier0Config, run, hltConfig):
+    """
+    _buildRunBinds_
+
+    Build the binds for the global run settings
+    and stream/dataset/trigger mapping of a run
+
+    """
+    runBinds = { 'run' : run,
+                 'StorageNode' : [],
+                 'UpdateRun' : [],
+                 'Stream' : [],
+                 'Dataset' : [],
+                 'StreamDataset' : [],
+                 'Trigger' : [],
+                 'DatasetTrigger' : [] }
+
     # treat centralDAQ or miniDAQ runs (have an HLT key) different from local runs
     if hltConfig != None:
 
-        # write stream/dataset/trigger mapping
-        insertStreamDAO = daoFactory(classname = "RunConfig.InsertStream")
-        insertDatasetDAO = daoFactory(classname = "RunConfig.InsertPrimaryDataset")
-        insertStreamDatasetDAO = daoFactory(classname = "RunConfig.InsertStreamDataset")
-        insertTriggerDAO = daoFactory(classname = "RunConfig.InsertTrigger")
-        insertDatasetTriggerDAO = daoFactory(classname = "RunConfig.InsertDatasetTrigger")
-
-        bindsStorageNode = []
         if tier0Config.Global.ExpressSubscribeNode:
-            bindsStorageNode.append( { 'NODE' : tier0Config.Global.ExpressSubscribeNode } )
-
-        bindsUpdateRun = { 'RUN' : run,
-                           'PROCESS' : hltConfig['process'],
-                           'ACQERA' : tier0Config.Global.AcquisitionEra,
-                           'BACKFILL' : tier0Config.Global.Backfill,
-                           'BULKDATATYPE' : tier0Config.Global.BulkDataType,
-                           'EXPRESS_SUBSCRIBE' : tier0Config.Global.ExpressSubscribeNode,
-                           'DQMUPLOADURL' : tier0Config.Global.DQMUploadUrl,
-                           'AHTIMEOUT' : tier0Config.Global.AlcaHarvestTimeout,
-                           'AHDIR' : tier0Config.Global.AlcaHarvestDir,
-                           'CONDTIMEOUT' : tier0Config.Global.ConditionUploadTimeout,
-                           'DBHOST' : tier0Config.Global.DropboxHost,
-                           'VALIDMODE' : tier0Config.Global.ValidationMode }
-
-        bindsStream = []
-        bindsDataset = []
-        bindsStreamDataset = []
-        bindsTrigger = []
-        bindsDatasetTrigger = []
+            runBinds['StorageNode'].append( { 'NODE' : tier0Config.Global.ExpressSubscribeNode } )
+
+        runBinds['UpdateRun'].append( { 'RUN' : run,
+                                        'PROCESS' : hltConfig['process'],
+                                        'ACQERA' : tier0Config.Global.AcquisitionEra,
+                                        'BACKFILL' : tier0Config.Global.Backfill,
+                                        'BULKDATATYPE' : tier0Config.Global.BulkDataType,
+                                        'EXPRESS_SUBSCRIBE' : tier0Config.Global.ExpressSubscribeNode,
+                                        'DQMUPLOADURL' : tier0Config.Global.DQMUploadUrl,
+                                        'AHTIMEOUT' : tier0Config.Global.AlcaHarvestTimeout,
+                                        'AHDIR' : tier0Config.Global.AlcaHarvestDir,
+                                        'CONDTIMEOUT' : tier0Config.Global.ConditionUploadTimeout,
+                                        'DBHOST' : tier0Config.Global.DropboxHost,
+                                        'VALIDMODE' : tier0Config.Global.ValidationMode } )
 
         for stream, datasetDict in hltConfig['mapping'].items():
-            bindsStream.append( { 'STREAM' : stream } )
+            runBinds['Stream'].append( { 'STREAM' : stream } )
             for dataset, paths in datasetDict.items():
 
                 if dataset == "Unassigned path":
@@ -112,59 +172,106 @@ def configureRun(tier0Config, run, hltConfig, referenceHltConfig = None):
                         raise RuntimeError("Problem in configureRun() : Unassigned path in HLT menu !")
 
                 else:
-                    bindsDataset.append( { 'PRIMDS' : dataset } )
-                    bindsStreamDataset.append( { 'RUN' : run,
-                                                 'PRIMDS' : dataset,
-                                                 'STREAM' : stream } )
+                    runBinds['Dataset'].append( { 'PRIMDS' : dataset } )
+                    runBinds['StreamDataset'].append( { 'RUN' : run,
+                                                        'PRIMDS' : dataset,
+                                                        'STREAM' : stream } )
                     for path in paths:
-                        bindsTrigger.append( { 'TRIG' : path } )
-                        bindsDatasetTrigger.append( { 'RUN' : run,
-                                                      'TRIG' : path,
-                                                      'PRIMDS' : dataset } )
-
-        try:
-            myThread.transaction.begin()
-            if len(bindsStorageNode) > 0:
-                insertStorageNodeDAO.execute(bindsStorageNode, conn = myThread.transaction.conn, transaction = True)
-            updateRunDAO.execute(bindsUpdateRun, conn = myThread.transaction.conn, transaction = True)
-            insertStreamDAO.execute(bindsStream, conn = myThread.transaction.conn, transaction = True)
-            insertDatasetDAO.execute(bindsDataset, conn = myThread.transaction.conn, transaction = True)
-            insertStreamDatasetDAO.execute(bindsStreamDataset, conn = myThread.transaction.conn, transaction = True)
-            insertTriggerDAO.execute(bindsTrigger, conn = myThread.transaction.conn, transaction = True)
-            insertDatasetTriggerDAO.execute(bindsDatasetTrigger, conn = myThread.transaction.conn, transaction = True)
-        except Exception as ex:
-            logging.exception(ex)
-            myThread.transaction.rollback()
-            raise RuntimeError("Problem in configureRun() database transaction !")
-        else:
-            myThread.transaction.commit()
+                        runBinds['Trigger'].append( { 'TRIG' : path } )
+                        runBinds['DatasetTrigger'].append( { 'RUN' : run,
+                                                             'TRIG' : path,
+                                                             'PRIMDS' : dataset } )
 
     else:
 
-        bindsUpdateRun = { 'RUN' : run,
-                           'PROCESS' : "FakeProcessName",
-                           'ACQERA' : "FakeAcquisitionEra",
-                           'BACKFILL' : None,
-                           'BULKDATATYPE' : "FakeBulkDataType",
-                           'AHTIMEOUT' : None,
-                           'AHDIR' : None,
-                           'CONDTIMEOUT' : None,
-                           'DBHOST' : None,
-                           'VALIDMODE' : None }
+        runBinds['UpdateRun'].append( { 'RUN' : run,
+                                        'PROCESS' : "FakeProcessName",
+                                        'ACQERA' : "FakeAcquisitionEra",
+                                        'BACKFILL' : None,
+                                        'BULKDATATYPE' : "FakeBulkDataType",
+                                        'EXPRESS_SUBSCRIBE' : None,
+                                        'DQMUPLOADURL' : None,
+                                        'AHTIMEOUT' : None,
+                                        'AHDIR' : None,
+                                        'CONDTIMEOUT' : None,
+                                        'DBHOST' : None,
+                                        'VALIDMODE' : None } )
+
+    return runBinds
+
+def insertRunBinds(runBindsList):
+    """
+    _insertRunBinds_
 
-        try:
-            myThread.transaction.begin()
-            updateRunDAO.execute(bindsUpdateRun, conn = myThread.transaction.conn, transaction = True)
-        except Exception as ex:
-            logging.exception(ex)
-            myThread.transaction.rollback()
-            raise RuntimeError("Problem in configureRun() database transaction !")
-        else:
-            myThread.transaction.commit()
+    Merge the binds of several runs, removing duplicates, and
+    write them to the database in a single transaction
+
+    Stream, primary dataset and trigger names are resolved to ids
+    through the name to id cache, only new names are inserted
+
+    """
+    myThread = threading.currentThread()
+
+    daoFactory = getDAOFactory(package = "T0.WMBS",
+                               logger = logging,
+                               dbinterface = myThread.dbi)
+
+    insertStorageNodeDAO = daoFactory(classname = "RunConfig.InsertStorageNode")
+    updateRunDAO = daoFactory(classname = "RunConfig.UpdateRun")
+    insertStreamDatasetDAO = daoFactory(classname = "RunConfig.InsertStreamDatasetById")
+    insertDatasetTriggerDAO = daoFactory(classname = "RunConfig.InsertDatasetTriggerById")
+
+    nameIdCache = getNameIdCache(myThread.dbi)
+
+    def mergeBinds(name):
+        binds = []
+        seen = set()
+        for runBinds in runBindsList:
+            for bind in runBinds[name]:
+                key = tuple(sorted(bind.items()))
+                if key not in seen:
+                    seen.add(key)
+                    binds.append(bind)
+        return binds
+
+    bindsStorageNode = mergeBinds('StorageNode')
+    bindsUpdateRun = mergeBinds('UpdateRun')
+    bindsStreamDataset = mergeBinds('StreamDataset')
+    bindsDatasetTrigger = mergeBinds('DatasetTrigger')
+
+    try:
+        myThread.transaction.begin()
+        if len(bindsStorageNode) > 0:
+            insertStorageNodeDAO.execute(bindsStorageNode, conn = myThread.transaction.conn, transaction = True)
+        updateRunDAO.execute(bindsUpdateRun, conn = myThread.transaction.conn, transaction = True)
+        streamIds = nameIdCache.getIds("stream", set([ x['STREAM'] for x in mergeBinds('Stream') ]),
+                                       conn = myThread.transaction.conn, transaction = True)
+        datasetIds = nameIdCache.getIds("primary_dataset", set([ x['PRIMDS'] for x in mergeBinds('Dataset') ]),
+                                        conn = myThread.transaction.conn, transaction = True)
+        triggerIds = nameIdCache.getIds("trigger_label", set([ x['TRIG'] for x in mergeBinds('Trigger') ]),
+                                        conn = myThread.transaction.conn, transaction = True)
+        if len(bindsStreamDataset) > 0:
+            insertStreamDatasetDAO.execute([ { 'RUN' : x['RUN'],
+                                               'PRIMDS_ID' : datasetIds[x['PRIMDS']],
+                                               'STREAM_ID' : streamIds[x['STREAM']] } for x in bindsStreamDataset ],
+                                           conn = myThread.transaction.conn, transaction = True)
+        if len(bindsDatasetTrigger) > 0:
+            insertDatasetTriggerDAO.execute([ { 'RUN' : x['RUN'],
+                                                'TRIG_ID' : triggerIds[x['TRIG']],
+                                                'PRIMDS_ID' : datasetIds[x['PRIMDS']] } for x in bindsDatasetTrigger ],
+                                            conn = myThread.transaction.conn, transaction = True)
+    except Exception as ex:
+        logging.exception(ex)
+        myThread.transaction.rollback()
+        nameIdCache.rollback()
+        raise RuntimeError("Problem in configureRun() database transaction !")
+    else:
+        myThread.transaction.commit()
+        nameIdCache.commit()
 
     return
 
-def configureRunStream(tier0Config, run, stream, specDirectory, dqmUploadProxy):
+def configureRunStream(tier0Config, run, stream, specDirectory, dqmUploadProxy, templateCache = None):
     """
     _configureRunStream_
 
@@ -177,13 +284,95 @@ def configureRunStream(tier0Config, run, stream, specDirectory, dqmUploadProxy):
     Create workflows, filesets and subscriptions for
     the processing of runs/streams.
 
+    The workloads are stamped out from cached templates
+    if a WorkloadTemplateCache is passed in.
+
     """
     logging.debug("configureRunStream() : %d , %s" % (run, stream))
+
+    runStreamConfig = prepareRunStream(tier0Config, run, stream, dqmUploadProxy)
+
+    # should we do anything for local runs ?
+    if runStreamConfig == None:
+        return
+
+    wmSpec = None
+    if runStreamConfig['specRequest'] != None:
+        wmSpec = buildSpec(runStreamConfig['specRequest'], templateCache)
+
+    commitRunStream(runStreamConfig, wmSpec, specDirectory)
+
+    return
+
+def configureRunStreams(tier0Config, runStreams, specDirectory, dqmUploadProxy,
+                        templateCache = None, specBuilderPool = None):
+    """
+    _configureRunStreams_
+
+    Called by Tier0Feeder for all new run/streams of a cycle.
+
+    Same as calling configureRunStream for every run/stream, but
+    the configurations of all run/streams are prepared first and
+    the workloads are then built together, in specBuilderPool (a
+    multiprocessing pool) if given. Only the database writes and
+    WMBS subscription creation happen in the calling thread.
+
+    Failures only affect the failing run/stream, returns
+    the list of configured (run, stream) tuples.
+
+    """
+    runStreamConfigs = []
+    for run in sorted(runStreams.keys()):
+        for stream in sorted(runStreams[run]):
+            try:
+                runStreamConfig = prepareRunStream(tier0Config, run, stream, dqmUploadProxy)
+            except Exception:
+                logging.exception("Can't configure for run %d and stream %s" % (run, stream))
+            else:
+                if runStreamConfig != None:
+                    runStreamConfigs.append(runStreamConfig)
+
+    specRequests = [ x['specRequest'] for x in runStreamConfigs if x['specRequest'] != None ]
+    wmSpecs = buildSpecs(specRequests, templateCache, specBuilderPool)
+
+    configured = []
+    for runStreamConfig in runStreamConfigs:
+
+        run = runStreamConfig['run']
+        stream = runStreamConfig['stream']
+
+        wmSpec = None
+        if runStreamConfig['specRequest'] != None:
+            wmSpec = wmSpecs.get(runStreamConfig['specRequest']['workflowName'])
+            if wmSpec == None:
+                logging.error("Can't configure for run %d and stream %s, no workload" % (run, stream))
+                continue
+
+        try:
+            commitRunStream(runStreamConfig, wmSpec, specDirectory)
+        except Exception:
+            logging.exception("Can't configure for run %d and stream %s" % (run, stream))
+        else:
+            configured.append((run, stream))
+
+    return configured
+
+def prepareRunStream(tier0Config, run, stream, dqmUploadProxy):
+    """
+    _prepareRunStream_
+
+    Retrieve global run settings and build the part of the
+    configuration relevant to run/stream, the database binds
+    and the spec request for the workload.
+
+    Returns None for local runs.
+
+    """
     myThread = threading.currentThread()
 
-    daoFactory = DAOFactory(package = "T0.WMBS",
-                            logger = logging,
-                            dbinterface = myThread.dbi)
+    daoFactory = getDAOFactory(package = "T0.WMBS",
+                               logger = logging,
+                               dbinterface = myThread.dbi)
 
     # retrieve some basic run information
     getRunInfoDAO = daoFactory(classname = "RunConfig.GetRunInfo")
@@ -192,11 +381,13 @@ def configureRunStream(tier0Config, run, stream, specDirectory, dqmUploadProxy):
     # treat centralDAQ or miniDAQ runs (have an HLT key) different from local runs
     if runInfo['hltkey'] != None:
 
+        # work on an overlay, the run dependent settings are resolved
+        # in it and the configuration is reused for many runs/cycles
+        streamConfig = ConfigOverlay(retrieveStreamConfig(tier0Config, stream))
+
         # streams not explicitely configured are repacked
         if stream not in tier0Config.Streams.dictionary_().keys():
-            addRepackConfig(tier0Config, stream)
-
-        streamConfig = tier0Config.Streams.dictionary_()[stream]
+            applyRepackConfig(streamConfig)
 
         # consistency check to make sure stream exists and has datasets defined
         # only run if we don't ignore the stream
@@ -206,27 +397,6 @@ def configureRunStream(tier0Config, run, stream, specDirectory, dqmUploadProxy):
             if len(datasets) == 0:
                 raise RuntimeError("Stream is not defined in HLT menu or has no datasets !")
 
-        # write run/stream processing completion record
-        insertRunStreamDoneDAO = daoFactory(classname = "RunConfig.InsertRunStreamDone")
-
-        # write stream/dataset mapping (for special express and error datasets)
-        insertDatasetDAO = daoFactory(classname = "RunConfig.InsertPrimaryDataset")
-        insertStreamDatasetDAO = daoFactory(classname = "RunConfig.InsertStreamDataset")
-
-        # write stream configuration
-        insertCMSSWVersionDAO = daoFactory(classname = "RunConfig.InsertCMSSWVersion")
-        insertStreamStyleDAO = daoFactory(classname = "RunConfig.InsertStreamStyle")
-        insertRepackConfigDAO = daoFactory(classname = "RunConfig.InsertRepackConfig")
-        insertPromptCalibrationDAO = daoFactory(classname = "RunConfig.InsertPromptCalibration")
-        insertExpressConfigDAO = daoFactory(classname = "RunConfig.InsertExpressConfig")
-        insertSpecialDatasetDAO = daoFactory(classname = "RunConfig.InsertSpecialDataset")
-        insertDatasetScenarioDAO = daoFactory(classname = "RunConfig.InsertDatasetScenario")
-        insertStreamFilesetDAO = daoFactory(classname = "RunConfig.InsertStreamFileset")
-        insertRecoReleaseConfigDAO = daoFactory(classname = "RunConfig.InsertRecoReleaseConfig")
-        insertWorkflowMonitoringDAO = daoFactory(classname = "RunConfig.InsertWorkflowMonitoring")
-        insertStorageNodeDAO = daoFactory(classname = "RunConfig.InsertStorageNode")
-        insertPhEDExConfigDAO = daoFactory(classname = "RunConfig.InsertPhEDExConfig")
-
         bindsRunStreamDone = {'RUN' : run,
                               'STREAM' : stream}
         bindsCMSSWVersion = []
@@ -497,6 +667,7 @@ def configureRunStream(tier0Config, run, stream, specDirectory, dqmUploadProxy):
         # finally create WMSpec
         #
         outputs = {}
+        taskName = None
         if streamConfig.ProcessingStyle == "Bulk":
 
             taskName = "Repack"
@@ -521,6 +692,7 @@ def configureRunStream(tier0Config, run, stream, specDirectory, dqmUploadProxy):
             specArguments['MaxInputEvents'] = streamConfig.Repack.MaxInputEvents
             specArguments['MaxInputFiles'] = streamConfig.Repack.MaxInputFiles
             specArguments['MaxLatency'] = streamConfig.Repack.MaxLatency
+            specArguments['UseLumiCursor'] = streamConfig.Repack.UseLumiCursor
 
             # parameters for repack direct to merge stageout
             specArguments['MinMergeSize'] = streamConfig.Repack.MinInputSize
@@ -608,85 +780,255 @@ def configureRunStream(tier0Config, run, stream, specDirectory, dqmUploadProxy):
             specArguments['SiteWhitelist'] = [ tier0Config.Global.ProcessingSite ]
             specArguments['SiteBlacklist'] = []
 
+        specRequest = None
         if streamConfig.ProcessingStyle == "Bulk":
-            factory = RepackWorkloadFactory()
-            wmSpec = factory.factoryWorkloadConstruction(workflowName, specArguments)
-            for subscription in subscriptions:
-                wmSpec.setSubscriptionInformation(**subscription)
+            specRequest = { 'factoryClass' : RepackWorkloadFactory,
+                            'workflowName' : workflowName,
+                            'specArguments' : specArguments,
+                            'subscriptions' : subscriptions,
+                            'run' : run }
         elif streamConfig.ProcessingStyle == "Express":
-            factory = ExpressWorkloadFactory()
-            wmSpec = factory.factoryWorkloadConstruction(workflowName, specArguments)
-            for subscription in subscriptions:
-                wmSpec.setSubscriptionInformation(**subscription)
+            specRequest = { 'factoryClass' : ExpressWorkloadFactory,
+                            'workflowName' : workflowName,
+                            'specArguments' : specArguments,
+                            'subscriptions' : subscriptions,
+                            'run' : run }
+
+        return { 'run' : run,
+                 'stream' : stream,
+                 'processingStyle' : streamConfig.ProcessingStyle,
+                 'taskName' : taskName,
+                 'specRequest' : specRequest,
+                 'bindsRunStreamDone' : bindsRunStreamDone,
+                 'bindsCMSSWVersion' : bindsCMSSWVersion,
+                 'bindsDataset' : bindsDataset,
+                 'bindsStreamDataset' : bindsStreamDataset,
+                 'bindsStreamStyle' : bindsStreamStyle,
+                 'bindsRepackConfig' : bindsRepackConfig,
+                 'bindsPromptCalibration' : bindsPromptCalibration,
+                 'bindsExpressConfig' : bindsExpressConfig,
+                 'bindsSpecialDataset' : bindsSpecialDataset,
+                 'bindsDatasetScenario' : bindsDatasetScenario,
+                 'bindsStorageNode' : bindsStorageNode,
+                 'bindsPhEDExConfig' : bindsPhEDExConfig }
+
+    return None
+
+def commitRunStream(runStreamConfig, wmSpec, specDirectory):
+    """
+    _commitRunStream_
 
-        if streamConfig.ProcessingStyle in [ 'Bulk', 'Express' ]:
-            wmSpec.setOwnerDetails("Dirk.Hufnagel@cern.ch", "T0",
-                                   { 'vogroup': 'DEFAULT', 'vorole': 'DEFAULT',
-                                     'dn' : "Dirk.Hufnagel@cern.ch" } )
+    Write the run/stream configuration prepared by prepareRunStream
+    to the database and create the workflow, fileset and subscription
+    for the workload (None for ignored streams).
 
-            wmSpec.setupPerformanceMonitoring(maxRSS = 1024 * specArguments['Memory'] + 10,
-                                              maxVSize = 104857600, #100GB, effectively disabled
-                                              softTimeout = 604800, #7 days, effectively disabled
-                                              gracePeriod = 3600)
+    """
+    myThread = threading.currentThread()
 
-            wmbsHelper = WMBSHelper(wmSpec, taskName, cachepath = specDirectory)
+    daoFactory = getDAOFactory(package = "T0.WMBS",
+                               logger = logging,
+                               dbinterface = myThread.dbi)
+
+    # write run/stream processing completion record
+    insertRunStreamDoneDAO = daoFactory(classname = "RunConfig.InsertRunStreamDone")
+
+    # write stream/dataset mapping (for special express and error datasets)
+    insertDatasetDAO = daoFactory(classname = "RunConfig.InsertPrimaryDataset")
+    insertStreamDatasetDAO = daoFactory(classname = "RunConfig.InsertStreamDataset")
+
+    # write stream configuration
+    # only CMSSW versions not known yet are inserted
+    nameIdCache = getNameIdCache(myThread.dbi)
+    insertStreamStyleDAO = daoFactory(classname = "RunConfig.InsertStreamStyle")
+    insertRepackConfigDAO = daoFactory(classname = "RunConfig.InsertRepackConfig")
+    insertPromptCalibrationDAO = daoFactory(classname = "RunConfig.InsertPromptCalibration")
+    insertExpressConfigDAO = daoFactory(classname = "RunConfig.InsertExpressConfig")
+    insertSpecialDatasetDAO = daoFactory(classname = "RunConfig.InsertSpecialDataset")
+    insertDatasetScenarioDAO = daoFactory(classname = "RunConfig.InsertDatasetScenario")
+    insertStreamFilesetDAO = daoFactory(classname = "RunConfig.InsertStreamFileset")
+    insertRecoReleaseConfigDAO = daoFactory(classname = "RunConfig.InsertRecoReleaseConfig")
+    insertWorkflowMonitoringDAO = daoFactory(classname = "RunConfig.InsertWorkflowMonitoring")
+    insertStorageNodeDAO = daoFactory(classname = "RunConfig.InsertStorageNode")
+    insertPhEDExConfigDAO = daoFactory(classname = "RunConfig.InsertPhEDExConfig")
 
-        filesetName = "Run%d_Stream%s" % (run, stream)
-        fileset = Fileset(filesetName)
+    run = runStreamConfig['run']
+    stream = runStreamConfig['stream']
+    processingStyle = runStreamConfig['processingStyle']
+    taskName = runStreamConfig['taskName']
+
+    bindsRunStreamDone = runStreamConfig['bindsRunStreamDone']
+    bindsCMSSWVersion = runStreamConfig['bindsCMSSWVersion']
+    bindsDataset = runStreamConfig['bindsDataset']
+    bindsStreamDataset = runStreamConfig['bindsStreamDataset']
+    bindsStreamStyle = runStreamConfig['bindsStreamStyle']
+    bindsRepackConfig = runStreamConfig['bindsRepackConfig']
+    bindsPromptCalibration = runStreamConfig['bindsPromptCalibration']
+    bindsExpressConfig = runStreamConfig['bindsExpressConfig']
+    bindsSpecialDataset = runStreamConfig['bindsSpecialDataset']
+    bindsDatasetScenario = runStreamConfig['bindsDatasetScenario']
+    bindsStorageNode = runStreamConfig['bindsStorageNode']
+    bindsPhEDExConfig = runStreamConfig['bindsPhEDExConfig']
+
+    if processingStyle in [ 'Bulk', 'Express' ]:
+        wmbsHelper = WMBSHelper(wmSpec, taskName, cachepath = specDirectory)
+
+    filesetName = "Run%d_Stream%s" % (run, stream)
+    fileset = Fileset(filesetName)
 
-        #
-        # create workflow (currently either repack or express)
-        #
-        try:
-            myThread.transaction.begin()
-            if len(bindsCMSSWVersion) > 0:
-                insertCMSSWVersionDAO.execute(bindsCMSSWVersion, conn = myThread.transaction.conn, transaction = True)
-            if len(bindsDataset) > 0:
-                insertDatasetDAO.execute(bindsDataset, conn = myThread.transaction.conn, transaction = True)
-            if len(bindsStreamDataset) > 0:
-                insertStreamDatasetDAO.execute(bindsStreamDataset, conn = myThread.transaction.conn, transaction = True)
-            if len(bindsRepackConfig) > 0:
-                insertRepackConfigDAO.execute(bindsRepackConfig, conn = myThread.transaction.conn, transaction = True)
-            if len(bindsPromptCalibration) > 0:
-                insertPromptCalibrationDAO.execute(bindsPromptCalibration, conn = myThread.transaction.conn, transaction = True)
-            if len(bindsExpressConfig) > 0:
-                insertExpressConfigDAO.execute(bindsExpressConfig, conn = myThread.transaction.conn, transaction = True)
-            if len(bindsSpecialDataset) > 0:
-                insertSpecialDatasetDAO.execute(bindsSpecialDataset, conn = myThread.transaction.conn, transaction = True)
-            if len(bindsDatasetScenario) > 0:
-                insertDatasetScenarioDAO.execute(bindsDatasetScenario, conn = myThread.transaction.conn, transaction = True)
-            if len(bindsStorageNode) > 0:
-                insertStorageNodeDAO.execute(bindsStorageNode, conn = myThread.transaction.conn, transaction = True)
-            if len(bindsPhEDExConfig) > 0:
-                insertPhEDExConfigDAO.execute(bindsPhEDExConfig, conn = myThread.transaction.conn, transaction = True)
-            insertRunStreamDoneDAO.execute(bindsRunStreamDone, conn = myThread.transaction.conn, transaction = True)
-            insertStreamStyleDAO.execute(bindsStreamStyle, conn = myThread.transaction.conn, transaction = True)
-            if streamConfig.ProcessingStyle in [ 'Bulk', 'Express' ]:
-                insertStreamFilesetDAO.execute(run, stream, filesetName, conn = myThread.transaction.conn, transaction = True)
-                fileset.load()
-                wmbsHelper.createSubscription(wmSpec.getTask(taskName), fileset, alternativeFilesetClose = True)
-                insertWorkflowMonitoringDAO.execute([fileset.id],  conn = myThread.transaction.conn, transaction = True)
-            if streamConfig.ProcessingStyle == "Bulk":
-                bindsRecoReleaseConfig = []
-                for fileset, primds in wmbsHelper.getMergeOutputMapping().items():
-                    bindsRecoReleaseConfig.append( { 'RUN' : run,
-                                                     'PRIMDS' : primds,
-                                                     'FILESET' : fileset } )
-                insertRecoReleaseConfigDAO.execute(bindsRecoReleaseConfig, conn = myThread.transaction.conn, transaction = True)
-        except Exception as ex:
-            logging.exception(ex)
-            myThread.transaction.rollback()
-            raise RuntimeError("Problem in configureRunStream() database transaction !")
-        else:
-            myThread.transaction.commit()
+    #
+    # create workflow (currently either repack or express)
+    #
+    try:
+        myThread.transaction.begin()
+        if len(bindsCMSSWVersion) > 0:
+            nameIdCache.getIds("cmssw_version", [ x['VERSION'] for x in bindsCMSSWVersion ],
+                               conn = myThread.transaction.conn, transaction = True)
+        if len(bindsDataset) > 0:
+            insertDatasetDAO.execute(bindsDataset, conn = myThread.transaction.conn, transaction = True)
+        if len(bindsStreamDataset) > 0:
+            insertStreamDatasetDAO.execute(bindsStreamDataset, conn = myThread.transaction.conn, transaction = True)
+        if len(bindsRepackConfig) > 0:
+            insertRepackConfigDAO.execute(bindsRepackConfig, conn = myThread.transaction.conn, transaction = True)
+        if len(bindsPromptCalibration) > 0:
+            insertPromptCalibrationDAO.execute(bindsPromptCalibration, conn = myThread.transaction.conn, transaction = True)
+        if len(bindsExpressConfig) > 0:
+            insertExpressConfigDAO.execute(bindsExpressConfig, conn = myThread.transaction.conn, transaction = True)
+        if len(bindsSpecialDataset) > 0:
+            insertSpecialDatasetDAO.execute(bindsSpecialDataset, conn = myThread.transaction.conn, transaction = True)
+        if len(bindsDatasetScenario) > 0:
+            insertDatasetScenarioDAO.execute(bindsDatasetScenario, conn = myThread.transaction.conn, transaction = True)
+        if len(bindsStorageNode) > 0:
+            insertStorageNodeDAO.execute(bindsStorageNode, conn = myThread.transaction.conn, transaction = True)
+        if len(bindsPhEDExConfig) > 0:
+            insertPhEDExConfigDAO.execute(bindsPhEDExConfig, conn = myThread.transaction.conn, transaction = True)
+        insertRunStreamDoneDAO.execute(bindsRunStreamDone, conn = myThread.transaction.conn, transaction = True)
+        insertStreamStyleDAO.execute(bindsStreamStyle, conn = myThread.transaction.conn, transaction = True)
+        if processingStyle in [ 'Bulk', 'Express' ]:
+            insertStreamFilesetDAO.execute(run, stream, filesetName, conn = myThread.transaction.conn, transaction = True)
+            fileset.load()
+            wmbsHelper.createSubscription(wmSpec.getTask(taskName), fileset, alternativeFilesetClose = True)
+            insertWorkflowMonitoringDAO.execute([fileset.id],  conn = myThread.transaction.conn, transaction = True)
+        if processingStyle == "Bulk":
+            bindsRecoReleaseConfig = []
+            for fileset, primds in wmbsHelper.getMergeOutputMapping().items():
+                bindsRecoReleaseConfig.append( { 'RUN' : run,
+                                                 'PRIMDS' : primds,
+                                                 'FILESET' : fileset } )
+            insertRecoReleaseConfigDAO.execute(bindsRecoReleaseConfig, conn = myThread.transaction.conn, transaction = True)
+    except Exception as ex:
+        logging.exception(ex)
+        myThread.transaction.rollback()
+        nameIdCache.rollback()
+        raise RuntimeError("Problem in configureRunStream() database transaction !")
+    else:
+        myThread.transaction.commit()
+        nameIdCache.commit()
 
+    return
+
+def buildSpec(specRequest, templateCache = None):
+    """
+    _buildSpec_
+
+    Build the workload for a spec request (factory class, workflow
+    name, spec arguments, subscriptions and run), with the spec
+    factory or stamped out from a cached template
+
+    """
+    factoryClass = specRequest['factoryClass']
+    workflowName = specRequest['workflowName']
+    specArguments = specRequest['specArguments']
+
+    if templateCache != None:
+        wmSpec = templateCache.getWorkload(factoryClass, workflowName, specArguments, specRequest['run'])
     else:
+        factory = factoryClass()
+        wmSpec = factory.factoryWorkloadConstruction(workflowName, specArguments)
+
+    for subscription in specRequest['subscriptions']:
+        wmSpec.setSubscriptionInformation(**subscription)
+
+    wmSpec.setOwnerDetails("Dirk.Hufnagel@cern.ch", "T0",
+                           { 'vogroup': 'DEFAULT', 'vorole': 'DEFAULT',
+                             'dn' : "Dirk.Hufnagel@cern.ch" } )
+
+    wmSpec.setupPerformanceMonitoring(maxRSS = 1024 * specArguments['Memory'] + 10,
+                                      maxVSize = 104857600, #100GB, effectively disabled
+                                      softTimeout = 604800, #7 days, effectively disabled
+                                      gracePeriod = 3600)
+
+    return wmSpec
+
+def initSpecBuilderProcess():
+    """
+    _initSpecBuilderProcess_
+
+    Initializer for the processes of a spec builder pool
+
+    The processes are forked from the multi threaded Tier0Feeder,
+    locks held by another thread at fork time stay locked forever
+    in the child, so the logging locks are recreated here.
+
+    The processes also inherit the open database connections of the
+    Tier0Feeder, which are shared with it at the socket level. They
+    must never touch them (myThread.dbi, transactions, DAOs), spec
+    building is pure computation on the spec request.
+
+    """
+    if hasattr(logging, "_lock"):
+        logging._lock = threading.RLock()
+
+    loggers = [ logging.getLogger() ]
+    loggers.extend([ x for x in logging.Logger.manager.loggerDict.values() if isinstance(x, logging.Logger) ])
+    for logger in loggers:
+        for handler in logger.handlers:
+            handler.createLock()
 
-        # should we do anything for local runs ?
-        pass
     return
 
-def releasePromptReco(tier0Config, specDirectory, dqmUploadProxy):
+def buildSpecInProcess(specRequest):
+    """
+    _buildSpecInProcess_
+
+    buildSpec for a process pool, failures are
+    logged and returned as None. Never uses the
+    database, see initSpecBuilderProcess.
+
+    """
+    try:
+        return buildSpec(specRequest)
+    except Exception:
+        logging.exception("Can't build workload %s" % specRequest['workflowName'])
+        return None
+
+def buildSpecs(specRequests, templateCache = None, specBuilderPool = None):
+    """
+    _buildSpecs_
+
+    Build the workloads for a list of spec requests, in parallel if a
+    multiprocessing pool is given (the template cache only lives in
+    this process and is not used then). Returns a dictionary with the
+    workloads by workflow name, failed workloads are missing.
+
+    """
+    wmSpecs = {}
+
+    if specBuilderPool != None and len(specRequests) > 1:
+        results = specBuilderPool.map(buildSpecInProcess, specRequests, 1)
+        for specRequest, wmSpec in zip(specRequests, results):
+            if wmSpec != None:
+                wmSpecs[specRequest['workflowName']] = wmSpec
+    else:
+        for specRequest in specRequests:
+            try:
+                wmSpecs[specRequest['workflowName']] = buildSpec(specRequest, templateCache)
+            except Exception:
+                logging.exception("Can't build workload %s" % specRequest['workflowName'])
+
+    return wmSpecs
+
+def releasePromptReco(tier0Config, specDirectory, dqmUploadProxy, templateCache = None, specBuilderPool = None,
+                      maxReleaseRuns = 1):
     """
     _releasePromptReco_
 
@@ -698,18 +1040,25 @@ def releasePromptReco(tier0Config, specDirectory, dqmUploadProxy):
     Create workflows and subscriptions for the processing
     of runs/datasets.
 
+    Up to maxReleaseRuns runs (all if 0) are pre-released
+    per call, strictly in run order.
+
+    The workloads are stamped out from cached templates
+    if a WorkloadTemplateCache is passed in and built in
+    specBuilderPool (a multiprocessing pool) if given.
+
     """
     logging.debug("releasePromptReco()")
     myThread = threading.currentThread()
 
-    daoFactory = DAOFactory(package = "T0.WMBS",
-                            logger = logging,
-                            dbinterface = myThread.dbi)
+    daoFactory = getDAOFactory(package = "T0.WMBS",
+                               logger = logging,
+                               dbinterface = myThread.dbi)
 
     findRecoReleaseDatasetsDAO = daoFactory(classname = "RunConfig.FindRecoReleaseDatasets")
     findRecoReleaseDAO = daoFactory(classname = "RunConfig.FindRecoRelease")
     insertDatasetScenarioDAO = daoFactory(classname = "RunConfig.InsertDatasetScenario")
-    insertCMSSWVersionDAO = daoFactory(classname = "RunConfig.InsertCMSSWVersion")
+    nameIdCache = getNameIdCache(myThread.dbi)
     insertRecoConfigDAO = daoFactory(classname = "RunConfig.InsertRecoConfig")
     insertStorageNodeDAO = daoFactory(classname = "RunConfig.InsertStorageNode")
     insertPhEDExConfigDAO = daoFactory(classname = "RunConfig.InsertPhEDExConfig")
@@ -717,9 +1066,9 @@ def releasePromptReco(tier0Config, specDirectory, dqmUploadProxy):
     insertWorkflowMonitoringDAO = daoFactory(classname = "RunConfig.InsertWorkflowMonitoring")
 
     # mark workflows as injected
-    wmbsDaoFactory = DAOFactory(package = "WMCore.WMBS",
-                                logger = logging,
-                                dbinterface = myThread.dbi)
+    wmbsDaoFactory = getDAOFactory(package = "WMCore.WMBS",
+                                   logger = logging,
+                                   dbinterface = myThread.dbi)
     markWorkflowsInjectedDAO   = wmbsDaoFactory(classname = "Workflow.MarkInjectedWorkflows")
 
     #
@@ -727,15 +1076,28 @@ def releasePromptReco(tier0Config, specDirectory, dqmUploadProxy):
     #
     recoReleaseDatasets = findRecoReleaseDatasetsDAO.execute(transaction = False)
 
+    datasetConfigs = {}
     datasetDelays = {}
     for dataset in recoReleaseDatasets:
-        datasetConfig = retrieveDatasetConfig(tier0Config, dataset)
-        datasetDelays[dataset] = (datasetConfig.RecoDelay, datasetConfig.RecoDelayOffset)
+        datasetConfigs[dataset] = retrieveDatasetConfig(tier0Config, dataset)
+        datasetDelays[dataset] = (datasetConfigs[dataset].RecoDelay, datasetConfigs[dataset].RecoDelayOffset)
+
+    recoRelease = findRecoReleaseDAO.execute(datasetDelays, maxRuns = maxReleaseRuns, transaction = False)
+    if len(recoRelease) == 0:
+        return
+
+    # retrieve basic run information and phedex configs for all runs at once
+    getRunsInfoDAO = daoFactory(classname = "RunConfig.GetRunsInfo")
+    runsInfo = getRunsInfoDAO.execute(recoRelease.keys(), transaction = False)
+
+    getRunsPhEDExConfigDAO = daoFactory(classname = "RunConfig.GetRunsPhEDExConfig")
+    runsPhEDExConfigs = getRunsPhEDExConfigDAO.execute(recoRelease.keys(), transaction = False)
 
-    recoRelease = findRecoReleaseDAO.execute(datasetDelays, transaction = False)
     for run in sorted(recoRelease.keys()):
 
         # for creating PromptReco specs
+        specRequests = []
+        recoFilesets = {}
         recoSpecs = {}
 
         # for PhEDEx subscription settings
@@ -747,13 +1109,8 @@ def releasePromptReco(tier0Config, specDirectory, dqmUploadProxy):
         bindsStorageNode = []
         bindsReleasePromptReco = []
 
-        # retrieve some basic run information
-        getRunInfoDAO = daoFactory(classname = "RunConfig.GetRunInfo")
-        runInfo = getRunInfoDAO.execute(run, transaction = False)[0]
-
-        # retrieve phedex configs for run
-        getPhEDExConfigDAO = daoFactory(classname = "RunConfig.GetPhEDExConfig")
-        phedexConfigs = getPhEDExConfigDAO.execute(run, transaction = False)
+        runInfo = runsInfo[run]
+        phedexConfigs = runsPhEDExConfigs[run]
 
         for (dataset, fileset, repackProcVer) in recoRelease[run]:
 
@@ -761,7 +1118,11 @@ def releasePromptReco(tier0Config, specDirectory, dqmUploadProxy):
                                              'PRIMDS' : dataset,
                                              'NOW' : int(time.time()) } )
 
-            datasetConfig = retrieveDatasetConfig(tier0Config, dataset)
+            # work on an overlay, the run dependent settings are resolved
+            # in it and the configuration is reused for many runs/cycles
+            if dataset not in datasetConfigs:
+                datasetConfigs[dataset] = retrieveDatasetConfig(tier0Config, dataset)
+            datasetConfig = ConfigOverlay(datasetConfigs[dataset])
 
             bindsDatasetScenario.append( { 'RUN' : run,
                                            'PRIMDS' : dataset,
@@ -1006,30 +1367,29 @@ def releasePromptReco(tier0Config, specDirectory, dqmUploadProxy):
                 specArguments['SiteBlacklist'] = []
                 specArguments['TrustSitelists'] = "True"
 
-                factory = PromptRecoWorkloadFactory()
-                wmSpec = factory.factoryWorkloadConstruction(workflowName, specArguments)
-                for subscription in subscriptions:
-                    wmSpec.setSubscriptionInformation(**subscription)
-
-                wmSpec.setOwnerDetails("Dirk.Hufnagel@cern.ch", "T0",
-                                       { 'vogroup': 'DEFAULT', 'vorole': 'DEFAULT',
-                                         'dn' : "Dirk.Hufnagel@cern.ch" } )
+                specRequests.append( { 'factoryClass' : PromptRecoWorkloadFactory,
+                                       'workflowName' : workflowName,
+                                       'specArguments' : specArguments,
+                                       'subscriptions' : list(subscriptions),
+                                       'run' : run } )
+                recoFilesets[workflowName] = fileset
 
-                wmSpec.setupPerformanceMonitoring(maxRSS = 1024 * specArguments['Memory'] + 10,
-                                                  maxVSize = 104857600, #100GB, effectively disabled
-                                                  softTimeout = 604800, #7 days, effectively disabled
-                                                  gracePeriod = 3600)
+        # all workloads of the run are built together, possibly in parallel
+        wmSpecs = buildSpecs(specRequests, templateCache, specBuilderPool)
+        if len(wmSpecs) != len(specRequests):
+            raise RuntimeError("Problem in releasePromptReco() building workloads for run %d !" % run)
 
-                wmbsHelper = WMBSHelper(wmSpec, taskName, cachepath = specDirectory)
-
-                recoSpecs[workflowName] = (wmbsHelper, wmSpec, fileset)
+        for workflowName, wmSpec in wmSpecs.items():
+            wmbsHelper = WMBSHelper(wmSpec, taskName, cachepath = specDirectory)
+            recoSpecs[workflowName] = (wmbsHelper, wmSpec, recoFilesets[workflowName])
 
         try:
             myThread.transaction.begin()
             if len(bindsDatasetScenario) > 0:
                 insertDatasetScenarioDAO.execute(bindsDatasetScenario, conn = myThread.transaction.conn, transaction = True)
             if len(bindsCMSSWVersion) > 0:
-                insertCMSSWVersionDAO.execute(bindsCMSSWVersion, conn = myThread.transaction.conn, transaction = True)
+                nameIdCache.getIds("cmssw_version", [ x['VERSION'] for x in bindsCMSSWVersion ],
+                                   conn = myThread.transaction.conn, transaction = True)
             if len(bindsRecoConfig) > 0:
                 insertRecoConfigDAO.execute(bindsRecoConfig, conn = myThread.transaction.conn, transaction = True)
             if len(bindsStorageNode) > 0:
@@ -1044,8 +1404,10 @@ def releasePromptReco(tier0Config, specDirectory, dqmUploadProxy):
         except Exception as ex:
             logging.exception(ex)
             myThread.transaction.rollback()
+            nameIdCache.rollback()
             raise RuntimeError("Problem in releasePromptReco() database transaction !")
         else:
             myThread.transaction.commit()
+            nameIdCache.commit()
 
     return
@@ -230,12 +230,108 @@ def createTier0Config():
 
     return tier0Config
 
+class ConfigOverlay(object):
+    """
+    _ConfigOverlay_
+
+    Copy-on-write view of a configuration section. Reads fall through
+    to the base section (sub sections are wrapped into overlays and
+    lists and dictionaries are copied on first access), writes only
+    go to the overlay.
+
+    Used for streams and datasets that are not explicitly configured,
+    so that their lookup neither copies the Default section nor adds
+    anything to the shared configuration. The base section is never
+    copied, copies of an overlay only copy the overridden values.
+    """
+    def __init__(self, base, **overrides):
+        self.__dict__['_base'] = base
+        self.__dict__['_overrides'] = dict(overrides)
+
+    def __getattr__(self, name):
+        if name.startswith("__") or '_overrides' not in self.__dict__:
+            raise AttributeError(name)
+
+        overrides = self.__dict__['_overrides']
+        if name in overrides:
+            return overrides[name]
+
+        value = getattr(self.__dict__['_base'], name)
+        if hasattr(value, "dictionary_"):
+            value = ConfigOverlay(value)
+            overrides[name] = value
+        elif isinstance(value, (list, dict, set)):
+            # could be modified in place
+            value = copy.deepcopy(value)
+            overrides[name] = value
+
+        return value
+
+    def __setattr__(self, name, value):
+        self.__dict__['_overrides'][name] = value
+
+    def __delattr__(self, name):
+        raise AttributeError("Can't delete %s from a configuration overlay" % name)
+
+    def __deepcopy__(self, memo):
+        overlay = ConfigOverlay(self.__dict__['_base'])
+        overlay.__dict__['_overrides'] = copy.deepcopy(self.__dict__['_overrides'], memo)
+        return overlay
+
+    def section_(self, sectionName):
+        """
+        _section_
+
+        Same as ConfigSection.section_, new sections only exist in the overlay
+        """
+        if not hasattr(self, sectionName):
+            setattr(self, sectionName, ConfigSection(name = sectionName))
+
+        return getattr(self, sectionName)
+
+    def dictionary_(self):
+        """
+        _dictionary_
+
+        Same as ConfigSection.dictionary_, with the overridden values
+        """
+        result = self.__dict__['_base'].dictionary_()
+        for name in result.keys():
+            if name in self.__dict__['_overrides']:
+                result[name] = self.__dict__['_overrides'][name]
+        for name, value in self.__dict__['_overrides'].items():
+            if not name.startswith("_"):
+                result[name] = value
+
+        return result
+
 def retrieveStreamConfig(config, streamName):
     """
     _retrieveStreamConfig_
     
     Lookup the configuration for the given stream.  If the configuration for a
-    particular stream is not explicitly defined, return the default configuration.
+    particular stream is not explicitly defined, return an overlay of the default
+    configuration. The configuration itself is not modified.
+    """
+    streamConfig = getattr(config.Streams, streamName, None)
+    if streamConfig == None:
+
+        defaultInstance = getattr(config.Streams, "Default", None)
+
+        if defaultInstance == None:
+            streamConfig = ConfigSection(name = streamName)
+        else:
+            streamConfig = ConfigOverlay(defaultInstance, _internal_name = streamName, Name = streamName)
+
+    return streamConfig
+
+def createStreamConfig(config, streamName):
+    """
+    _createStreamConfig_
+
+    Lookup the configuration for the given stream. If the configuration for a
+    particular stream is not explicitly defined, add a copy of the default
+    configuration for it.
     """
     streamConfig = getattr(config.Streams, streamName, None)
     if streamConfig == None:
@@ -269,7 +365,27 @@ def retrieveDatasetConfig(config, datasetName):
     _retrieveDatasetConfig_
     
     Lookup the configuration for the given dataset.  If the configuration for a
-    particular dataset is not defined return the default configuration.
+    particular dataset is not defined return an overlay of the default configuration.
+    The configuration itself is not modified.
+    """
+    datasetConfig = getattr(config.Datasets, datasetName, None)
+    if datasetConfig == None:
+
+        defaultInstance = getattr(config.Datasets, "Default", None)
+
+        if defaultInstance == None:
+            datasetConfig = ConfigSection(name = datasetName)
+        else:
+            datasetConfig = ConfigOverlay(defaultInstance, _internal_name = datasetName, Name = datasetName)
+
+    return datasetConfig
+
+def createDatasetConfig(config, datasetName):
+    """
+    _createDatasetConfig_
+
+    Lookup the configuration for the given dataset. If the configuration for a
+    particular dataset is not defined, add a copy of the default configuration for it.
     """
     datasetConfig = getattr(config.Datasets, datasetName, None)
     if datasetConfig == None:
@@ -324,7 +440,7 @@ def addDataset(config, datasetName, **settings):
                                (defaults to False)
       blockCloseDelay - block closing timeout in hours
     """
-    datasetConfig = retrieveDatasetConfig(config, datasetName)
+    datasetConfig = createDatasetConfig(config, datasetName)
 
     #
     # first the mandatory paramters
@@ -599,7 +715,7 @@ def ignoreStream(config, streamName):
     adds a configuration for a stream that
     sets it to be ignored
     """
-    streamConfig = retrieveStreamConfig(config, streamName)
+    streamConfig = createStreamConfig(config, streamName)
     streamConfig.ProcessingStyle = "Ignore"
 
     return
@@ -614,7 +730,19 @@ def addRepackConfig(config, streamName, **options):
     the dynamically applied version override.
 
     """
-    streamConfig = retrieveStreamConfig(config, streamName)
+    streamConfig = createStreamConfig(config, streamName)
+    applyRepackConfig(streamConfig, **options)
+
+    return
+
+def applyRepackConfig(streamConfig, **options):
+    """
+    _applyRepackConfig_
+
+    Set the repack configuration of a stream configuration,
+    see addRepackConfig for the options.
+
+    """
     streamConfig.ProcessingStyle = "Bulk"
 
     if hasattr(streamConfig, "VersionOverride"):
@@ -677,6 +805,11 @@ def addRepackConfig(config, streamName, **options):
     if streamConfig.Repack.MaxOverSize > streamConfig.Repack.MaxEdmSize:
         streamConfig.Repack.MaxOverSize = streamConfig.Repack.MaxEdmSize
 
+    if hasattr(streamConfig.Repack, "UseLumiCursor"):
+        streamConfig.Repack.UseLumiCursor = options.get("useLumiCursor", streamConfig.Repack.UseLumiCursor)
+    else:
+        streamConfig.Repack.UseLumiCursor = options.get("useLumiCursor", False)
+
     if hasattr(streamConfig.Repack, "BlockCloseDelay"):
         streamConfig.Repack.BlockCloseDelay = options.get("blockCloseDelay", streamConfig.Repack.BlockCloseDelay)
     else:
@@ -691,7 +824,7 @@ def addExpressConfig(config, streamName, **options):
     Add an express configuration to a given stream.
 
     """
-    streamConfig = retrieveStreamConfig(config, streamName)
+    streamConfig = createStreamConfig(config, streamName)
     streamConfig.ProcessingStyle = "Express"
 
     streamConfig.VersionOverride = options.get("versionOverride", {})
@@ -781,7 +914,7 @@ def addRegistrationConfig(config, streamName, **options):
 
     proc_string = options.get("proc_string", None)
 
-    streamConfig = retrieveStreamConfig(config, streamName)
+    streamConfig = createStreamConfig(config, streamName)
     if streamConfig.ProcessingStyle == "Convert" or \
        streamConfig.ProcessingStyle == "RegisterAndConvert":
         streamConfig.ProcessingStyle = "RegisterAndConvert"
@@ -838,7 +971,7 @@ def addConversionConfig(config, streamName, **options):
 
     proc_string = options.get("proc_string", None)
 
-    streamConfig = retrieveStreamConfig(config, streamName)
+    streamConfig = createStreamConfig(config, streamName)
     if streamConfig.ProcessingStyle == "Register" or \
        streamConfig.ProcessingStyle == "RegisterAndConvert":
         streamConfig.ProcessingStyle = "RegisterAndConvert"
@@ -889,3 +1022,118 @@ def addTier1Skim(config, skimName, dataTier, primaryDataset, cmsswVersion,
 
     datasetConfig.Tier1Skims.append(skimConfig)
     return
+
+class FrozenDict(dict):
+    """
+    _FrozenDict_
+
+    Dictionary that can't be modified after construction, nested
+    dictionaries are frozen as well. Copies share the same instance.
+    """
+    def __init__(self, values):
+        dict.__init__(self, [ (key, FrozenDict(value) if isinstance(value, dict) else value)
+                              for key, value in dict(values).items() ])
+
+    def frozen(self, *args, **kwargs):
+        raise TypeError("Can't modify %s, it is immutable" % type(self).__name__)
+
+    __setitem__ = frozen
+    __delitem__ = frozen
+    __ior__ = frozen
+    clear = frozen
+    pop = frozen
+    popitem = frozen
+    setdefault = frozen
+    update = frozen
+
+    def __copy__(self):
+        return self
+
+    def __deepcopy__(self, memo):
+        return self
+
+    def __reduce__(self):
+        # unpickling a dict subclass would otherwise use __setitem__
+        return (self.__class__, (dict(self),))
+
+class RunDependentParameter(FrozenDict):
+    """
+    _RunDependentParameter_
+
+    Era or run dependent configuration parameter, the parameter
+    dictionary ({ 'default' : ..., 'acqEra' : {...}, 'maxRun' : {...} })
+    precompiled by compileConfigParameters for extractConfigParameter
+
+    Resolved values are memoized per (era, run). The parameter can't
+    be modified, so copies share the same instance and memo.
+    """
+    def __init__(self, configParameter):
+        FrozenDict.__init__(self, configParameter)
+
+        self.eras = self.get('acqEra', {})
+        self.hasMaxRun = 'maxRun' in self
+
+        # the first matching maxRun entry in ascending order is
+        # overridden by every later one, so the last (highest)
+        # maxRun entry applies for all runs up to it
+        self.maxRun = None
+        self.maxRunValue = None
+        if self.hasMaxRun and len(self['maxRun']) > 0:
+            self.maxRun = max(self['maxRun'].keys())
+            self.maxRunValue = self['maxRun'][self.maxRun]
+
+        self.resolved = {}
+
+        return
+
+    def resolve(self, era, run):
+        """
+        _resolve_
+
+        Same result as extractConfigParameter on the parameter dictionary
+        """
+        key = (era, run)
+        if key in self.resolved:
+            return self.resolved[key]
+
+        if era in self.eras:
+            value = self.eras[era]
+        elif self.maxRun != None and run <= self.maxRun and self.maxRunValue:
+            value = self.maxRunValue
+        else:
+            value = self['default']
+
+        if len(self.resolved) > 10000:
+            self.resolved = {}
+        self.resolved[key] = value
+
+        return value
+
+def isRunDependentParameter(value):
+    """
+    _isRunDependentParameter_
+
+    Check if value is an era or run dependent parameter dictionary
+    """
+    return isinstance(value, dict) and 'default' in value and ('acqEra' in value or 'maxRun' in value)
+
+def compileConfigParameters(config):
+    """
+    _compileConfigParameters_
+
+    Replace all era or run dependent parameters of the stream
+    and dataset configurations with RunDependentParameter
+    instances, called after loading the configuration.
+    """
+    def compileSection(section):
+        for name, value in section.dictionary_().items():
+            if isinstance(value, ConfigSection):
+                compileSection(value)
+            elif isRunDependentParameter(value) and not isinstance(value, RunDependentParameter):
+                setattr(section, name, RunDependentParameter(value))
+
+    for sectionName in [ "Streams", "Datasets" ]:
+        if hasattr(config, sectionName):
+            compileSection(getattr(config, sectionName))
+
+    return
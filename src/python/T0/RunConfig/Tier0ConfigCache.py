@@ -0,0 +1,152 @@
+"""
+_Tier0ConfigCache_
+
+Cache for the parsed Tier0 configuration
+
+Loading the Tier0 configuration executes the whole configuration
+file, which for production is a large file with hundreds of dataset
+definitions. The cache only does that when the file modification
+time changed and the content hash differs from the last load.
+
+If a new version of the configuration can't be loaded (usually
+syntax errors), the last good configuration is kept in use. When
+a new version is loaded, the differences to the previous version
+are logged.
+
+"""
+import os
+import hashlib
+import logging
+
+from WMCore.Configuration import loadConfigurationFile
+
+from T0.RunConfig.Tier0Config import compileConfigParameters
+from T0.RunConfig.Tier0ConfigSnapshot import Tier0ConfigSnapshot
+
+
+class Tier0ConfigCache(object):
+    """
+    _Tier0ConfigCache_
+
+    Reload the Tier0 configuration only on change
+
+    """
+    def __init__(self, configFile):
+        """
+        _init_
+
+        """
+        self.configFile = configFile
+
+        self.config = None
+        self.flatConfig = None
+        self.mtime = None
+        self.checksum = None
+
+        return
+
+    def getConfig(self):
+        """
+        _getConfig_
+
+        Return the current Tier0 configuration, reloading
+        it from the file if it changed since the last call
+
+        Returns None if no configuration could ever be loaded
+
+        """
+        try:
+            mtime = os.path.getmtime(self.configFile)
+        except OSError:
+            logging.exception("Cannot access Tier0 configuration file %s" % self.configFile)
+            return self.config
+
+        if mtime == self.mtime:
+            return self.config
+
+        with open(self.configFile, "rb") as fd:
+            checksum = hashlib.sha1(fd.read()).hexdigest()
+
+        if checksum == self.checksum:
+            self.mtime = mtime
+            return self.config
+
+        try:
+            config = loadConfigurationFile(self.configFile)
+        except:
+            # usually happens when there are syntax errors in the configuration
+            if self.config == None:
+                logging.exception("Cannot load Tier0 configuration file %s" % self.configFile)
+            else:
+                logging.exception("Cannot load Tier0 configuration file %s, keep using the last good version" % self.configFile)
+            # don't retry until the file changes again
+            self.mtime = mtime
+            return self.config
+
+        # snapshot before RunConfigAPI adds derived stream
+        # and dataset sections, only used for the diff
+        flatConfig = flattenConfig(config)
+
+        compileConfigParameters(config)
+
+        # frozen, so it can't be changed by (or between) its users
+        config = Tier0ConfigSnapshot(config)
+
+        if self.config == None:
+            logging.info("Loaded Tier0 configuration file %s (%s)" % (self.configFile, checksum))
+        else:
+            logging.info("Reloaded changed Tier0 configuration file %s (%s)" % (self.configFile, checksum))
+            for line in diffConfigs(self.flatConfig, flatConfig):
+                logging.info("  %s" % line)
+
+        self.config = config
+        self.flatConfig = flatConfig
+        self.mtime = mtime
+        self.checksum = checksum
+
+        return self.config
+
+
+def flattenConfig(config):
+    """
+    _flattenConfig_
+
+    Map every parameter of a configuration to its
+    value, keyed by the dotted path of the parameter
+
+    """
+    flatConfig = {}
+
+    def flattenSection(section, prefix):
+        for name, value in section.dictionary_().items():
+            path = "%s.%s" % (prefix, name)
+            if hasattr(value, "dictionary_"):
+                flattenSection(value, path)
+            else:
+                flatConfig[path] = value
+        return
+
+    for sectionName in config.listSections_():
+        flattenSection(config.section_(sectionName), sectionName)
+
+    return flatConfig
+
+
+def diffConfigs(oldFlatConfig, newFlatConfig):
+    """
+    _diffConfigs_
+
+    Describe the differences between two flattened configurations,
+    one line per added, removed or changed parameter
+
+    """
+    differences = []
+    for path in sorted(set(oldFlatConfig.keys()) | set(newFlatConfig.keys())):
+        if path not in newFlatConfig:
+            differences.append("removed %s (was %r)" % (path, oldFlatConfig[path]))
+        elif path not in oldFlatConfig:
+            differences.append("added %s = %r" % (path, newFlatConfig[path]))
+        elif oldFlatConfig[path] != newFlatConfig[path]:
+            differences.append("changed %s : %r -> %r" % (path, oldFlatConfig[path], newFlatConfig[path]))
+
+    return differences
@@ -0,0 +1,197 @@
+"""
+_Tier0ConfigSnapshot_
+
+Frozen snapshot of a loaded Tier0 configuration
+
+The snapshot has the same read interface as the Tier0 configuration
+(attribute access, dictionary_, listSections_), but can't be modified.
+Every section carries a stable content hash, so that artifacts derived
+from a stream or dataset configuration can be cached per hash and
+configuration changes can be detected per section.
+
+Mutable values (lists, dictionaries) are copied when read, so the
+snapshot can be shared between threads. Copying a section returns
+a ConfigOverlay of it, RunConfigAPI resolves run dependent stream and
+dataset settings in such overlays.
+
+"""
+import copy
+import hashlib
+
+from T0.RunConfig.Tier0Config import ConfigOverlay
+
+
+class FrozenSection(object):
+    """
+    _FrozenSection_
+
+    Immutable copy of a configuration section
+
+    """
+    def __init__(self, section):
+        """
+        _init_
+
+        """
+        settings = {}
+        for name, value in section.dictionary_().items():
+            if hasattr(value, "dictionary_"):
+                settings[name] = FrozenSection(value)
+            else:
+                settings[name] = copy.deepcopy(value)
+
+        self.__dict__['_internal_name'] = getattr(section, "_internal_name", None)
+        self.__dict__['_settings'] = settings
+        self.__dict__['_hash'] = hashlib.sha1(canonicalRepr(settings).encode("utf-8")).hexdigest()
+
+        return
+
+    def __getattr__(self, name):
+        if name.startswith("__") or '_settings' not in self.__dict__:
+            raise AttributeError(name)
+
+        try:
+            value = self.__dict__['_settings'][name]
+        except KeyError:
+            raise AttributeError(name)
+
+        if isinstance(value, (list, dict, set)):
+            return copy.deepcopy(value)
+
+        return value
+
+    def __setattr__(self, name, value):
+        raise AttributeError("Can't set %s, the Tier0 configuration snapshot is frozen" % name)
+
+    def __delattr__(self, name):
+        raise AttributeError("Can't delete %s, the Tier0 configuration snapshot is frozen" % name)
+
+    def __copy__(self):
+        return ConfigOverlay(self)
+
+    def __deepcopy__(self, memo):
+        return ConfigOverlay(self)
+
+    def section_(self, sectionName):
+        """
+        _section_
+
+        Return an existing section, sections can't be added
+
+        """
+        value = self.__dict__['_settings'].get(sectionName)
+        if not isinstance(value, FrozenSection):
+            raise AttributeError("Can't add section %s, the Tier0 configuration snapshot is frozen" % sectionName)
+
+        return value
+
+    def dictionary_(self):
+        """
+        _dictionary_
+
+        """
+        return dict([ (name, getattr(self, name)) for name in self.__dict__['_settings'].keys() ])
+
+    def listSections_(self):
+        """
+        _listSections_
+
+        """
+        return [ name for name, value in self.__dict__['_settings'].items() if isinstance(value, FrozenSection) ]
+
+    def hash_(self):
+        """
+        _hash_
+
+        Content hash of the section, including all its sub sections
+
+        """
+        return self.__dict__['_hash']
+
+
+class Tier0ConfigSnapshot(FrozenSection):
+    """
+    _Tier0ConfigSnapshot_
+
+    Frozen Tier0 configuration with per stream and dataset hashes
+
+    """
+    def __init__(self, config):
+        """
+        _init_
+
+        """
+        settings = {}
+        for sectionName in config.listSections_():
+            settings[sectionName] = FrozenSection(config.section_(sectionName))
+
+        self.__dict__['_internal_name'] = None
+        self.__dict__['_settings'] = settings
+        self.__dict__['_hash'] = hashlib.sha1(canonicalRepr(settings).encode("utf-8")).hexdigest()
+
+        return
+
+    def streamHash(self, streamName):
+        """
+        _streamHash_
+
+        Content hash of the effective configuration of a stream
+
+        """
+        return self.effectiveHash("Streams", streamName)
+
+    def datasetHash(self, datasetName):
+        """
+        _datasetHash_
+
+        Content hash of the effective configuration of a dataset
+
+        """
+        return self.effectiveHash("Datasets", datasetName)
+
+    def effectiveHash(self, sectionName, name):
+        """
+        _effectiveHash_
+
+        Explicitly configured streams and datasets have their own
+        section hash, all others use Default with their name
+
+        """
+        section = getattr(self, sectionName)
+
+        config = getattr(section, name, None)
+        if config != None:
+            return config.hash_()
+
+        default = getattr(section, "Default", None)
+        if default != None:
+            key = "%s|%s" % (default.hash_(), name)
+        else:
+            key = "|%s" % name
+
+        return hashlib.sha1(key.encode("utf-8")).hexdigest()
+
+
+def canonicalRepr(value):
+    """
+    _canonicalRepr_
+
+    repr with sorted dictionaries and sets and sub
+    sections replaced by their hash, stable between
+    processes for the values used in the configuration
+
+    """
+    if isinstance(value, FrozenSection):
+        return "<section %s>" % value.hash_()
+    elif isinstance(value, dict):
+        return "{%s}" % ", ".join(sorted([ "%s: %s" % (canonicalRepr(k), canonicalRepr(v)) for k, v in value.items() ]))
+    elif isinstance(value, (set, frozenset)):
+        return "set([%s])" % ", ".join(sorted([ canonicalRepr(x) for x in value ]))
+    elif isinstance(value, list):
+        return "[%s]" % ", ".join([ canonicalRepr(x) for x in value ])
+    elif isinstance(value, tuple):
+        return "(%s)" % ", ".join([ canonicalRepr(x) for x in value ])
+    elif hasattr(value, "dictionary_"):
+        return "<%s %s>" % (type(value).__name__, canonicalRepr(value.dictionary_()))
+
+    return repr(value)
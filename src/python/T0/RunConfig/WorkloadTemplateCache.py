@@ -0,0 +1,268 @@
+"""
+_WorkloadTemplateCache_
+
+LRU cache of workload templates for the Repack, Express and
+PromptReco specs created by configureRunStream and releasePromptReco
+
+Building a workload means running the spec factory, which sets up
+all tasks, steps and scenario configurations. Most runs of a fill
+use identical stream and dataset configurations, the spec arguments
+only differ in the run number (and strings built from it like the
+workflow name, the GlobalTagTransaction or the run based LFN
+directories /000/123/456 added by setLFNBase).
+
+The spec arguments are turned into a template by replacing the run
+number with a sentinel run number of the same length. The template
+is built once with the sentinel, pickled and cached under a hash of
+the templated arguments. Workloads for later runs are unpickled from
+the template and stamped out by replacing the sentinel run number
+with the real one everywhere in the workload, both as is and in
+its run directory form.
+
+Anything unexpected (sentinel already present in the arguments,
+stamped workload with the wrong name, errors while stamping) falls
+back to a full build with the original arguments.
+
+"""
+import hashlib
+import logging
+import threading
+
+try:
+    import cPickle as pickle
+except ImportError:
+    import pickle
+
+try:
+    stringTypes = (str, unicode)
+except NameError:
+    stringTypes = (str,)
+
+
+class WorkloadTemplateCache(object):
+    """
+    _WorkloadTemplateCache_
+
+    Memory LRU cache of pickled workload templates
+
+    """
+    def __init__(self, size = 100):
+        """
+        _init_
+
+        """
+        self.size = max(1, size)
+
+        # keys in order of use, least recently used first
+        self.cache = {}
+        self.order = []
+        self.lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.fallbacks = 0
+
+        return
+
+    def getWorkload(self, factoryClass, workflowName, specArguments, run):
+        """
+        _getWorkload_
+
+        Same as factoryClass().factoryWorkloadConstruction(workflowName, specArguments),
+        using a cached template for the run independent part of the arguments
+
+        """
+        sentinelRun = getSentinelRun(run)
+
+        arguments = workflowName + repr(specArguments)
+        if any([ x in arguments for x in getRunStrings(sentinelRun) ]):
+            self.fallbacks += 1
+            return factoryClass().factoryWorkloadConstruction(workflowName, specArguments)
+
+        substitute = makeSubstitution(run, sentinelRun)
+        templateName = substitute(workflowName)
+        templateArguments = substitute(specArguments)
+
+        key = templateKey(factoryClass, templateName, templateArguments)
+
+        with self.lock:
+            template = self.cache.get(key)
+            if template != None:
+                self.order.remove(key)
+                self.order.append(key)
+
+        if template == None:
+            self.misses += 1
+            wmSpec = factoryClass().factoryWorkloadConstruction(templateName, templateArguments)
+            template = pickle.dumps(wmSpec, pickle.HIGHEST_PROTOCOL)
+            with self.lock:
+                if key in self.cache:
+                    self.order.remove(key)
+                self.cache[key] = template
+                self.order.append(key)
+                while len(self.order) > self.size:
+                    del self.cache[self.order.pop(0)]
+        else:
+            self.hits += 1
+
+        try:
+            wmSpec = pickle.loads(template)
+            stampWorkload(wmSpec, makeSubstitution(sentinelRun, run))
+            if wmSpec.name() != workflowName:
+                raise RuntimeError("stamped workload is named %s" % wmSpec.name())
+        except Exception as ex:
+            logging.error("Cannot stamp out %s from template, building it : %s" % (workflowName, str(ex)))
+            self.fallbacks += 1
+            with self.lock:
+                if self.cache.pop(key, None) != None:
+                    self.order.remove(key)
+            return factoryClass().factoryWorkloadConstruction(workflowName, specArguments)
+
+        return wmSpec
+
+    def usage(self):
+        """
+        _usage_
+
+        """
+        return { 'templates' : len(self.cache),
+                 'hits' : self.hits,
+                 'misses' : self.misses,
+                 'fallbacks' : self.fallbacks }
+
+
+def getSentinelRun(run):
+    """
+    _getSentinelRun_
+
+    Sentinel run number with the same number of digits as the run,
+    so that substitutions never change the length of a string
+
+    """
+    return int("9" * len(str(run)))
+
+
+def getRunDirectory(run):
+    """
+    _getRunDirectory_
+
+    Run based LFN directory as added by setLFNBase, ie.
+    /000/123/456 for run 123456, same length for the
+    run and its sentinel run
+
+    """
+    runString = str(run).zfill(9)
+
+    return "/%s/%s/%s" % (runString[0:3], runString[3:6], runString[6:9])
+
+
+def getRunStrings(run):
+    """
+    _getRunStrings_
+
+    All forms the run number appears in within strings
+
+    """
+    return [ str(run), getRunDirectory(run) ]
+
+
+def templateKey(factoryClass, templateName, templateArguments):
+    """
+    _templateKey_
+
+    """
+    key = "%s.%s|%s|%s" % (factoryClass.__module__, factoryClass.__name__, templateName,
+                           repr(sorted(templateArguments.items())))
+
+    return hashlib.sha1(key.encode("utf-8")).hexdigest()
+
+
+def makeSubstitution(oldRun, newRun):
+    """
+    _makeSubstitution_
+
+    Return a function replacing oldRun by newRun in a value (as is and
+    in its run directory form within strings), recursing into lists,
+    tuples, sets and dicts (values and keys)
+
+    """
+    replacements = list(zip(getRunStrings(oldRun), getRunStrings(newRun)))
+
+    def substitute(value):
+        if isinstance(value, stringTypes):
+            for oldString, newString in replacements:
+                if oldString in value:
+                    value = value.replace(oldString, newString)
+            return value
+        elif isinstance(value, bool):
+            return value
+        elif isinstance(value, int):
+            if value == oldRun:
+                return newRun
+            return value
+        elif isinstance(value, list):
+            return [ substitute(x) for x in value ]
+        elif isinstance(value, tuple):
+            return tuple([ substitute(x) for x in value ])
+        elif isinstance(value, (set, frozenset)):
+            return type(value)([ substitute(x) for x in value ])
+        elif isinstance(value, dict):
+            return dict([ (substitute(k), substitute(v)) for k, v in value.items() ])
+        return value
+
+    return substitute
+
+
+def stampWorkload(wmSpec, substitute):
+    """
+    _stampWorkload_
+
+    Apply the substitution in place to every attribute
+    of the workload and all objects (tasks, steps, sections)
+    reachable from it
+
+    """
+    visited = set()
+    pending = [ wmSpec ]
+
+    while len(pending) > 0:
+
+        obj = pending.pop()
+        if id(obj) in visited:
+            continue
+        visited.add(id(obj))
+
+        if isinstance(obj, dict):
+            items = list(obj.items())
+            obj.clear()
+            for key, value in items:
+                value = substitute(value) if isPlain(value) else value
+                obj[substitute(key)] = value
+                pending.append(value)
+        elif isinstance(obj, list):
+            for i, value in enumerate(obj):
+                obj[i] = substitute(value) if isPlain(value) else value
+                pending.append(obj[i])
+        elif isinstance(obj, (tuple, set, frozenset)):
+            pending.extend(obj)
+        elif hasattr(obj, "__dict__") and not isinstance(obj, type):
+            # bypasses ConfigSection.__setattr__, the set
+            # of settings of a section doesn't change
+            pending.append(obj.__dict__)
+
+    return
+
+
+def isPlain(value):
+    """
+    _isPlain_
+
+    Values the substitution handles completely (no
+    objects inside that need to be stamped themselves)
+
+    """
+    if isinstance(value, (list, tuple, set, frozenset)):
+        return all([ isPlain(x) for x in value ])
+    elif isinstance(value, dict):
+        return all([ isPlain(x) for x in value.keys() ]) and all([ isPlain(x) for x in value.values() ])
+    return value == None or isinstance(value, stringTypes + (int, float, bool))
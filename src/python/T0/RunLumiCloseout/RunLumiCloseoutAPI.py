@@ -8,7 +8,7 @@ import logging
 import threading
 import time
 
-from WMCore.DAOFactory import DAOFactory
+from T0.WMBS.DAORegistry import getDAOFactory
 
 
 def stopRuns(dbInterfaceStorageManager):
@@ -27,13 +27,13 @@ def stopRuns(dbInterfaceStorageManager):
     logging.debug("stopRuns()")
     myThread = threading.currentThread()
     
-    daoFactory = DAOFactory(package = "T0.WMBS",
-                            logger = logging,
-                            dbinterface = myThread.dbi)
+    daoFactory = getDAOFactory(package = "T0.WMBS",
+                               logger = logging,
+                               dbinterface = myThread.dbi)
 
-    daoFactoryStorageManager = DAOFactory(package = "T0.WMBS",
-                                          logger = logging,
-                                          dbinterface = dbInterfaceStorageManager)
+    daoFactoryStorageManager = getDAOFactory(package = "T0.WMBS",
+                                             logger = logging,
+                                             dbinterface = dbInterfaceStorageManager)
 
     findActiveRunsDAO = daoFactory(classname = "RunLumiCloseout.FindActiveRuns")
     findStoppedRunsDAO = daoFactoryStorageManager(classname = "RunLumiCloseout.FindStoppedRuns")
@@ -76,13 +76,13 @@ def closeRuns(dbInterfaceStorageManager):
     logging.debug("closeRuns()")
     myThread = threading.currentThread()
 
-    daoFactory = DAOFactory(package = "T0.WMBS",
-                            logger = logging,
-                            dbinterface = myThread.dbi)
+    daoFactory = getDAOFactory(package = "T0.WMBS",
+                               logger = logging,
+                               dbinterface = myThread.dbi)
 
-    daoFactoryStorageManager = DAOFactory(package = "T0.WMBS",
-                                          logger = logging,
-                                          dbinterface = dbInterfaceStorageManager)
+    daoFactoryStorageManager = getDAOFactory(package = "T0.WMBS",
+                                             logger = logging,
+                                             dbinterface = dbInterfaceStorageManager)
 
     findOpenRunsDAO = daoFactory(classname = "RunLumiCloseout.FindOpenRuns")
     findClosedRunsDAO = daoFactoryStorageManager(classname = "RunLumiCloseout.FindClosedRuns")
@@ -124,17 +124,19 @@ def closeLumiSections(dbInterfaceStorageManager):
     of streamers matches the filecount in the lumi_section_closed
     record and final close them if it does
 
+    Returns the number of new closed lumis
+
     """
     logging.debug("closeLumiSections()")
     myThread = threading.currentThread()
 
-    daoFactory = DAOFactory(package = "T0.WMBS",
-                            logger = logging,
-                            dbinterface = myThread.dbi)
+    daoFactory = getDAOFactory(package = "T0.WMBS",
+                               logger = logging,
+                               dbinterface = myThread.dbi)
 
-    daoFactoryStorageManager = DAOFactory(package = "T0.WMBS",
-                                          logger = logging,
-                                          dbinterface = dbInterfaceStorageManager)
+    daoFactoryStorageManager = getDAOFactory(package = "T0.WMBS",
+                                             logger = logging,
+                                             dbinterface = dbInterfaceStorageManager)
 
     findHighContLumiDAO = daoFactory(classname = "RunLumiCloseout.FindHighContLumi")
     findClosedLumisDAO = daoFactoryStorageManager(classname = "RunLumiCloseout.FindClosedLumis")
@@ -150,7 +152,7 @@ def closeLumiSections(dbInterfaceStorageManager):
 
     # nothing active, nothing to do
     if len(runStreamLumis) == 0:
-        return
+        return 0
 
     # find new closed lumis based on EoLS records for
     # any given run/stream and lumi > N 
@@ -192,7 +194,7 @@ def closeLumiSections(dbInterfaceStorageManager):
     # final lumi closing
     finalCloseLumiDAO.execute(currentTime, transaction = False)
 
-    return
+    return len(closedLumis)
 
 
 def closeRunStreamFilesets():
@@ -213,9 +215,9 @@ def closeRunStreamFilesets():
     logging.debug("closeRunStreamFilesets()")
     myThread = threading.currentThread()
     
-    daoFactory = DAOFactory(package = "T0.WMBS",
-                            logger = logging,
-                            dbinterface = myThread.dbi)
+    daoFactory = getDAOFactory(package = "T0.WMBS",
+                               logger = logging,
+                               dbinterface = myThread.dbi)
 
     closeRunStreamFilesetsDAO = daoFactory(classname = "RunLumiCloseout.CloseRunStreamFilesets")
 
@@ -241,9 +243,9 @@ def checkActiveSplitLumis():
     logging.debug("checkActiveSplitLumi()")
     myThread = threading.currentThread()
 
-    daoFactory = DAOFactory(package = "T0.WMBS",
-                            logger = logging,
-                            dbinterface = myThread.dbi)
+    daoFactory = getDAOFactory(package = "T0.WMBS",
+                               logger = logging,
+                               dbinterface = myThread.dbi)
 
     checkActiveSplitLumisDAO = daoFactory(classname = "RunLumiCloseout.CheckActiveSplitLumis")
 
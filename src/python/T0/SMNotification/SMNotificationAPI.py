@@ -0,0 +1,189 @@
+"""
+_SMNotificationAPI_
+
+API for notifying the StorageManager transfer system
+about completely processed streamers
+
+The actual notification is done by a notifier object with a
+notify(filenames) method that returns whether the notification
+succeeded. Notifiers are pluggable, the default one calls the
+sendRepackedStatus.pl script of the transfer system.
+
+Streamers are notified in batches, batches can be notified
+concurrently and only the streamers of successfully notified
+batches are marked as finished.
+
+"""
+import os
+import logging
+import threading
+import subprocess
+
+try:
+    import queue
+except ImportError:
+    import Queue as queue
+
+from T0.WMBS.DAORegistry import getDAOFactory
+
+
+class ScriptNotifier(object):
+    """
+    _ScriptNotifier_
+
+    Notify by running the transfer system sendRepackedStatus.pl
+    script, without an intermediate shell
+
+    """
+    def __init__(self, transferSystemBaseDir):
+        """
+        _init_
+
+        """
+        t0Root = os.path.join(transferSystemBaseDir, "T0")
+
+        self.command = [ os.path.join(t0Root, "operations", "sendRepackedStatus.pl"),
+                         "--config", os.path.join(transferSystemBaseDir, "Config", "TransferSystem_CERN.cfg") ]
+
+        self.env = dict(os.environ)
+        for variable in [ "LANGUAGE", "LC_ALL", "LC_CTYPE" ]:
+            self.env.pop(variable, None)
+        self.env['LANG'] = "C"
+        self.env['T0_BASE_DIR'] = transferSystemBaseDir
+        self.env['T0ROOT'] = t0Root
+        self.env['CONFIG'] = self.command[2]
+        self.env['PERL5LIB'] = os.path.join(t0Root, "perl_lib")
+
+        return
+
+    def notify(self, filenames):
+        """
+        _notify_
+
+        """
+        command = list(self.command)
+        for filename in filenames:
+            command.extend([ "-FILENAME", filename ])
+
+        p = subprocess.Popen(command, env = self.env,
+                             stdout = subprocess.PIPE, stderr = subprocess.PIPE)
+        output, error = p.communicate()
+
+        if p.returncode != 0 or len(error) > 0:
+            logging.error("ERROR: Could not notify transfer system about processed streamers")
+            logging.error("ERROR: %s" % error)
+            return False
+
+        return True
+
+
+def loadNotifier(notifierClass, **args):
+    """
+    _loadNotifier_
+
+    Instantiate a notifier from its fully qualified class name
+
+    """
+    moduleName, className = notifierClass.rsplit(".", 1)
+    module = __import__(moduleName, globals(), locals(), [className])
+
+    return getattr(module, className)(**args)
+
+
+def notifyStorageManager(notifier, batchSize = 50, concurrency = 1):
+    """
+    _notifyStorageManager_
+
+    Called by Tier0Feeder in every polling cycle
+
+    Find all finished streamers for closed all run/stream
+    Send the notification message to StorageManager
+    Update the streamer status to finished (deleted = 1)
+
+    """
+    logging.debug("notifyStorageManager()")
+    myThread = threading.currentThread()
+
+    daoFactory = getDAOFactory(package = "T0.WMBS",
+                               logger = logging,
+                               dbinterface = myThread.dbi)
+
+    getFinishedStreamersDAO = daoFactory(classname = "SMNotification.GetFinishedStreamers")
+    markStreamersFinishedDAO = daoFactory(classname = "SMNotification.MarkStreamersFinished")
+
+    allFinishedStreamers = getFinishedStreamersDAO.execute(transaction = False)
+
+    batches = []
+    for i in range(0, len(allFinishedStreamers), batchSize):
+        streamers = []
+        filenames = []
+        for (id, lfn) in allFinishedStreamers[i:i+batchSize]:
+            streamers.append(id)
+            filenames.append(os.path.basename(lfn))
+        batches.append((streamers, filenames))
+
+    if len(batches) == 0:
+        return
+
+    logging.debug("Notifying transfer system about %d processed streamers" % len(allFinishedStreamers))
+
+    notifiedStreamers = []
+    for streamers, success in sendBatches(notifier, batches, concurrency):
+        if success:
+            notifiedStreamers.extend(streamers)
+
+    # database updates stay in the calling thread
+    if len(notifiedStreamers) > 0:
+        markStreamersFinishedDAO.execute(notifiedStreamers, transaction = False)
+
+    logging.debug("Notified transfer system about %d of %d processed streamers" % (len(notifiedStreamers),
+                                                                                    len(allFinishedStreamers)))
+
+    return
+
+
+def sendBatches(notifier, batches, concurrency):
+    """
+    _sendBatches_
+
+    Notify the batches with up to concurrency parallel notifications,
+    returns a list of (streamers, success) tuples, one per batch
+
+    """
+    def notifyBatch(filenames):
+        try:
+            return notifier.notify(filenames)
+        except Exception:
+            logging.exception("Could not notify transfer system about processed streamers")
+            return False
+
+    if concurrency <= 1 or len(batches) == 1:
+        return [ (streamers, notifyBatch(filenames)) for (streamers, filenames) in batches ]
+
+    batchQueue = queue.Queue()
+    for batch in batches:
+        batchQueue.put(batch)
+
+    results = []
+    resultsLock = threading.Lock()
+
+    def worker():
+        while True:
+            try:
+                streamers, filenames = batchQueue.get_nowait()
+            except queue.Empty:
+                return
+            success = notifyBatch(filenames)
+            with resultsLock:
+                results.append((streamers, success))
+
+    workers = []
+    for i in range(min(concurrency, len(batches))):
+        thread = threading.Thread(target = worker, name = "SMNotification-%d" % i)
+        thread.start()
+        workers.append(thread)
+
+    for thread in workers:
+        thread.join()
+
+    return results
@@ -0,0 +1,183 @@
+"""
+_T0DataSvcReplicator_
+
+Incremental replication of T0AST information into the Tier0 Data Service
+
+Each replicated table is described by a Replication: the T0AST DAO
+returning the unpublished rows, the T0DataSvc DAO that upserts them
+(array bound MERGE), the T0AST DAO that flags them as published and
+how to build the binds for both from a row.
+
+Rows are published in chunks, each chunk is flagged in T0AST right
+after it was upserted, so that a large backlog makes progress even if
+a later chunk fails. Since the upserts are MERGE statements, replaying
+a chunk that was upserted but not flagged is harmless.
+
+When the Tier0 Data Service is unavailable, replication stops for the
+current pass and backs off exponentially instead of retrying every
+table and chunk in every cycle.
+
+"""
+import time
+import logging
+
+
+class Replication(object):
+    """
+    _Replication_
+
+    Declarative description of one replicated table
+
+    """
+    def __init__(self, name, getDAO, insertDAO, updateDAO, insertBinds, updateBinds):
+        """
+        _init_
+
+        getDAO and updateDAO are T0AST DAO names, insertDAO is a T0DataSvc
+        DAO name, insertBinds and updateBinds map a row to the binds
+
+        """
+        self.name = name
+        self.getDAO = getDAO
+        self.insertDAO = insertDAO
+        self.updateDAO = updateDAO
+        self.insertBinds = insertBinds
+        self.updateBinds = updateBinds
+        return
+
+
+REPLICATIONS = [
+
+    # completion record for finished and cleaned up run/stream workflows
+    Replication("RunStreamDone",
+                getDAO = "T0DataSvc.GetRunStreamDone",
+                insertDAO = "T0DataSvc.InsertRunStreamDone",
+                updateDAO = "T0DataSvc.UpdateRunStreamDone",
+                insertBinds = lambda row: { 'RUN' : row['run'],
+                                            'STREAM' : row['stream'] },
+                updateBinds = lambda row: { 'RUN' : row['run'],
+                                            'STREAM' : row['stream'] }),
+
+    Replication("ExpressConfigs",
+                getDAO = "T0DataSvc.GetExpressConfigs",
+                insertDAO = "T0DataSvc.InsertExpressConfigs",
+                updateDAO = "T0DataSvc.UpdateExpressConfigs",
+                insertBinds = lambda row: { 'RUN' : row['run'],
+                                            'STREAM' : row['stream'],
+                                            'CMSSW' : row['cmssw'],
+                                            'SCRAM_ARCH' : row['scram_arch'],
+                                            'RECO_CMSSW' : row['reco_cmssw'],
+                                            'RECO_SCRAM_ARCH' : row['reco_scram_arch'],
+                                            'ALCA_SKIM' : row['alca_skim'],
+                                            'DQM_SEQ' : row['dqm_seq'],
+                                            'GLOBAL_TAG' : row['global_tag'][:50],
+                                            'SCENARIO' : row['scenario'] },
+                updateBinds = lambda row: { 'RUN' : row['run'],
+                                            'STREAM' : row['stream'] }),
+
+    Replication("RecoConfigs",
+                getDAO = "T0DataSvc.GetRecoConfigs",
+                insertDAO = "T0DataSvc.InsertRecoConfigs",
+                updateDAO = "T0DataSvc.UpdateRecoConfigs",
+                insertBinds = lambda row: { 'RUN' : row['run'],
+                                            'PRIMDS' : row['primds'],
+                                            'CMSSW' : row['cmssw'],
+                                            'SCRAM_ARCH' : row['scram_arch'],
+                                            'ALCA_SKIM' : row['alca_skim'],
+                                            'PHYSICS_SKIM' : row['physics_skim'],
+                                            'DQM_SEQ' : row['dqm_seq'],
+                                            'GLOBAL_TAG' : row['global_tag'][:50],
+                                            'SCENARIO' : row['scenario'] },
+                updateBinds = lambda row: { 'RUN' : row['run'],
+                                            'PRIMDS' : row['primds'] }),
+
+    # aggregated by run, if one primary dataset is released
+    # the whole run is considered released
+    Replication("RecoReleaseConfigs",
+                getDAO = "T0DataSvc.GetRecoReleaseConfigs",
+                insertDAO = "T0DataSvc.InsertRecoReleaseConfigs",
+                updateDAO = "T0DataSvc.UpdateRecoReleaseConfigs",
+                insertBinds = lambda row: { 'RUN' : row['run'],
+                                            'LOCKED' : int(row['released'] > 0) },
+                updateBinds = lambda row: { 'RUN' : row['run'],
+                                            'IN_DATASVC' : int(row['released'] > 0) + 1 }),
+
+    Replication("DatasetLocked",
+                getDAO = "T0DataSvc.GetDatasetLocked",
+                insertDAO = "T0DataSvc.InsertDatasetLocked",
+                updateDAO = "T0DataSvc.UpdateDatasetLocked",
+                insertBinds = lambda row: { 'PATH' : row['path'] },
+                updateBinds = lambda row: { 'ID' : row['id'] }),
+
+    ]
+
+
+class T0DataSvcReplicator(object):
+    """
+    _T0DataSvcReplicator_
+
+    Publish unpublished T0AST rows into the Tier0 Data Service
+
+    """
+    def __init__(self, daoFactory, daoFactoryT0DataSvc, replications = None,
+                 chunkSize = 1000, minBackoff = 60, maxBackoff = 3600):
+        """
+        _init_
+
+        """
+        self.daoFactory = daoFactory
+        self.daoFactoryT0DataSvc = daoFactoryT0DataSvc
+        self.replications = replications if replications != None else REPLICATIONS
+        self.chunkSize = chunkSize
+
+        self.minBackoff = minBackoff
+        self.maxBackoff = maxBackoff
+        self.backoff = 0
+        self.nextAttempt = 0
+
+        return
+
+    def replicate(self):
+        """
+        _replicate_
+
+        Run one replication pass over all tables
+
+        """
+        if time.time() < self.nextAttempt:
+            logging.debug("Tier0 Data Service replication backing off for %d more seconds" % (self.nextAttempt - time.time()))
+            return
+
+        for replication in self.replications:
+
+            getDAO = self.daoFactory(classname = replication.getDAO)
+            rows = getDAO.execute(transaction = False)
+
+            if len(rows) == 0:
+                continue
+
+            logging.debug("Replicating %d %s rows into the Tier0 Data Service" % (len(rows), replication.name))
+
+            insertDAO = self.daoFactoryT0DataSvc(classname = replication.insertDAO)
+            updateDAO = self.daoFactory(classname = replication.updateDAO)
+
+            for i in range(0, len(rows), self.chunkSize):
+
+                chunk = rows[i:i+self.chunkSize]
+
+                try:
+                    insertDAO.execute(binds = [ replication.insertBinds(row) for row in chunk ],
+                                      transaction = False)
+                except Exception:
+                    self.backoff = min(self.maxBackoff, max(self.minBackoff, 2 * self.backoff))
+                    self.nextAttempt = time.time() + self.backoff
+                    logging.exception("Tier0 Data Service replication of %s failed, retrying in %d seconds" % (replication.name,
+                                                                                                              self.backoff))
+                    return
+
+                updateDAO.execute(binds = [ replication.updateBinds(row) for row in chunk ],
+                                  transaction = False)
+
+        self.backoff = 0
+
+        return
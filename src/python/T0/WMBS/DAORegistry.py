@@ -0,0 +1,82 @@
+"""
+_DAORegistry_
+
+Process wide registry of DAO factories and DAOs
+
+DAOs don't keep any state besides the database interface and
+logger they are created with, so there is no need to import the
+DAO module and create a new DAOFactory and DAO instance for every
+call. getDAOFactory is a drop-in replacement for DAOFactory that
+returns a shared factory per (database interface, package, logger),
+which builds each DAO only once.
+
+The registry keeps the database interfaces alive, which is fine for
+the components (database interfaces live as long as their threads).
+
+"""
+import threading
+
+from WMCore.DAOFactory import DAOFactory
+
+
+class CachingDAOFactory(object):
+    """
+    _CachingDAOFactory_
+
+    DAOFactory that builds each DAO only once
+
+    """
+    def __init__(self, package, logger, dbinterface):
+        """
+        _init_
+
+        """
+        self.daoFactory = DAOFactory(package = package,
+                                     logger = logger,
+                                     dbinterface = dbinterface)
+        self.daos = {}
+        self.lock = threading.Lock()
+
+        return
+
+    def __call__(self, classname):
+        """
+        _call_
+
+        Return the DAO for classname, building it on first use
+
+        """
+        dao = self.daos.get(classname)
+        if dao == None:
+            with self.lock:
+                dao = self.daos.get(classname)
+                if dao == None:
+                    dao = self.daoFactory(classname = classname)
+                    self.daos[classname] = dao
+
+        return dao
+
+
+_registry = {}
+_registryLock = threading.Lock()
+
+
+def getDAOFactory(package, logger, dbinterface):
+    """
+    _getDAOFactory_
+
+    Return the shared CachingDAOFactory for this database interface,
+    package and logger, same arguments as DAOFactory
+
+    """
+    # the factory holds a reference to the database
+    # interface, so its id can't be reused while cached
+    key = (id(dbinterface), package, logger)
+
+    with _registryLock:
+        daoFactory = _registry.get(key)
+        if daoFactory == None:
+            daoFactory = CachingDAOFactory(package, logger, dbinterface)
+            _registry[key] = daoFactory
+
+    return daoFactory
@@ -233,6 +233,14 @@ class Create(DBCreator):
                  primary key(subscription, run_id, lumi_id)
                ) ORGANIZATION INDEX"""
 
+        self.create[len(self.create)] = \
+            """CREATE TABLE lumi_section_split_cursor (
+                 subscription   int not null,
+                 lumi_id        int not null,
+                 update_time    int not null,
+                 primary key(subscription)
+               ) ORGANIZATION INDEX"""
+
         self.create[len(self.create)] = \
             """CREATE TABLE streamer (
                  id            int not null,
@@ -677,6 +685,13 @@ class Create(DBCreator):
                  FOREIGN KEY (subscription)
                  REFERENCES wmbs_subscription(id)"""
 
+        self.constraints[len(self.constraints)] = \
+            """ALTER TABLE lumi_section_split_cursor
+                 ADD CONSTRAINT lum_sec_spli_cur_sub_fk
+                 FOREIGN KEY (subscription)
+                 REFERENCES wmbs_subscription(id)
+                 ON DELETE CASCADE"""
+
         self.constraints[len(self.constraints)] = \
             """ALTER TABLE streamer
                  ADD CONSTRAINT str_run_id_fk
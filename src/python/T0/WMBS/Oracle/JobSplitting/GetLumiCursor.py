@@ -0,0 +1,28 @@
+"""
+_GetLumiCursor_
+
+Oracle implementation of GetLumiCursor
+
+For a given subscription return the lumi cursor, ie. the
+highest lumi up to which all lumis are used or empty.
+Returns 0 if there is no lumi cursor yet.
+"""
+
+from WMCore.Database.DBFormatter import DBFormatter
+
+class GetLumiCursor(DBFormatter):
+
+    sql = """SELECT lumi_id
+             FROM lumi_section_split_cursor
+             WHERE subscription = :subscription
+             """
+
+    def execute(self, subscription, conn = None, transaction = False):
+
+        results = self.dbi.processData(self.sql, { 'subscription' : subscription },
+                                       conn = conn, transaction = transaction)[0].fetchall()
+
+        if len(results) == 0:
+            return 0
+
+        return results[0][0]
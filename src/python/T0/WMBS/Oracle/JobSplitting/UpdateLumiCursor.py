@@ -0,0 +1,35 @@
+"""
+_UpdateLumiCursor_
+
+Oracle implementation of UpdateLumiCursor
+
+Insert or move forward the lumi cursor of a subscription
+"""
+
+import time
+
+from WMCore.Database.DBFormatter import DBFormatter
+
+class UpdateLumiCursor(DBFormatter):
+
+    sql = """MERGE INTO lumi_section_split_cursor
+             USING DUAL ON ( subscription = :subscription )
+             WHEN MATCHED THEN UPDATE
+               SET lumi_id = :lumi,
+                   update_time = :time
+               WHERE lumi_id < :lumi
+             WHEN NOT MATCHED THEN
+               INSERT (subscription, lumi_id, update_time)
+               VALUES (:subscription, :lumi, :time)
+             """
+
+    def execute(self, subscription, lumi, conn = None, transaction = False):
+
+        binds = { 'subscription' : subscription,
+                  'lumi' : lumi,
+                  'time' : int(time.time()) }
+
+        self.dbi.processData(self.sql, binds, conn = conn,
+                             transaction = transaction)
+
+        return
@@ -18,6 +18,11 @@ in reco_release_config so that on final
 release the second query can move the
 status forward.
 
+The pre-release is repeated for up to maxRuns
+runs (all runs if maxRuns is 0), stopping at
+the first run that still has datasets that
+can't be pre-released yet.
+
 Then return information for all run/dataset
 that are ready for final release.
 
@@ -28,7 +33,7 @@ from WMCore.Database.DBFormatter import DBFormatter
 
 class FindRecoRelease(DBFormatter):
 
-    def execute(self, datasetDelays, conn = None, transaction = False):
+    def execute(self, datasetDelays, maxRuns = 1, conn = None, transaction = False):
 
         now = int(time.time())
 
@@ -61,9 +66,14 @@ class FindRecoRelease(DBFormatter):
                      t.delay_offset = :DELAY_OFFSET
                  """
 
-        if len(binds) > 0:
-            self.dbi.processData(sql, binds, conn = conn,
-                                 transaction = transaction)
+        # lowest run moves forward once all its datasets are pre-released
+        releasedRuns = 0
+        while len(binds) > 0 and (maxRuns == 0 or releasedRuns < maxRuns):
+            results = self.dbi.processData(sql, binds, conn = conn,
+                                           transaction = transaction)
+            if sum([ result.rowcount for result in results ]) == 0:
+                break
+            releasedRuns += 1
 
         binds = { 'NOW' : now }
 
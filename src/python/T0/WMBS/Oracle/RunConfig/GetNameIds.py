@@ -0,0 +1,53 @@
+"""
+_GetNameIds_
+
+Oracle implementation of GetNameIds
+
+Return the name to id mapping of one of the name tables
+(stream, primary_dataset, trigger_label, cmssw_version),
+either for the whole table or for a list of names.
+
+"""
+
+from WMCore.Database.DBFormatter import DBFormatter
+
+class GetNameIds(DBFormatter):
+
+    tables = [ "stream", "primary_dataset", "trigger_label", "cmssw_version" ]
+
+    def execute(self, table, names = None, conn = None, transaction = False):
+
+        if table not in self.tables:
+            raise RuntimeError("GetNameIds : unsupported table %s" % table)
+
+        if names == None:
+
+            sql = """SELECT name, id
+                     FROM %s
+                     """ % table
+
+            binds = {}
+
+        else:
+
+            if len(names) == 0:
+                return {}
+
+            sql = """SELECT name, id
+                     FROM %s
+                     WHERE name = :NAME
+                     """ % table
+
+            binds = []
+            for name in names:
+                binds.append( { 'NAME' : name } )
+
+        results = self.dbi.processData(sql, binds, conn = conn,
+                                       transaction = transaction)
+
+        nameIds = {}
+        for result in results:
+            for name, id in result.fetchall():
+                nameIds[name] = id
+
+        return nameIds
@@ -0,0 +1,31 @@
+"""
+_GetRecoReleaseBacklog_
+
+Oracle implementation of GetRecoReleaseBacklog
+
+Return the number of stopped runs that still have datasets
+waiting for PromptReco pre-release and the stop time of
+the oldest of them.
+
+"""
+
+from WMCore.Database.DBFormatter import DBFormatter
+
+class GetRecoReleaseBacklog(DBFormatter):
+
+    def execute(self, conn = None, transaction = False):
+
+        sql = """SELECT COUNT(DISTINCT run.run_id),
+                        MIN(run.stop_time)
+                 FROM reco_release_config
+                 INNER JOIN run ON
+                   run.run_id = reco_release_config.run_id
+                 WHERE checkForZeroOneState(reco_release_config.released) = 0
+                 AND run.stop_time > 0
+                 """
+
+        results = self.dbi.processData(sql, binds = {}, conn = conn,
+                                       transaction = transaction)[0].fetchall()
+
+        return { 'runs' : results[0][0],
+                 'oldestStopTime' : results[0][1] }
@@ -0,0 +1,55 @@
+"""
+_GetRunsInfo_
+
+Oracle implementation of GetRunsInfo
+
+Return global information for a list of runs (from run table),
+same information as GetRunInfo but one query for all runs.
+
+"""
+
+from WMCore.Database.DBFormatter import DBFormatter
+
+class GetRunsInfo(DBFormatter):
+
+    # Oracle limit for expressions in an IN list
+    maxInList = 1000
+
+    def execute(self, runs, conn = None, transaction = False):
+
+        runs = sorted(set(runs))
+
+        resultDict = {}
+        for i in range(0, len(runs), self.maxInList):
+
+            binds = {}
+            for j, run in enumerate(runs[i:i+self.maxInList]):
+                binds['RUN%d' % j] = run
+
+            sql = """SELECT run.run_id AS run,
+                            run.status AS status,
+                            run.hltkey AS hltkey,
+                            run.process AS process,
+                            run.acq_era AS acq_era,
+                            run.backfill AS backfill,
+                            run.bulk_data_type AS bulk_data_type,
+                            express_subscribe.name AS express_subscribe,
+                            run.dqmuploadurl AS dqmuploadurl,
+                            run.ah_timeout AS ah_timeout,
+                            run.ah_dir AS ah_dir,
+                            run.cond_timeout AS cond_timeout,
+                            run.db_host AS db_host,
+                            run.valid_mode AS valid_mode
+                     FROM run
+                     LEFT OUTER JOIN storage_node express_subscribe ON
+                       express_subscribe.id = run.express_subscribe
+                     WHERE run.run_id IN (%s)
+                     """ % ", ".join([ ":RUN%d" % j for j in range(len(binds)) ])
+
+            results = self.dbi.processData(sql, binds, conn = conn,
+                                           transaction = transaction)
+
+            for result in self.formatDict(results):
+                resultDict[result.pop('run')] = result
+
+        return resultDict
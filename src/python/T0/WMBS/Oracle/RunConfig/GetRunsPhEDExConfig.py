@@ -0,0 +1,61 @@
+"""
+_GetRunsPhEDExConfig_
+
+Oracle implementation of GetRunsPhEDExConfig
+
+Returns PhEDEx configuration for a list of runs, same
+information as GetPhEDExConfig but one query for all runs.
+
+"""
+
+from WMCore.Database.DBFormatter import DBFormatter
+
+class GetRunsPhEDExConfig(DBFormatter):
+
+    # Oracle limit for expressions in an IN list
+    maxInList = 1000
+
+    def execute(self, runs, conn = None, transaction = False):
+
+        runs = sorted(set(runs))
+
+        resultDict = {}
+        for run in runs:
+            resultDict[run] = {}
+
+        for i in range(0, len(runs), self.maxInList):
+
+            binds = {}
+            for j, run in enumerate(runs[i:i+self.maxInList]):
+                binds['RUN%d' % j] = run
+
+            sql = """SELECT phedex_config.run_id,
+                            primary_dataset.name,
+                            archival_node.name,
+                            tape_node.name,
+                            disk_node.name
+                     FROM phedex_config
+                     INNER JOIN primary_dataset ON
+                       primary_dataset.id = phedex_config.primds_id
+                     LEFT OUTER JOIN storage_node archival_node ON
+                       archival_node.id = phedex_config.archival_node_id
+                     LEFT OUTER JOIN storage_node tape_node ON
+                       tape_node.id = phedex_config.tape_node_id
+                     LEFT OUTER JOIN storage_node disk_node ON
+                       disk_node.id = phedex_config.disk_node_id
+                     WHERE phedex_config.run_id IN (%s)
+                     """ % ", ".join([ ":RUN%d" % j for j in range(len(binds)) ])
+
+            results = self.dbi.processData(sql, binds, conn = conn,
+                                           transaction = transaction)[0].fetchall()
+
+            for result in results:
+
+                run = result[0]
+                primds = result[1]
+
+                resultDict[run][primds] = { 'archival_node' : result[2],
+                                            'tape_node' : result[3],
+                                            'disk_node' : result[4] }
+
+        return resultDict
@@ -0,0 +1,25 @@
+"""
+_InsertDatasetTriggerById_
+
+Oracle implementation of InsertDatasetTriggerById
+
+Same as InsertDatasetTrigger, but with trigger
+and primary dataset ids instead of names.
+
+"""
+
+from WMCore.Database.DBFormatter import DBFormatter
+
+class InsertDatasetTriggerById(DBFormatter):
+
+    def execute(self, binds, conn = None, transaction = False):
+
+        sql = """INSERT INTO run_trig_primds_assoc
+                 (RUN_ID, TRIG_ID, PRIMDS_ID)
+                 VALUES (:RUN, :TRIG_ID, :PRIMDS_ID)
+                 """
+
+        self.dbi.processData(sql, binds, conn = conn,
+                             transaction = transaction)
+
+        return
@@ -0,0 +1,25 @@
+"""
+_InsertStreamDatasetById_
+
+Oracle implementation of InsertStreamDatasetById
+
+Same as InsertStreamDataset, but with primary
+dataset and stream ids instead of names.
+
+"""
+
+from WMCore.Database.DBFormatter import DBFormatter
+
+class InsertStreamDatasetById(DBFormatter):
+
+    def execute(self, binds, conn = None, transaction = False):
+
+        sql = """INSERT INTO run_primds_stream_assoc
+                 (RUN_ID, PRIMDS_ID, STREAM_ID)
+                 VALUES (:RUN, :PRIMDS_ID, :STREAM_ID)
+                 """
+
+        self.dbi.processData(sql, binds, conn = conn,
+                             transaction = transaction)
+
+        return
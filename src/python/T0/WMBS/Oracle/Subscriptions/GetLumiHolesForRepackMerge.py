@@ -4,10 +4,13 @@ _GetLumiHolesForRepackMerge_
 Oracle implementation of GetLumiHolesForRepackMerge
 
 For a given repack merge subscription return the empty lumis (no streamers)
+above minLumi (used with the lumi cursor)
 """
 
 from WMCore.Database.DBFormatter import DBFormatter
 
+from T0.DataStructs.LumiSet import LumiSet
+
 class GetLumiHolesForRepackMerge(DBFormatter):
 
     sql = """SELECT lumi_section_closed.lumi_id AS lumi
@@ -24,15 +27,15 @@ class GetLumiHolesForRepackMerge(DBFormatter):
                lumi_section_closed.close_time > 0 AND
                lumi_section_closed.filecount = 0
              WHERE wmbs_subscription.id = :subscription
+             AND lumi_section_closed.lumi_id > :minlumi
              """
 
-    def execute(self, subscription, conn = None, transaction = False):
+    def execute(self, subscription, minLumi = 0, conn = None, transaction = False):
 
-        results = self.dbi.processData(self.sql, { 'subscription' : subscription },
-                                       conn = conn, transaction = transaction)[0].fetchall()
+        binds = { 'subscription' : subscription,
+                  'minlumi' : minLumi }
 
-        lumiSet = set()
-        for result in results:
-            lumiSet.add(result[0])
+        results = self.dbi.processData(self.sql, binds,
+                                       conn = conn, transaction = transaction)[0].fetchall()
 
-        return lumiSet
+        return LumiSet([ result[0] for result in results ])
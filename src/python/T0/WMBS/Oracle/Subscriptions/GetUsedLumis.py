@@ -6,83 +6,85 @@ Oracle implementation of GetUsedLumis
 Returns the already used lumis for a given subscription
 
 Currently only used by Repack and RepackMerge job splitters
-"""
 
-from WMCore.Database.DBFormatter import DBFormatter
+Lumis of acquired, complete and failed files (and optionally of
+files staged out directly to merged output) are collected in one
+query, deduplicated and grouped into consecutive lumi ranges on
+the database side, so only one row per lumi range is returned.
 
-class GetUsedLumis(DBFormatter):
+Only lumis above minLumi are returned (used with the lumi cursor).
+"""
 
-    def execute(self, subscription, checkStageoutToMerged, conn = None, transaction = False):
+from WMCore.Database.DBFormatter import DBFormatter
 
-        # check which lumis are already in acquired, complete
-        # or failed files for this subscription
+from T0.DataStructs.LumiSet import LumiSet
 
-        lumiSet = set()
+class GetUsedLumis(DBFormatter):
 
-        sql = """SELECT wmbs_file_runlumi_map.lumi AS lumi
+    # lumis in acquired, complete or failed files for this subscription
+    usedSql = """SELECT wmbs_file_runlumi_map.lumi AS lumi
                  FROM wmbs_sub_files_acquired
                  INNER JOIN wmbs_file_runlumi_map ON
                    wmbs_file_runlumi_map.fileid = wmbs_sub_files_acquired.fileid
                  WHERE wmbs_sub_files_acquired.subscription = :subscription
-                 """
-
-        results = self.dbi.processData(sql, { 'subscription' : subscription },
-                                       conn = conn, transaction = transaction)
-
-        for result in self.formatDict(results):
-            lumiSet.add(result['lumi'])
-
-        sql = """SELECT wmbs_file_runlumi_map.lumi AS lumi
+                 AND wmbs_file_runlumi_map.lumi > :minlumi
+                 UNION
+                 SELECT wmbs_file_runlumi_map.lumi AS lumi
                  FROM wmbs_sub_files_complete
                  INNER JOIN wmbs_file_runlumi_map ON
                    wmbs_file_runlumi_map.fileid = wmbs_sub_files_complete.fileid
                  WHERE wmbs_sub_files_complete.subscription = :subscription
-                 """
-
-        results = self.dbi.processData(sql, { 'subscription' : subscription },
-                                       conn = conn, transaction = transaction)
-
-        for result in self.formatDict(results):
-            lumiSet.add(result['lumi'])
-
-        sql = """SELECT wmbs_file_runlumi_map.lumi AS lumi
+                 AND wmbs_file_runlumi_map.lumi > :minlumi
+                 UNION
+                 SELECT wmbs_file_runlumi_map.lumi AS lumi
                  FROM wmbs_sub_files_failed
                  INNER JOIN wmbs_file_runlumi_map ON
                    wmbs_file_runlumi_map.fileid = wmbs_sub_files_failed.fileid
                  WHERE wmbs_sub_files_failed.subscription = :subscription
+                 AND wmbs_file_runlumi_map.lumi > :minlumi
                  """
 
-        results = self.dbi.processData(sql, { 'subscription' : subscription },
-                                       conn = conn, transaction = transaction)
+    # lumis in files staged out directly to merged output
+    # (used when called from repackmerge)
+    mergedSql = """UNION
+                   SELECT wmbs_file_runlumi_map.lumi AS lumi
+                   FROM wmbs_fileset_files
+                   INNER JOIN wmbs_file_runlumi_map ON
+                     wmbs_file_runlumi_map.fileid = wmbs_fileset_files.fileid
+                   WHERE wmbs_fileset_files.fileset =
+                     ( SELECT output_fileset
+                       FROM wmbs_workflow_output
+                       WHERE workflow_id =
+                         ( SELECT workflow
+                           FROM wmbs_subscription
+                           WHERE id = :subscription )
+                       AND output_identifier = 'Merged' )
+                   AND wmbs_file_runlumi_map.lumi > :minlumi
+                   """
+
+    # consecutive lumis have the same difference
+    # between lumi and position in lumi order
+    rangeSql = """SELECT MIN(lumi) AS first_lumi,
+                         MAX(lumi) AS last_lumi
+                  FROM (
+                    SELECT lumi,
+                           lumi - ROW_NUMBER() OVER (ORDER BY lumi) AS lumi_group
+                    FROM ( %s )
+                  )
+                  GROUP BY lumi_group
+                  """
+
+    def execute(self, subscription, checkStageoutToMerged, minLumi = 0, conn = None, transaction = False):
 
-        for result in self.formatDict(results):
-            lumiSet.add(result['lumi'])
+        if checkStageoutToMerged:
+            sql = self.rangeSql % (self.usedSql + self.mergedSql)
+        else:
+            sql = self.rangeSql % self.usedSql
 
-        #
-        # optionally check for direct stageout to merged output
-        # (used when called from repackmerge)
-        #
+        binds = { 'subscription' : subscription,
+                  'minlumi' : minLumi }
 
-        if checkStageoutToMerged:
+        results = self.dbi.processData(sql, binds,
+                                       conn = conn, transaction = transaction)[0].fetchall()
 
-            sql = """SELECT wmbs_file_runlumi_map.lumi AS lumi
-                     FROM wmbs_fileset_files
-                     INNER JOIN wmbs_file_runlumi_map ON
-                       wmbs_file_runlumi_map.fileid = wmbs_fileset_files.fileid
-                     WHERE wmbs_fileset_files.fileset =
-                       ( SELECT output_fileset
-                         FROM wmbs_workflow_output
-                         WHERE workflow_id =
-                           ( SELECT workflow
-                             FROM wmbs_subscription
-                             WHERE id = :subscription )
-                         AND output_identifier = 'Merged' )
-                     """
-
-            results = self.dbi.processData(sql, { 'subscription' : subscription },
-                                           conn = conn, transaction = transaction)
-
-            for result in self.formatDict(results):
-                lumiSet.add(result['lumi'])
-
-        return lumiSet
+        return LumiSet.fromRanges([ (result[0], result[1]) for result in results ])
@@ -9,6 +9,8 @@ check for new streamers and insert them into the
 appropriate fileset. Also mark streamers as used.
 Only consider streamers that are in closed lumis.
 
+Returns the number of streamers fed.
+
 """
 
 import time
@@ -71,7 +73,7 @@ class FeedStreamers(DBFormatter):
                    SET a.used = 1
                  """
 
-        self.dbi.processData(sql, {}, conn = conn,
-                             transaction = transaction)
+        results = self.dbi.processData(sql, {}, conn = conn,
+                                       transaction = transaction)
 
-        return
+        return results[0].rowcount
@@ -2,19 +2,21 @@
 _MarkCloseoutWorkflowMonitoring_
 
 Oracle implementation of MarkCloseoutWorkflowMonitoring
-Sets a workflow as "closeout=1" in workflow_monitoring table, should be used after successful upload to couchDB
+Sets workflows as "closeout=1" in workflow_monitoring table, should be used after successful upload to couchDB
 """
 from WMCore.Database.DBFormatter import DBFormatter
 
 class MarkCloseoutWorkflowMonitoring(DBFormatter):
 
-    def execute(self, workflowId, conn = None, transaction = False):
+    def execute(self, workflowIds, conn = None, transaction = False):
 
         sql = """UPDATE workflow_monitoring
                  SET closeout = 1
                  WHERE workflow = :WORKFLOW_ID"""
 
-        binds = [{'WORKFLOW_ID': workflowId}]
+        binds = []
+        for workflowId in workflowIds:
+            binds.append( { 'WORKFLOW_ID' : workflowId } )
         self.dbi.processData(sql, binds, conn = conn,
                              transaction = transaction)
         return 
@@ -3,7 +3,7 @@ _MarkTrackedWorkflowMonitoring_
 
 Oracle implementation of MarkTrackedWorkflowMonitoring.
 
-Sets a workflow as tracked=1 in workflow_monitoring table,
+Sets workflows as tracked=1 in workflow_monitoring table,
 should be used after successful upload to Couch.
 
 """
@@ -12,13 +12,15 @@ from WMCore.Database.DBFormatter import DBFormatter
 
 class MarkTrackedWorkflowMonitoring(DBFormatter):
 
-    def execute(self, workflowId, conn = None, transaction = False):
+    def execute(self, workflowIds, conn = None, transaction = False):
 
         sql = """UPDATE workflow_monitoring
                  SET tracked = 1
                  WHERE workflow = :WORKFLOW_ID"""
 
-        binds = { 'WORKFLOW_ID' : workflowId }
+        binds = []
+        for workflowId in workflowIds:
+            binds.append( { 'WORKFLOW_ID' : workflowId } )
 
         self.dbi.processData(sql, binds, conn = conn,
                              transaction = transaction)
@@ -172,6 +172,7 @@ class RepackWorkloadFactory(StdBase):
         self.repackSplitArgs['maxInputEvents'] = arguments['MaxInputEvents']
         self.repackSplitArgs['maxInputFiles'] = arguments['MaxInputFiles']
         self.repackSplitArgs['maxLatency'] = arguments['MaxLatency']
+        self.repackSplitArgs['useLumiCursor'] = self.useLumiCursor
         self.repackMergeSplitArgs = {}
         self.repackMergeSplitArgs['minInputSize'] = arguments['MinInputSize']
         self.repackMergeSplitArgs['maxInputSize'] = arguments['MaxInputSize']
@@ -180,6 +181,7 @@ class RepackWorkloadFactory(StdBase):
         self.repackMergeSplitArgs['maxInputEvents'] = arguments['MaxInputEvents']
         self.repackMergeSplitArgs['maxInputFiles'] = arguments['MaxInputFiles']
         self.repackMergeSplitArgs['maxLatency'] = arguments['MaxLatency']
+        self.repackMergeSplitArgs['useLumiCursor'] = self.useLumiCursor
 
         return self.buildWorkload()
 
@@ -202,6 +204,7 @@ class RepackWorkloadFactory(StdBase):
                     "BlockCloseDelay": {"type": int, "optional": False,
                                         "validate": lambda x : x > 0,
                                         },
+                    "UseLumiCursor": {"default" : False, "type": bool},
                     }
         baseArgs.update(specArgs)
         StdBase.setDefaultArgumentsProperty(baseArgs)
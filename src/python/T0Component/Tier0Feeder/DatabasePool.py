@@ -0,0 +1,200 @@
+"""
+_DatabasePool_
+
+Managed connections to the external databases used by the Tier0Feeder
+(StorageManager, HLTConfDatabase, PopConLogDatabase, T0DataSvcDatabase)
+
+Each database is represented by a ManagedDBInterface which can be used
+wherever a database interface is expected (DAOFactory, APIs). It only
+connects on first use, checks the connection with a cheap query if it
+wasn't used successfully for a while and transparently reconnects when
+the check or a query fails because the connection went stale.
+
+The underlying database interface is thread safe (every processData
+call without explicit connection takes its own connection from the
+engine pool), reconnects are serialized, so the managed interfaces can
+be shared between concurrently running stages.
+
+"""
+import time
+import logging
+import threading
+
+from WMCore.Database.DBFactory import DBFactory
+
+
+class ManagedDBInterface(object):
+    """
+    _ManagedDBInterface_
+
+    Lazily connected, health checked and reconnecting database interface
+
+    """
+    def __init__(self, name, connectUrl, checkInterval = 300, checkQuery = "SELECT 1 FROM DUAL"):
+        """
+        _init_
+
+        """
+        self.name = name
+        self.connectUrl = connectUrl
+        self.checkInterval = checkInterval
+        self.checkQuery = checkQuery
+
+        self.dbInterface = None
+        self.lastSuccess = 0
+        self.lock = threading.Lock()
+
+        self.usage = { 'connects' : 0,
+                       'calls' : 0,
+                       'failures' : 0,
+                       'checks' : 0,
+                       'failedChecks' : 0,
+                       'time' : 0 }
+
+        return
+
+    def connect(self, staleInterface = None):
+        """
+        _connect_
+
+        (Re)create the underlying database interface, unless another
+        thread already replaced the stale one in the meantime
+
+        """
+        with self.lock:
+            if self.dbInterface == None or self.dbInterface is staleInterface:
+                logging.info("Connecting to %s database" % self.name)
+                dbFactory = DBFactory(logging, dburl = self.connectUrl, options = {})
+                self.dbInterface = dbFactory.connect()
+                self.lastSuccess = time.time()
+                self.usage['connects'] += 1
+
+        return self.dbInterface
+
+    def getDBInterface(self):
+        """
+        _getDBInterface_
+
+        Return the underlying database interface, connecting on first use
+        and checking the connection if it wasn't used for checkInterval
+
+        """
+        dbInterface = self.dbInterface
+        if dbInterface == None:
+            return self.connect()
+
+        if time.time() - self.lastSuccess > self.checkInterval:
+            self.usage['checks'] += 1
+            if self.isAlive(dbInterface):
+                self.lastSuccess = time.time()
+            else:
+                self.usage['failedChecks'] += 1
+                logging.error("Connection to %s database is stale, reconnecting" % self.name)
+                dbInterface = self.connect(dbInterface)
+
+        return dbInterface
+
+    def isAlive(self, dbInterface):
+        """
+        _isAlive_
+
+        """
+        try:
+            dbInterface.processData(self.checkQuery, {}, transaction = False)
+        except Exception:
+            return False
+
+        return True
+
+    def processData(self, sql, binds = {}, conn = None, transaction = False, *args, **kwargs):
+        """
+        _processData_
+
+        Same interface as DBInterface.processData. A failed call
+        without explicit connection or transaction is retried once
+        on a new connection if the old one turns out to be dead.
+
+        """
+        dbInterface = self.getDBInterface()
+
+        startTime = time.time()
+        self.usage['calls'] += 1
+        try:
+            results = dbInterface.processData(sql, binds, conn, transaction, *args, **kwargs)
+        except Exception:
+            self.usage['failures'] += 1
+            if conn != None or transaction or self.isAlive(dbInterface):
+                raise
+            logging.error("Connection to %s database was lost, reconnecting and retrying" % self.name)
+            dbInterface = self.connect(dbInterface)
+            results = dbInterface.processData(sql, binds, conn, transaction, *args, **kwargs)
+        finally:
+            self.usage['time'] += time.time() - startTime
+
+        self.lastSuccess = time.time()
+
+        return results
+
+    def __getattr__(self, name):
+        """
+        _getattr_
+
+        Everything else (engine, connection etc) comes
+        from the underlying database interface
+
+        """
+        if name.startswith("_") or name in [ "dbInterface", "lock", "usage" ]:
+            raise AttributeError(name)
+
+        return getattr(self.getDBInterface(), name)
+
+
+class DatabasePool(object):
+    """
+    _DatabasePool_
+
+    The external databases of the Tier0Feeder, by name
+
+    """
+    def __init__(self, checkInterval = 300):
+        """
+        _init_
+
+        """
+        self.checkInterval = checkInterval
+        self.databases = {}
+
+        return
+
+    def addDatabase(self, name, connectUrl):
+        """
+        _addDatabase_
+
+        Register a database, no connection is made yet
+
+        """
+        self.databases[name] = ManagedDBInterface(name, connectUrl,
+                                                  checkInterval = self.checkInterval)
+
+        return self.databases[name]
+
+    def getDatabase(self, name):
+        """
+        _getDatabase_
+
+        """
+        return self.databases.get(name)
+
+    def usage(self):
+        """
+        _usage_
+
+        Usage metrics per database
+
+        """
+        usage = {}
+        for name, database in self.databases.items():
+            usage[name] = dict(database.usage)
+            usage[name]['connected'] = database.dbInterface != None
+
+        return usage
@@ -0,0 +1,225 @@
+"""
+_FeederMetrics_
+
+Instrumentation for the Tier0Feeder polling cycle
+
+Records wall time, database round-trips and rows touched
+for every stage of a Tier0FeederPoller cycle, keeps a
+rolling history of cycles and writes it out as a JSON
+metrics file that can be picked up for monitoring.
+
+"""
+import os
+import json
+import time
+import logging
+import threading
+import contextlib
+import collections
+
+
+class FeederMetrics(object):
+    """
+    _FeederMetrics_
+
+    Rolling per stage metrics for Tier0Feeder cycles
+
+    """
+    def __init__(self, historySize = 100, metricsFile = None):
+        """
+        _init_
+
+        """
+        self.history = collections.deque(maxlen = historySize)
+        self.metricsFile = metricsFile
+
+        self.currentCycle = None
+        self.lock = threading.Lock()
+
+        # additional metrics written to the metrics file
+        self.sources = {}
+
+        # the stage a thread is currently running, needed to
+        # assign database calls to the stage that issued them
+        self.threadState = threading.local()
+
+        return
+
+    def instrument(self, dbInterface):
+        """
+        _instrument_
+
+        Wrap processData of a database interface so that every
+        call is counted against the stage currently running in
+        the calling thread. Safe to call repeatedly.
+
+        """
+        if dbInterface == None or getattr(dbInterface, "_feederMetrics", None) is self:
+            return
+
+        originalProcessData = dbInterface.processData
+
+        def processData(*args, **kwargs):
+            results = originalProcessData(*args, **kwargs)
+            self.recordDatabaseCall(results)
+            return results
+
+        dbInterface.processData = processData
+        dbInterface._feederMetrics = self
+
+        return
+
+    def recordDatabaseCall(self, results):
+        """
+        _recordDatabaseCall_
+
+        Count a database round-trip and the rows it touched
+
+        """
+        stageRecord = getattr(self.threadState, "stageRecord", None)
+        if stageRecord == None:
+            return
+
+        rows = 0
+        if isinstance(results, list):
+            for result in results:
+                rowcount = getattr(result, "rowcount", 0)
+                if isinstance(rowcount, int) and rowcount > 0:
+                    rows += rowcount
+
+        with self.lock:
+            stageRecord['dbCalls'] += 1
+            stageRecord['rows'] += rows
+
+        return
+
+    def addSource(self, name, function):
+        """
+        _addSource_
+
+        Add the result of function, called whenever the metrics
+        file is written, under name to the metrics file
+
+        """
+        self.sources[name] = function
+        return
+
+    def startCycle(self):
+        """
+        _startCycle_
+
+        """
+        self.currentCycle = { 'start' : time.time(),
+                              'duration' : 0,
+                              'stages' : {},
+                              'stageOrder' : [] }
+        return
+
+    @contextlib.contextmanager
+    def stage(self, name):
+        """
+        _stage_
+
+        Context manager wrapping a single stage of the cycle
+
+        """
+        stageRecord = { 'time' : 0,
+                        'dbCalls' : 0,
+                        'rows' : 0,
+                        'failed' : False }
+
+        if self.currentCycle != None:
+            with self.lock:
+                self.currentCycle['stages'][name] = stageRecord
+                self.currentCycle['stageOrder'].append(name)
+
+        previousRecord = getattr(self.threadState, "stageRecord", None)
+        self.threadState.stageRecord = stageRecord
+
+        startTime = time.time()
+        try:
+            yield stageRecord
+        except:
+            stageRecord['failed'] = True
+            raise
+        finally:
+            stageRecord['time'] = time.time() - startTime
+            self.threadState.stageRecord = previousRecord
+
+        return
+
+    def endCycle(self):
+        """
+        _endCycle_
+
+        Add the current cycle to the history and
+        update the metrics file if configured
+
+        """
+        if self.currentCycle == None:
+            return
+
+        self.currentCycle['duration'] = time.time() - self.currentCycle['start']
+        self.history.append(self.currentCycle)
+        self.currentCycle = None
+
+        if self.metricsFile != None:
+            try:
+                self.writeMetricsFile()
+            except Exception:
+                logging.exception("Could not write Tier0Feeder metrics file %s" % self.metricsFile)
+
+        return
+
+    def summary(self):
+        """
+        _summary_
+
+        Aggregate the cycle history per stage
+
+        """
+        summary = {}
+        for cycle in self.history:
+            for name, stageRecord in cycle['stages'].items():
+                if name not in summary:
+                    summary[name] = { 'count' : 0,
+                                      'failures' : 0,
+                                      'totalTime' : 0,
+                                      'maxTime' : 0,
+                                      'lastTime' : 0,
+                                      'dbCalls' : 0,
+                                      'rows' : 0 }
+                stageSummary = summary[name]
+                stageSummary['count'] += 1
+                stageSummary['failures'] += int(stageRecord['failed'])
+                stageSummary['totalTime'] += stageRecord['time']
+                stageSummary['maxTime'] = max(stageSummary['maxTime'], stageRecord['time'])
+                stageSummary['lastTime'] = stageRecord['time']
+                stageSummary['dbCalls'] += stageRecord['dbCalls']
+                stageSummary['rows'] += stageRecord['rows']
+
+        for stageSummary in summary.values():
+            stageSummary['avgTime'] = stageSummary['totalTime'] / stageSummary['count']
+
+        return summary
+
+    def writeMetricsFile(self):
+        """
+        _writeMetricsFile_
+
+        Atomically replace the metrics file with the current
+        cycle history and per stage summary
+
+        """
+        metrics = { 'updated' : int(time.time()),
+                    'summary' : self.summary(),
+                    'cycles' : list(self.history) }
+        for name, function in self.sources.items():
+            metrics[name] = function()
+
+        tmpFile = "%s.tmp" % self.metricsFile
+        with open(tmpFile, "w") as fd:
+            json.dump(metrics, fd, indent = 1)
+        os.rename(tmpFile, self.metricsFile)
+
+        return
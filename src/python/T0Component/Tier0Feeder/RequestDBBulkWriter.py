@@ -0,0 +1,116 @@
+"""
+_RequestDBBulkWriter_
+
+RequestDBWriter for the local request couch used for workflow
+monitoring, with methods that handle many workflows at once
+
+Documents are built the same way insertGenericRequest builds them
+and all status changes go through updateRequestStatus, ie. the
+request couchapp update handler, so the request status and the status
+transitions are never written by hand here.
+
+"""
+import logging
+
+from WMCore.Database.CMSCouch import Document
+from WMCore.Services.RequestDB.RequestDBWriter import RequestDBWriter
+
+
+class RequestDBBulkWriter(RequestDBWriter):
+    """
+    _RequestDBBulkWriter_
+
+    RequestDBWriter with bulk insert and status update
+
+    """
+    # documents per bulk request, has to stay below the couch queue
+    # size (1000 by default), the queue commits on its own above it
+    # and the results of such a commit are lost
+    bulkChunkSize = 500
+
+    def insertGenericRequests(self, docs):
+        """
+        _insertGenericRequests_
+
+        Same as insertGenericRequest for a list of request documents,
+        but the documents are committed with bulk requests. Newly
+        inserted requests are then set to new. Requests that already
+        exist are left alone, unless their status was never set (the
+        status update after an earlier insert failed), then setting
+        them to new is retried.
+
+        Returns the names of the requests that exist with a status
+
+        """
+        uploaded = set()
+        for i in range(0, len(docs), self.bulkChunkSize):
+            uploaded |= self.insertRequestsChunk(docs[i:i + self.bulkChunkSize])
+
+        return uploaded
+
+    def insertRequestsChunk(self, docs):
+        """
+        _insertRequestsChunk_
+
+        Bulk insert of a chunk of request documents
+
+        """
+        for doc in docs:
+            self.couchDB.queue(Document(doc["RequestName"], doc))
+
+        try:
+            results = self.couchDB.commit()
+        except Exception:
+            logging.exception("Bulk upload of %d requests to couch failed" % len(docs))
+            return set()
+
+        inserted = set()
+        existing = set()
+        for result in results:
+            if 'error' not in result:
+                inserted.add(result['id'])
+            elif result['error'] == "conflict":
+                existing.add(result['id'])
+            else:
+                logging.error("Couch upload of request %s failed : %s" % (result.get('id'), result['error']))
+
+        if len(existing) > 0:
+            try:
+                existingDocs = self.couchDB.allDocs(options = { 'include_docs' : True },
+                                                    keys = sorted(existing))
+            except Exception:
+                logging.exception("Couch lookup of %d existing requests failed" % len(existing))
+                existing = set()
+            else:
+                existing = set()
+                for row in existingDocs['rows']:
+                    doc = row.get('doc')
+                    if doc == None:
+                        continue
+                    if doc.get('RequestStatus') != None:
+                        existing.add(row['id'])
+                    else:
+                        inserted.add(row['id'])
+
+        return self.updateRequestsStatus(inserted, "new") | existing
+
+    def updateRequestsStatus(self, requests, status):
+        """
+        _updateRequestsStatus_
+
+        Same as updateRequestStatus for a list of requests, couch update
+        handlers work on a single document, so this is one call per request
+
+        Returns the names of the successfully updated requests
+
+        """
+        updated = set()
+        for request in sorted(requests):
+            try:
+                self.updateRequestStatus(request, status)
+            except Exception:
+                logging.exception("Couch update of request %s to %s failed" % (request, status))
+            else:
+                updated.add(request)
+
+        return updated
@@ -0,0 +1,247 @@
+"""
+_StageScheduler_
+
+Dependency aware scheduler for the stages of a Tier0Feeder cycle
+
+Stages are declared in their natural (serial) order together with
+the stages they depend on. With a single worker they are executed
+in the polling thread in that order. With more workers, stages whose
+dependencies are satisfied run concurrently in a pool of threads,
+each of them with its own database connection.
+
+A failing stage stops the scheduling of any further stages, the
+stages already running are allowed to finish and the exception is
+then raised in the polling thread, same as for serial execution.
+
+"""
+import sys
+import logging
+import threading
+
+try:
+    import queue
+except ImportError:
+    import Queue as queue
+
+from WMCore.Database.Transaction import Transaction
+
+
+class Stage(object):
+    """
+    _Stage_
+
+    A named unit of work in a Tier0Feeder cycle, belonging
+    to a sub-loop that determines how often it runs
+
+    """
+    def __init__(self, name, function, dependencies = None, loop = None):
+        self.name = name
+        self.function = function
+        self.dependencies = dependencies or []
+        self.loop = loop
+        return
+
+
+class StageScheduler(object):
+    """
+    _StageScheduler_
+
+    Runs stages in dependency order, optionally in parallel
+
+    """
+    def __init__(self, workers = 1, metrics = None, workerSetup = None):
+        """
+        _init_
+
+        workerSetup is called in every worker thread once
+        its database connection is set up
+
+        """
+        self.numWorkers = max(1, workers)
+        self.metrics = metrics
+        self.workerSetup = workerSetup
+
+        self.taskQueue = queue.Queue()
+        self.resultQueue = queue.Queue()
+        self.workers = []
+
+        return
+
+    def orderStages(self, stages):
+        """
+        _orderStages_
+
+        Stable topological sort of the stages, dependencies on
+        stages that are not scheduled in this cycle are ignored
+
+        """
+        names = set([ stage.name for stage in stages ])
+
+        orderedStages = []
+        done = set()
+        pending = list(stages)
+        while len(pending) > 0:
+            for stage in pending:
+                if all([ dependency in done or dependency not in names for dependency in stage.dependencies ]):
+                    break
+            else:
+                raise RuntimeError("Circular dependency between Tier0Feeder stages %s" % [ stage.name for stage in pending ])
+            pending.remove(stage)
+            orderedStages.append(stage)
+            done.add(stage.name)
+
+        return orderedStages
+
+    def run(self, stages):
+        """
+        _run_
+
+        Execute the stages of one cycle
+
+        """
+        orderedStages = self.orderStages(stages)
+
+        if self.numWorkers == 1:
+            for stage in orderedStages:
+                self.runStage(stage)
+        else:
+            self.runParallel(orderedStages)
+
+        return
+
+    def runStage(self, stage):
+        """
+        _runStage_
+
+        """
+        if self.metrics != None:
+            with self.metrics.stage(stage.name):
+                stage.function()
+        else:
+            stage.function()
+
+        return
+
+    def runParallel(self, orderedStages):
+        """
+        _runParallel_
+
+        Hand stages to the worker pool as soon as their
+        dependencies are done, in declaration order
+
+        """
+        self.startWorkers()
+
+        names = set([ stage.name for stage in orderedStages ])
+
+        pending = list(orderedStages)
+        running = set()
+        done = set()
+        failure = None
+
+        while len(pending) > 0 or len(running) > 0:
+
+            if failure == None:
+                for stage in list(pending):
+                    if all([ dependency in done or dependency not in names for dependency in stage.dependencies ]):
+                        pending.remove(stage)
+                        running.add(stage.name)
+                        self.taskQueue.put(stage)
+
+            if len(running) == 0:
+                break
+
+            name, excInfo = self.resultQueue.get()
+            running.remove(name)
+            done.add(name)
+
+            if excInfo != None and failure == None:
+                failure = excInfo
+
+        if failure != None:
+            logging.error("Tier0Feeder stage failed, skipped stages: %s" % [ stage.name for stage in pending ])
+            # keep the traceback of the worker thread
+            if hasattr(failure[1], "with_traceback"):
+                raise failure[1].with_traceback(failure[2])
+            raise failure[1]
+
+        return
+
+    def startWorkers(self):
+        """
+        _startWorkers_
+
+        Start the worker threads, they inherit the database
+        factory of the polling thread but open their own connection
+
+        """
+        if len(self.workers) > 0:
+            return
+
+        parentThread = threading.currentThread()
+
+        for i in range(self.numWorkers):
+            worker = threading.Thread(target = self.workerLoop, args = (parentThread,),
+                                      name = "Tier0FeederStage-%d" % i)
+            worker.daemon = True
+            worker.start()
+            self.workers.append(worker)
+
+        return
+
+    def workerLoop(self, parentThread):
+        """
+        _workerLoop_
+
+        """
+        myThread = threading.currentThread()
+        myThread.logger = getattr(parentThread, "logger", logging.getLogger())
+        myThread.dialect = getattr(parentThread, "dialect", None)
+
+        dbFactory = getattr(parentThread, "dbFactory", None)
+        if dbFactory != None:
+            myThread.dbFactory = dbFactory
+            myThread.dbi = dbFactory.connect()
+        else:
+            myThread.dbi = parentThread.dbi
+        myThread.transaction = Transaction(myThread.dbi)
+
+        if self.metrics != None:
+            self.metrics.instrument(myThread.dbi)
+
+        # a worker that dies here would never pick up its stages
+        if self.workerSetup != None:
+            try:
+                self.workerSetup()
+            except Exception:
+                logging.exception("Tier0Feeder stage worker setup failed")
+
+        while True:
+
+            stage = self.taskQueue.get()
+            if stage == None:
+                break
+
+            excInfo = None
+            try:
+                self.runStage(stage)
+            except Exception:
+                logging.exception("Tier0Feeder stage %s failed" % stage.name)
+                excInfo = sys.exc_info()
+
+            self.resultQueue.put((stage.name, excInfo))
+
+        return
+
+    def shutdown(self):
+        """
+        _shutdown_
+
+        Stop the worker threads
+
+        """
+        for worker in self.workers:
+            self.taskQueue.put(None)
+        self.workers = []
+
+        return
@@ -12,21 +12,31 @@ Assigns new data to the correct subscriptions
 
 """
 import os
+import time
 import logging
 import threading
-import subprocess
+import multiprocessing
 
 from WMCore.WorkerThreads.BaseWorkerThread import BaseWorkerThread
-from WMCore.DAOFactory import DAOFactory
-from WMCore.Database.DBFactory import DBFactory
 from WMCore.WMException import WMException
-from WMCore.Configuration import loadConfigurationFile
-from WMCore.Services.RequestDB.RequestDBWriter import RequestDBWriter
 
+from T0.WMBS.DAORegistry import getDAOFactory
 from T0.RunConfig import RunConfigAPI
+from T0.RunConfig.Tier0ConfigCache import Tier0ConfigCache
+from T0.RunConfig.HLTConfigCache import HLTConfigCache
+from T0.RunConfig.NameIdCache import getNameIdCache
+from T0.RunConfig.WorkloadTemplateCache import WorkloadTemplateCache
 from T0.RunLumiCloseout import RunLumiCloseoutAPI
+from T0.SMNotification import SMNotificationAPI
+from T0.T0DataSvc.T0DataSvcReplicator import T0DataSvcReplicator
 from T0.ConditionUpload import ConditionUploadAPI
 
+from T0Component.Tier0Feeder.FeederMetrics import FeederMetrics
+from T0Component.Tier0Feeder.RequestDBBulkWriter import RequestDBBulkWriter
+from T0Component.Tier0Feeder.DatabasePool import DatabasePool
+from T0Component.Tier0Feeder.StageScheduler import Stage
+from T0Component.Tier0Feeder.StageScheduler import StageScheduler
+
 
 class Tier0FeederPoller(BaseWorkerThread):
 
@@ -39,10 +49,6 @@ class Tier0FeederPoller(BaseWorkerThread):
 
         myThread = threading.currentThread()
 
-        self.daoFactory = DAOFactory(package = "T0.WMBS",
-                                     logger = logging,
-                                     dbinterface = myThread.dbi)
-
         self.tier0ConfigFile = config.Tier0Feeder.tier0ConfigFile
         self.specDirectory = config.Tier0Feeder.specDirectory
         self.dropboxuser = getattr(config.Tier0Feeder, "dropboxuser", None)
@@ -53,33 +59,74 @@ class Tier0FeederPoller(BaseWorkerThread):
             if not os.path.exists(self.transferSystemBaseDir):
                 self.transferSystemBaseDir = None
 
+        self.smNotifier = None
+        if self.transferSystemBaseDir != None:
+            notifierClass = getattr(config.Tier0Feeder, "smNotifier",
+                                    "T0.SMNotification.SMNotificationAPI.ScriptNotifier")
+            self.smNotifier = SMNotificationAPI.loadNotifier(notifierClass,
+                                                             transferSystemBaseDir = self.transferSystemBaseDir)
+        self.smNotificationBatchSize = getattr(config.Tier0Feeder, "smNotificationBatchSize", 50)
+        self.smNotificationConcurrency = getattr(config.Tier0Feeder, "smNotificationConcurrency", 1)
+
         self.dqmUploadProxy = getattr(config.Tier0Feeder, "dqmUploadProxy", None)
+
+        # number of runs pre-released for PromptReco per cycle (0 means all)
+        self.recoReleaseMaxRuns = getattr(config.Tier0Feeder, "recoReleaseMaxRuns", 1)
+
+        # PromptReco release backlog for the metrics file, queried
+        # at most every recoReleaseBacklogInterval seconds
+        self.recoReleaseBacklog = {}
+        self.recoReleaseBacklogInterval = getattr(config.Tier0Feeder, "recoReleaseBacklogInterval", 300)
+        self.recoReleaseBacklogTime = 0
+
+        # runs with identical stream/dataset configuration share workload templates
+        self.workloadTemplateCache = None
+        workloadTemplateCacheSize = getattr(config.Tier0Feeder, "workloadTemplateCacheSize", 0)
+        if workloadTemplateCacheSize > 0:
+            self.workloadTemplateCache = WorkloadTemplateCache(size = workloadTemplateCacheSize)
+
+        # workloads are CPU heavy to build, optionally build them
+        # in worker processes (forked here, before any stage thread,
+        # but with the harness threads running and the database
+        # connected, the processes must never use the connection)
+        self.specBuilderPool = None
+        specBuilderProcesses = getattr(config.Tier0Feeder, "specBuilderProcesses", 0)
+        if specBuilderProcesses > 0:
+            self.specBuilderPool = multiprocessing.Pool(specBuilderProcesses,
+                                                        initializer = RunConfigAPI.initSpecBuilderProcess)
         self.serviceProxy = getattr(config.Tier0Feeder, "serviceProxy", None)
 
-        self.localRequestCouchDB = RequestDBWriter(config.AnalyticsDataCollector.localT0RequestDBURL, 
-                                                   couchapp = config.AnalyticsDataCollector.RequestCouchApp)
+        self.localRequestCouchDB = RequestDBBulkWriter(config.AnalyticsDataCollector.localT0RequestDBURL,
+                                                       couchapp = config.AnalyticsDataCollector.RequestCouchApp)
+
+        #
+        # external databases are connected lazily, health checked
+        # and reconnected if their connection goes stale
+        #
+        self.databasePool = DatabasePool(checkInterval = getattr(config.Tier0Feeder, "databaseCheckInterval", 300))
 
-        hltConfConnectUrl = config.HLTConfDatabase.connectUrl
-        dbFactoryHltConf = DBFactory(logging, dburl = hltConfConnectUrl, options = {})
-        dbInterfaceHltConf = dbFactoryHltConf.connect()
-        daoFactoryHltConf = DAOFactory(package = "T0.WMBS",
-                                       logger = logging,
-                                       dbinterface = dbInterfaceHltConf)
+        dbInterfaceHltConf = self.databasePool.addDatabase("HLTConf", config.HLTConfDatabase.connectUrl)
+        daoFactoryHltConf = getDAOFactory(package = "T0.WMBS",
+                                          logger = logging,
+                                          dbinterface = dbInterfaceHltConf)
         self.getHLTConfigDAO = daoFactoryHltConf(classname = "RunConfig.GetHLTConfig")
 
-        storageManagerConnectUrl = config.StorageManagerDatabase.connectUrl
-        dbFactoryStorageManager = DBFactory(logging, dburl = storageManagerConnectUrl, options = {})
-        self.dbInterfaceStorageManager = dbFactoryStorageManager.connect()
+        # consecutive runs usually share the HLT key, cache HLT configurations
+        self.hltConfigCache = HLTConfigCache(self.getHLTConfigDAO.execute,
+                                             size = getattr(config.Tier0Feeder, "hltConfigCacheSize", 100),
+                                             cacheDir = getattr(config.Tier0Feeder, "hltConfigCacheDir", None))
+
+        self.dbInterfaceStorageManager = self.databasePool.addDatabase("StorageManager",
+                                                                       config.StorageManagerDatabase.connectUrl)
 
         self.getExpressReadyRunsDAO = None
         if hasattr(config, "PopConLogDatabase"):
             popConLogConnectUrl = getattr(config.PopConLogDatabase, "connectUrl", None)
             if popConLogConnectUrl != None:
-                dbFactoryPopConLog = DBFactory(logging, dburl = popConLogConnectUrl, options = {})
-                dbInterfacePopConLog = dbFactoryPopConLog.connect()
-                daoFactoryPopConLog = DAOFactory(package = "T0.WMBS",
-                                                 logger = logging,
-                                                 dbinterface = dbInterfacePopConLog)
+                dbInterfacePopConLog = self.databasePool.addDatabase("PopConLog", popConLogConnectUrl)
+                daoFactoryPopConLog = getDAOFactory(package = "T0.WMBS",
+                                                    logger = logging,
+                                                    dbinterface = dbInterfacePopConLog)
                 self.getExpressReadyRunsDAO = daoFactoryPopConLog(classname = "Tier0Feeder.GetExpressReadyRuns")
 
         self.haveT0DataSvc = False
@@ -87,11 +134,101 @@ class Tier0FeederPoller(BaseWorkerThread):
             t0datasvcConnectUrl = getattr(config.T0DataSvcDatabase, "connectUrl", None)
             if t0datasvcConnectUrl != None:
                 self.haveT0DataSvc = True
-                dbFactoryT0DataSvc = DBFactory(logging, dburl = t0datasvcConnectUrl, options = {})
-                dbInterfaceT0DataSvc = dbFactoryT0DataSvc.connect()
-                self.daoFactoryT0DataSvc = DAOFactory(package = "T0.WMBS",
-                                                      logger = logging,
-                                                      dbinterface = dbInterfaceT0DataSvc)
+                dbInterfaceT0DataSvc = self.databasePool.addDatabase("T0DataSvc", t0datasvcConnectUrl)
+                self.daoFactoryT0DataSvc = getDAOFactory(package = "T0.WMBS",
+                                                         logger = logging,
+                                                         dbinterface = dbInterfaceT0DataSvc)
+                self.t0DataSvcReplicator = T0DataSvcReplicator(self.daoFactory, self.daoFactoryT0DataSvc,
+                                                               chunkSize = getattr(config.Tier0Feeder, "t0DataSvcChunkSize", 1000),
+                                                               maxBackoff = getattr(config.Tier0Feeder, "t0DataSvcMaxBackoff", 3600))
+
+        #
+        # per stage timing and database counters, written
+        # out as rolling history to a JSON metrics file
+        #
+        metricsFile = getattr(config.Tier0Feeder, "metricsFile", None)
+        if metricsFile == None and getattr(config.Tier0Feeder, "componentDir", None) != None:
+            metricsFile = os.path.join(config.Tier0Feeder.componentDir, "Tier0FeederMetrics.json")
+        self.metrics = FeederMetrics(historySize = getattr(config.Tier0Feeder, "metricsHistory", 100),
+                                     metricsFile = metricsFile)
+        self.metrics.addSource("databases", self.databasePool.usage)
+        self.metrics.addSource("recoReleaseBacklog", self.getRecoReleaseBacklog)
+        if self.workloadTemplateCache != None:
+            self.metrics.addSource("workloadTemplates", self.workloadTemplateCache.usage)
+
+        self.dbInterfaces = [ myThread.dbi, dbInterfaceHltConf, self.dbInterfaceStorageManager ]
+        if self.getExpressReadyRunsDAO != None:
+            self.dbInterfaces.append(dbInterfacePopConLog)
+        if self.haveT0DataSvc:
+            self.dbInterfaces.append(dbInterfaceT0DataSvc)
+
+        #
+        # independent stages can run concurrently in a pool of
+        # stageWorkers threads, by default everything is serial
+        #
+        self.scheduler = StageScheduler(workers = getattr(config.Tier0Feeder, "stageWorkers", 1),
+                                        metrics = self.metrics,
+                                        workerSetup = self.warmNameIdCache)
+
+        #
+        # stages are grouped into sub-loops (RunConfig, Streamer, T0DataSvc,
+        # Monitoring, SMNotification, ConditionUpload) that can run at their
+        # own cadence, loops without a configured interval run every cycle
+        #
+        self.loopIntervals = getattr(config.Tier0Feeder, "loopIntervals", {})
+        self.loopLastRun = {}
+
+        #
+        # adaptive polling, restart right away (up to maxBusyCycles times
+        # in a row) if new runs or run/streams were found, new lumis were
+        # closed or streamers were fed, back off exponentially up to
+        # maxPollInterval (by default 10 * pollInterval) when there is
+        # no work, a new run ends the backoff in the cycle finding it
+        #
+        self.adaptivePolling = getattr(config.Tier0Feeder, "adaptivePolling", False)
+        self.pollInterval = config.Tier0Feeder.pollInterval
+        self.minPollInterval = getattr(config.Tier0Feeder, "minPollInterval", 1)
+        self.maxPollInterval = getattr(config.Tier0Feeder, "maxPollInterval", 10 * self.pollInterval)
+        self.maxBusyCycles = getattr(config.Tier0Feeder, "maxBusyCycles", 10)
+        self.busyCycles = 0
+        self.workFound = 0
+        self.workFoundLock = threading.Lock()
+
+        # new runs are configured in bulk, in chunks of this many runs
+        self.configureRunsChunkSize = getattr(config.Tier0Feeder, "configureRunsChunkSize", 50)
+
+        self.tier0ConfigCache = Tier0ConfigCache(self.tier0ConfigFile)
+        self.tier0Config = None
+
+        return
+
+    def setup(self, parameters = None):
+        """
+        _setup_
+
+        Called in the polling thread before the first cycle
+
+        """
+        self.warmNameIdCache()
+
+        return
+
+    def warmNameIdCache(self):
+        """
+        _warmNameIdCache_
+
+        Load the stream, dataset, trigger and CMSSW version ids for
+        the database connection of the calling thread (polling thread
+        or stage worker), tables that fail to load here are loaded
+        the first time they are used
+
+        """
+        myThread = threading.currentThread()
+
+        try:
+            getNameIdCache(myThread.dbi).warm()
+        except Exception:
+            logging.exception("Could not warm the name to id cache")
 
         return
 
@@ -103,453 +240,566 @@ class Tier0FeederPoller(BaseWorkerThread):
         logging.debug("Running Tier0Feeder algorithm...")
         myThread = threading.currentThread()
 
-        findNewRunsDAO = self.daoFactory(classname = "Tier0Feeder.FindNewRuns")
-        findNewRunStreamsDAO = self.daoFactory(classname = "Tier0Feeder.FindNewRunStreams")
-        findNewExpressRunsDAO = self.daoFactory(classname = "Tier0Feeder.FindNewExpressRuns")
-        releaseExpressDAO = self.daoFactory(classname = "Tier0Feeder.ReleaseExpress")
-        feedStreamersDAO = self.daoFactory(classname = "Tier0Feeder.FeedStreamers")
-        markWorkflowsInjectedDAO = self.daoFactory(classname = "Tier0Feeder.MarkWorkflowsInjected")
+        self.metrics.startCycle()
+        for dbInterface in self.dbInterfaces + [ myThread.dbi ]:
+            self.metrics.instrument(dbInterface)
 
-        tier0Config = None
+        self.workFound = 0
         try:
-            tier0Config = loadConfigurationFile(self.tier0ConfigFile)
-        except:
-            # usually happens when there are syntax errors in the configuration
-            logging.exception("Cannot load Tier0 configuration file, not configuring new runs and run/streams")
+            self.runStages()
+        finally:
+            self.metrics.endCycle()
 
-        # only configure new runs and run/streams if we have a valid Tier0 configuration
-        if tier0Config != None:
+        if self.adaptivePolling:
+            self.adjustPollInterval()
 
-            #
-            # find new runs, setup global run settings and stream/dataset/trigger mapping
-            #
-            runHltkeys = findNewRunsDAO.execute(transaction = False)
-            for run, hltkey in sorted(runHltkeys.items()):
+        return
 
-                hltConfig = None
+    def daoFactory(self, classname):
+        """
+        _daoFactory_
 
-                # local runs have no hltkey and are configured differently
-                if hltkey != None:
+        Return the DAO for the database connection of the calling
+        thread, stages can run in worker threads with their own
+        connection (the factory is shared per connection)
 
-                    # retrieve HLT configuration and make sure it's usable
-                    try:
-                        hltConfig = self.getHLTConfigDAO.execute(hltkey, transaction = False)
-                        if hltConfig['process'] == None or len(hltConfig['mapping']) == 0:
-                            raise RuntimeError("HLTConfDB query returned no process or mapping")
-                    except:
-                        logging.exception("Can't retrieve hltkey %s for run %d" % (hltkey, run))
-                        continue
+        """
+        myThread = threading.currentThread()
 
-                try:
-                    RunConfigAPI.configureRun(tier0Config, run, hltConfig)
-                except:
-                    logging.exception("Can't configure for run %d" % (run))
-
-            #
-            # find unconfigured run/stream with data
-            # populate RunConfig, setup workflows/filesets/subscriptions
-            # 
-            runStreams = findNewRunStreamsDAO.execute(transaction = False)
-            for run in sorted(runStreams.keys()):
-                for stream in sorted(runStreams[run]):
-                    try:
-                        RunConfigAPI.configureRunStream(tier0Config,
-                                                        run, stream,
-                                                        self.specDirectory,
-                                                        self.dqmUploadProxy)
-                    except:
-                        logging.exception("Can't configure for run %d and stream %s" % (run, stream))
+        daoFactory = getDAOFactory(package = "T0.WMBS",
+                                   logger = logging,
+                                   dbinterface = myThread.dbi)
+
+        return daoFactory(classname = classname)
+
+    def addWorkFound(self, workFound):
+        """
+        _addWorkFound_
+
+        Count work found by the streamer path in this cycle,
+        stages can report it from several worker threads
+
+        """
+        with self.workFoundLock:
+            self.workFound += workFound
+
+        return
+
+    def adjustPollInterval(self):
+        """
+        _adjustPollInterval_
+
+        Set the time until the next cycle based on the
+        work found by the streamer path in this cycle
+
+        """
+        if self.workFound > 0:
+            self.busyCycles += 1
+            if self.busyCycles <= self.maxBusyCycles:
+                idleTime = self.minPollInterval
+            else:
+                idleTime = self.pollInterval
+        else:
+            self.busyCycles = 0
+            idleTime = min(self.maxPollInterval, max(self.pollInterval, 2 * getattr(self, "idleTime", self.pollInterval)))
+
+        if idleTime != getattr(self, "idleTime", None):
+            logging.debug("Changing Tier0Feeder poll interval to %s seconds" % idleTime)
+        self.idleTime = idleTime
+
+        return
+
+    def runStages(self):
+        """
+        _runStages_
+
+        Declare the stages of a Tier0Feeder cycle in their natural
+        order with the dependencies between them and hand them to
+        the stage scheduler. Stages without dependencies between
+        them can run concurrently if stageWorkers > 1.
+
+        """
+        stages = []
 
         #
-        # stop and close runs based on RunSummary and StorageManager records
+        # new runs and run/streams need their filesets before their
+        # streamers can be fed, so they are set up (and released for
+        # Express) in the Streamer loop, which has no interval, same
+        # for stopping and closing runs, which gates closing the
+        # run/stream filesets at the end of a run
         #
-        RunLumiCloseoutAPI.stopRuns(self.dbInterfaceStorageManager)
-        RunLumiCloseoutAPI.closeRuns(self.dbInterfaceStorageManager)
+        stages.append(Stage("loadConfiguration", self.loadConfiguration,
+                            loop = "Streamer"))
 
         #
-        # release runs for Express
+        # find new runs, setup global run settings and stream/dataset/trigger mapping
         #
-        runs = findNewExpressRunsDAO.execute(transaction = False)
-
-        if len(runs) > 0:
+        stages.append(Stage("configureRun", self.configureRuns,
+                            [ "loadConfiguration" ],
+                            loop = "Streamer"))
 
-            binds = []
-            for run in runs:
-                binds.append( { 'RUN' : run } )
-
-            if self.getExpressReadyRunsDAO != None:
-                runs = self.getExpressReadyRunsDAO.execute(binds = binds, transaction = False)
-
-            if len(runs) > 0:
+        #
+        # find unconfigured run/stream with data
+        # populate RunConfig, setup workflows/filesets/subscriptions
+        #
+        stages.append(Stage("configureRunStream", self.configureRunStreams,
+                            [ "configureRun" ],
+                            loop = "Streamer"))
 
-                binds = []
-                for run in runs:
-                    binds.append( { 'RUN' : run } )
+        #
+        # stop and close runs based on RunSummary and StorageManager records
+        #
+        stages.append(Stage("stopCloseRuns", self.stopCloseRuns,
+                            loop = "Streamer"))
 
-                releaseExpressDAO.execute(binds = binds, transaction = False)
+        #
+        # release runs for Express
+        #
+        stages.append(Stage("releaseExpress", self.releaseExpress,
+                            [ "configureRunStream" ],
+                            loop = "Streamer"))
 
         #
         # release runs for PromptReco
         #
-        RunConfigAPI.releasePromptReco(tier0Config,
-                                       self.specDirectory,
-                                       self.dqmUploadProxy)
+        stages.append(Stage("releasePromptReco", self.releasePromptReco,
+                            [ "configureRunStream", "stopCloseRuns" ],
+                            loop = "RunConfig"))
 
         #
-        # insert express and reco configs into Tier0 Data Service
+        # publish run/stream completion, express and reco configs
+        # and dataset locks into the Tier0 Data Service
         #
         if self.haveT0DataSvc:
-            self.updateRunStreamDoneT0DataSvc()
-            self.updateExpressConfigsT0DataSvc()
-            self.updateRecoConfigsT0DataSvc()
-            self.updateRecoReleaseConfigsT0DataSvc()
-            self.lockDatasetsT0DataSvc()
+            stages.append(Stage("replicateT0DataSvc", self.t0DataSvcReplicator.replicate,
+                                [ "configureRunStream", "releasePromptReco" ],
+                                loop = "T0DataSvc"))
 
         #
         # mark express and repack workflows as injected if certain conditions are met
         # (we don't do it immediately to prevent the TaskArchiver from cleaning up too early)
         #
-        markWorkflowsInjectedDAO.execute(self.transferSystemBaseDir != None,
-                                         transaction = False)
+        stages.append(Stage("markWorkflowsInjected", self.markWorkflowsInjected,
+                            [ "releaseExpress", "releasePromptReco" ],
+                            loop = "Streamer"))
 
         #
         # close stream/lumis for run/streams that are active (fileset exists and open)
         #
-        RunLumiCloseoutAPI.closeLumiSections(self.dbInterfaceStorageManager)
+        stages.append(Stage("closeLumiSections", self.closeLumiSections,
+                            [ "configureRunStream" ],
+                            loop = "Streamer"))
 
         #
         # feed new data into exisiting filesets
         #
-        try:
-            myThread.transaction.begin()
-            feedStreamersDAO.execute(conn = myThread.transaction.conn, transaction = True)
-        except:
-            logging.exception("Can't feed data, bailing out...")
-            raise
-        else:
-            myThread.transaction.commit()
+        stages.append(Stage("feedStreamers", self.feedStreamers,
+                            [ "closeLumiSections" ],
+                            loop = "Streamer"))
 
         #
         # run ended and run/stream fileset open
         #    => check for complete lumi_closed record, all lumis finally closed and all data feed
         #          => if all conditions satisfied, close the run/stream fileset
         #
-        RunLumiCloseoutAPI.closeRunStreamFilesets()
+        stages.append(Stage("closeRunStreamFilesets", RunLumiCloseoutAPI.closeRunStreamFilesets,
+                            [ "feedStreamers", "stopCloseRuns" ],
+                            loop = "Streamer"))
 
         #
         # check and delete active split lumis
         #
-        RunLumiCloseoutAPI.checkActiveSplitLumis()
+        stages.append(Stage("checkActiveSplitLumis", RunLumiCloseoutAPI.checkActiveSplitLumis,
+                            [ "closeRunStreamFilesets" ],
+                            loop = "Streamer"))
 
         #
         # insert workflows into CouchDB for monitoring
         #
-        self.feedCouchMonitoring()
+        stages.append(Stage("feedCouchMonitoring", self.feedCouchMonitoring,
+                            [ "configureRunStream", "releasePromptReco" ],
+                            loop = "Monitoring"))
 
         #
         # Update Couch when Repack and Express have closed input filesets (analog to old T0 closeout)
         #
-        self.closeOutRealTimeWorkflows()
+        stages.append(Stage("closeOutRealTimeWorkflows", self.closeOutRealTimeWorkflows,
+                            [ "closeRunStreamFilesets", "feedCouchMonitoring" ],
+                            loop = "Monitoring"))
 
         #
         # send repacked notifications to StorageManager
         #
         if self.transferSystemBaseDir != None:
-            self.notifyStorageManager()
+            stages.append(Stage("notifyStorageManager", self.notifyStorageManager,
+                                loop = "SMNotification"))
 
         #
         # upload PCL conditions to DropBox
         #
-        ConditionUploadAPI.uploadConditions(self.dropboxuser, self.dropboxpass, self.serviceProxy)
+        stages.append(Stage("uploadConditions", self.uploadConditions,
+                            loop = "ConditionUpload"))
+
+        self.scheduler.run(self.dueStages(stages))
 
         return
 
-    def feedCouchMonitoring(self):
+    def dueStages(self, stages):
         """
-        _feedCouchMonitoring_
+        _dueStages_
 
-        check for workflows that haven't been uploaded to Couch for monitoring yet
+        Select the stages of all sub-loops for which the
+        configured polling interval has passed since they
+        last ran (stages of loops without interval always run)
 
         """
-        getStreamerWorkflowsForMonitoringDAO = self.daoFactory(classname = "Tier0Feeder.GetStreamerWorkflowsForMonitoring")
-        getPromptRecoWorkflowsForMonitoringDAO = self.daoFactory(classname = "Tier0Feeder.GetPromptRecoWorkflowsForMonitoring")
-        markTrackedWorkflowMonitoringDAO = self.daoFactory(classname = "Tier0Feeder.MarkTrackedWorkflowMonitoring")
-        workflows = getStreamerWorkflowsForMonitoringDAO.execute()
-        workflows += getPromptRecoWorkflowsForMonitoringDAO.execute()
+        now = time.time()
 
-        if len(workflows) == 0:
-            logging.debug("No workflows to publish to couch monitoring, doing nothing")
+        dueLoops = set()
+        for loop in set([ stage.loop for stage in stages ]):
+            if now - self.loopLastRun.get(loop, 0) >= self.loopIntervals.get(loop, 0):
+                dueLoops.add(loop)
+                self.loopLastRun[loop] = now
+
+        return [ stage for stage in stages if stage.loop in dueLoops ]
+
+    def loadConfiguration(self):
+        """
+        _loadConfiguration_
+
+        Get the Tier0 configuration for this cycle, the file is
+        only parsed again if it changed since the last cycle
 
-        if workflows:
-            logging.debug(" Going to publish %d workflows" % len(workflows))
-            for (workflowId, run, workflowName) in workflows:
-                logging.info(" Publishing workflow %s to monitoring" % workflowName)
-                #TODO: add more information about workflow if there need to be kept longer than 
-                # workflow life cycle.
-                doc = {}
-                doc["RequestName"] =   workflowName
-                doc["Run"]      =   run
-                response = self.localRequestCouchDB.insertGenericRequest(doc)
-                if response == "OK" or "EXISTS":
-                    logging.info(" Successfully uploaded request %s" % workflowName)
-                    # Here we have to trust the insert, if it doesn't happen will be easy to spot on the logs
-                    markTrackedWorkflowMonitoringDAO.execute(workflowId)
+        """
+        self.tier0Config = self.tier0ConfigCache.getConfig()
+        if self.tier0Config == None:
+            logging.error("No Tier0 configuration available, not configuring new runs and run/streams")
 
         return
 
-    def closeOutRealTimeWorkflows(self):
+    def configureRuns(self):
         """
-        _closeOutRealTimeWorkflows_
+        _configureRuns_
 
-        Updates couch with the closeout status of Repack and Express
-        PromptReco should be closed out automatically
+        Find new runs, setup global run settings and stream/dataset/trigger mapping
 
         """
-        getNotClosedOutWorkflowsDAO = self.daoFactory(classname = "Tier0Feeder.GetNotClosedOutWorkflows")
-        workflows = getNotClosedOutWorkflowsDAO.execute()
+        # only configure new runs if we have a valid Tier0 configuration
+        if self.tier0Config == None:
+            return
 
-        if len(workflows) == 0:
-            logging.debug("No workflows to publish to couch monitoring, doing nothing")
+        findNewRunsDAO = self.daoFactory(classname = "Tier0Feeder.FindNewRuns")
+
+        runHltkeys = findNewRunsDAO.execute(transaction = False)
+
+        runHltConfigs = {}
+        for run, hltkey in sorted(runHltkeys.items()):
 
-        if workflows:
-            for workflow in workflows:
-                (workflowId, filesetId, filesetOpen, workflowName) = workflow
-                # find returns -1 if the string is not found
-                if workflowName.find('PromptReco') >= 0:
-                    logging.debug("Closing out instantaneously PromptReco Workflow %s" % workflowName)
-                    self.updateClosedState(workflowName, workflowId)
-                else :
-                    # Check if fileset (which you already know) is closed or not
-                    # FIXME: No better way to do it? what comes from the DAO is a string, casting bool or int doesn't help much.
-                    # Works like that :
-                    if filesetOpen == '0':
-                        self.updateClosedState(workflowName, workflowId)
+            hltConfig = None
+
+            # local runs have no hltkey and are configured differently
+            if hltkey != None:
+
+                # retrieve HLT configuration and make sure it's usable
+                try:
+                    hltConfig = self.hltConfigCache.get(hltkey, transaction = False)
+                    if hltConfig['process'] == None or len(hltConfig['mapping']) == 0:
+                        raise RuntimeError("HLTConfDB query returned no process or mapping")
+                except:
+                    logging.exception("Can't retrieve hltkey %s for run %d" % (hltkey, run))
+                    continue
+
+            runHltConfigs[run] = hltConfig
+
+        # new runs are followed by new run/streams and streamers
+        self.addWorkFound(len(runHltkeys))
+
+        if len(runHltConfigs) > 0:
+            RunConfigAPI.configureRuns(self.tier0Config, runHltConfigs,
+                                       chunkSize = self.configureRunsChunkSize)
 
         return
 
-    def updateClosedState(self, workflowName, workflowId):
+    def configureRunStreams(self):
         """
-        _updateClosedState_
+        _configureRunStreams_
 
-        Mark a workflow as Closed
+        Find unconfigured run/stream with data, populate
+        RunConfig, setup workflows/filesets/subscriptions
 
         """
-        markCloseoutWorkflowMonitoringDAO = self.daoFactory(classname = "Tier0Feeder.MarkCloseoutWorkflowMonitoring")
+        # only configure new run/streams if we have a valid Tier0 configuration
+        if self.tier0Config == None:
+            return
 
-        response = self.localRequestCouchDB.updateRequestStatus(workflowName, 'Closed')
+        findNewRunStreamsDAO = self.daoFactory(classname = "Tier0Feeder.FindNewRunStreams")
 
-        if response == "OK" or "EXISTS":
-            logging.debug("Successfully closed workflow %s" % workflowName)
-            markCloseoutWorkflowMonitoringDAO.execute(workflowId)
+        runStreams = findNewRunStreamsDAO.execute(transaction = False)
+        self.addWorkFound(len(runStreams))
+        if len(runStreams) > 0:
+            RunConfigAPI.configureRunStreams(self.tier0Config, runStreams,
+                                             self.specDirectory,
+                                             self.dqmUploadProxy,
+                                             templateCache = self.workloadTemplateCache,
+                                             specBuilderPool = self.specBuilderPool)
 
         return
 
-    def notifyStorageManager(self):
+    def stopCloseRuns(self):
         """
-        _notifyStorageManager_
+        _stopCloseRuns_
 
-        Find all finished streamers for closed all run/stream
-        Send the notification message to StorageManager
-        Update the streamer status to finished (deleted = 1)
+        Stop and close runs based on RunSummary and StorageManager records
 
         """
-        getFinishedStreamersDAO = self.daoFactory(classname = "SMNotification.GetFinishedStreamers")
-        markStreamersFinishedDAO = self.daoFactory(classname = "SMNotification.MarkStreamersFinished")
+        RunLumiCloseoutAPI.stopRuns(self.dbInterfaceStorageManager)
+        RunLumiCloseoutAPI.closeRuns(self.dbInterfaceStorageManager)
 
-        allFinishedStreamers = getFinishedStreamersDAO.execute(transaction = False)
+        return
 
-        chunkSize = 50
-        for finishedStreamers in [ allFinishedStreamers[i:i+chunkSize] for i in range(0, len(allFinishedStreamers), chunkSize) ]:
+    def releaseExpress(self):
+        """
+        _releaseExpress_
 
-            streamers = []
-            filenameParams = ""
+        Release runs for Express
 
-            for (id, lfn) in finishedStreamers:
-                streamers.append(id)
-                filenameParams += "-FILENAME %s " % os.path.basename(lfn)
+        """
+        findNewExpressRunsDAO = self.daoFactory(classname = "Tier0Feeder.FindNewExpressRuns")
+        releaseExpressDAO = self.daoFactory(classname = "Tier0Feeder.ReleaseExpress")
 
-            logging.debug("Notifying transfer system about processed streamers")
-            p = subprocess.Popen("/bin/bash", stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
-            output, error = p.communicate("""
-            export T0_BASE_DIR=%s
-            export T0ROOT=${T0_BASE_DIR}/T0
-            export CONFIG=${T0_BASE_DIR}/Config/TransferSystem_CERN.cfg
- 
-            export PERL5LIB=${T0ROOT}/perl_lib
+        runs = findNewExpressRunsDAO.execute(transaction = False)
 
-            unset LANGUAGE
-            unset LC_ALL
-            unset LC_CTYPE
-            export LANG=C
+        if len(runs) > 0:
 
-            ${T0ROOT}/operations/sendRepackedStatus.pl --config $CONFIG %s
-            """ % (self.transferSystemBaseDir, filenameParams))
+            binds = []
+            for run in runs:
+                binds.append( { 'RUN' : run } )
 
-            if len(error) > 0:
-                logging.error("ERROR: Could not notify transfer system about processed streamers")
-                logging.error("ERROR: %s" % error)
-            else:
-                markStreamersFinishedDAO.execute(streamers, transaction = False)
+            if self.getExpressReadyRunsDAO != None:
+                runs = self.getExpressReadyRunsDAO.execute(binds = binds, transaction = False)
 
-        return
+            if len(runs) > 0:
 
-    def updateRunStreamDoneT0DataSvc(self):
-        """
-        _updateRunStreamDoneT0DataSvc_
+                binds = []
+                for run in runs:
+                    binds.append( { 'RUN' : run } )
 
-        Check if a run/stream workflow (express or repack) is finished and
-        cleaned up and push a completion record into the Tier0 Data Service.
+                releaseExpressDAO.execute(binds = binds, transaction = False)
+
+        return
 
+    def releasePromptReco(self):
         """
-        getRunStreamDoneDAO = self.daoFactory(classname = "T0DataSvc.GetRunStreamDone")
-        runStreamDone = getRunStreamDoneDAO.execute(transaction = False)
+        _releasePromptReco_
 
-        if len(runStreamDone) > 0:
+        Release runs for PromptReco
 
-            binds = []
-            for runStream in runStreamDone:
-                binds.append( { 'RUN' : runStream['run'],
-                                'STREAM' : runStream['stream'] } )
+        """
+        RunConfigAPI.releasePromptReco(self.tier0Config,
+                                       self.specDirectory,
+                                       self.dqmUploadProxy,
+                                       templateCache = self.workloadTemplateCache,
+                                       specBuilderPool = self.specBuilderPool,
+                                       maxReleaseRuns = self.recoReleaseMaxRuns)
 
-            insertRunStreamDoneDAO = self.daoFactoryT0DataSvc(classname = "T0DataSvc.InsertRunStreamDone")
-            insertRunStreamDoneDAO.execute(binds = binds, transaction = False)
+        return
 
-            updateRunStreamDoneDAO = self.daoFactory(classname = "T0DataSvc.UpdateRunStreamDone")
-            updateRunStreamDoneDAO.execute(binds = binds, transaction = False)
+    def getRecoReleaseBacklog(self):
+        """
+        _getRecoReleaseBacklog_
 
-        return
+        Stopped runs waiting for PromptReco release with the age
+        of the oldest one, only queried again if the last query is
+        older than recoReleaseBacklogInterval
 
-    def updateExpressConfigsT0DataSvc(self):
         """
-        _updateExpressConfigsT0DataSvc_
+        now = time.time()
+        if now - self.recoReleaseBacklogTime >= self.recoReleaseBacklogInterval:
+            self.recoReleaseBacklogTime = now
+            getRecoReleaseBacklogDAO = self.daoFactory(classname = "RunConfig.GetRecoReleaseBacklog")
+            try:
+                self.recoReleaseBacklog = getRecoReleaseBacklogDAO.execute(transaction = False)
+            except Exception:
+                logging.exception("Can't retrieve PromptReco release backlog")
+
+        backlog = dict(self.recoReleaseBacklog)
+        if backlog.get('oldestStopTime'):
+            backlog['oldestAge'] = int(time.time()) - backlog['oldestStopTime']
+
+        return backlog
+
+    def markWorkflowsInjected(self):
+        """
+        _markWorkflowsInjected_
 
-        Check which express_config rows are missing
-        in the Tier0 Data Service and insert them,
-        also record that fact in t0ast
+        Mark express and repack workflows as injected if certain conditions are met
+        (we don't do it immediately to prevent the TaskArchiver from cleaning up too early)
 
         """
-        getExpressConfigsDAO = self.daoFactory(classname = "T0DataSvc.GetExpressConfigs")
-        expressConfigs = getExpressConfigsDAO.execute(transaction = False)
+        markWorkflowsInjectedDAO = self.daoFactory(classname = "Tier0Feeder.MarkWorkflowsInjected")
+        markWorkflowsInjectedDAO.execute(self.transferSystemBaseDir != None,
+                                         transaction = False)
 
-        if len(expressConfigs) > 0:
+        return
 
-            bindsInsert = []
-            bindsUpdate = []
-            for config in expressConfigs:
-                bindsInsert.append( { 'RUN' : config['run'],
-                                      'STREAM' : config['stream'],
-                                      'CMSSW' : config['cmssw'],
-                                      'SCRAM_ARCH' : config['scram_arch'],
-                                      'RECO_CMSSW' : config['reco_cmssw'],
-                                      'RECO_SCRAM_ARCH' : config['reco_scram_arch'],
-                                      'ALCA_SKIM' : config['alca_skim'],
-                                      'DQM_SEQ' : config['dqm_seq'],
-                                      'GLOBAL_TAG' : config['global_tag'][:50],
-                                      'SCENARIO' : config['scenario'] } )
-                bindsUpdate.append( { 'RUN' : config['run'],
-                                      'STREAM' : config['stream'] } )
+    def closeLumiSections(self):
+        """
+        _closeLumiSections_
 
-            insertExpressConfigsDAO = self.daoFactoryT0DataSvc(classname = "T0DataSvc.InsertExpressConfigs")
-            insertExpressConfigsDAO.execute(binds = bindsInsert, transaction = False)
+        Close stream/lumis for run/streams that are active (fileset exists and open)
 
-            updateExpressConfigsDAO = self.daoFactory(classname = "T0DataSvc.UpdateExpressConfigs")
-            updateExpressConfigsDAO.execute(binds = bindsUpdate, transaction = False)
+        """
+        self.addWorkFound(RunLumiCloseoutAPI.closeLumiSections(self.dbInterfaceStorageManager))
 
         return
 
-    def updateRecoConfigsT0DataSvc(self):
+    def feedStreamers(self):
         """
-        _updateRecoConfigsT0DataSvc_
+        _feedStreamers_
 
-        Check which reco_config rows are missing
-        in the Tier0 Data Service and insert them,
-        also record that fact in t0ast
+        Feed new data into exisiting filesets
 
         """
-        getRecoConfigsDAO = self.daoFactory(classname = "T0DataSvc.GetRecoConfigs")
-        recoConfigs = getRecoConfigsDAO.execute(transaction = False)
+        myThread = threading.currentThread()
+
+        feedStreamersDAO = self.daoFactory(classname = "Tier0Feeder.FeedStreamers")
+
+        try:
+            myThread.transaction.begin()
+            fedStreamers = feedStreamersDAO.execute(conn = myThread.transaction.conn, transaction = True)
+        except:
+            logging.exception("Can't feed data, bailing out...")
+            raise
+        else:
+            myThread.transaction.commit()
 
-        if len(recoConfigs) > 0:
+        self.addWorkFound(fedStreamers)
 
-            bindsInsert = []
-            bindsUpdate = []
-            for config in recoConfigs:
-                bindsInsert.append( { 'RUN' : config['run'],
-                                      'PRIMDS' : config['primds'],
-                                      'CMSSW' : config['cmssw'],
-                                      'SCRAM_ARCH' : config['scram_arch'],
-                                      'ALCA_SKIM' : config['alca_skim'],
-                                      'PHYSICS_SKIM' : config['physics_skim'],
-                                      'DQM_SEQ' : config['dqm_seq'],
-                                      'GLOBAL_TAG' : config['global_tag'][:50],
-                                      'SCENARIO' : config['scenario'] } )
-                bindsUpdate.append( { 'RUN' : config['run'],
-                                      'PRIMDS' : config['primds'] } )
+        return
 
-            insertRecoConfigsDAO = self.daoFactoryT0DataSvc(classname = "T0DataSvc.InsertRecoConfigs")
-            insertRecoConfigsDAO.execute(binds = bindsInsert, transaction = False)
+    def uploadConditions(self):
+        """
+        _uploadConditions_
 
-            updateRecoConfigsDAO = self.daoFactory(classname = "T0DataSvc.UpdateRecoConfigs")
-            updateRecoConfigsDAO.execute(binds = bindsUpdate, transaction = False)
+        Upload PCL conditions to DropBox
+
+        """
+        ConditionUploadAPI.uploadConditions(self.dropboxuser, self.dropboxpass, self.serviceProxy)
 
         return
 
-    def updateRecoReleaseConfigsT0DataSvc(self):
+    def feedCouchMonitoring(self):
         """
-        _updateRecoReleaseConfigsT0DataSvc_
+        _feedCouchMonitoring_
 
-        Insert information about PromptReco release into the Tier0 Data Service.
-        Already aggregate by run, if one primary dataset is released that means
-        the whole run is considered released.
+        check for workflows that haven't been uploaded to Couch for monitoring yet
+
+        All workflows are uploaded with a single bulk request, the
+        successfully uploaded ones are then marked in one update
 
         """
-        getRecoReleaseConfigsDAO = self.daoFactory(classname = "T0DataSvc.GetRecoReleaseConfigs")
-        recoReleaseConfigs = getRecoReleaseConfigsDAO.execute(transaction = False)
+        getStreamerWorkflowsForMonitoringDAO = self.daoFactory(classname = "Tier0Feeder.GetStreamerWorkflowsForMonitoring")
+        getPromptRecoWorkflowsForMonitoringDAO = self.daoFactory(classname = "Tier0Feeder.GetPromptRecoWorkflowsForMonitoring")
+        markTrackedWorkflowMonitoringDAO = self.daoFactory(classname = "Tier0Feeder.MarkTrackedWorkflowMonitoring")
+        workflows = getStreamerWorkflowsForMonitoringDAO.execute()
+        workflows += getPromptRecoWorkflowsForMonitoringDAO.execute()
 
-        if len(recoReleaseConfigs) > 0:
+        if len(workflows) == 0:
+            logging.debug("No workflows to publish to couch monitoring, doing nothing")
+            return
+
+        logging.debug(" Going to publish %d workflows" % len(workflows))
+
+        docs = []
+        for (workflowId, run, workflowName) in workflows:
+            #TODO: add more information about workflow if there need to be kept longer than 
+            # workflow life cycle.
+            doc = {}
+            doc["RequestName"] = workflowName
+            doc["Run"] = run
+            docs.append(doc)
+
+        # an existing document with a status means the workflow was uploaded before
+        uploaded = self.localRequestCouchDB.insertGenericRequests(docs)
+
+        workflowIds = []
+        for (workflowId, run, workflowName) in workflows:
+            if workflowName in uploaded:
+                logging.info(" Successfully uploaded request %s" % workflowName)
+                workflowIds.append(workflowId)
+            else:
+                logging.error(" Failed to upload request %s to monitoring" % workflowName)
 
-            bindsInsert = []
-            bindsUpdate = []
-            for config in recoReleaseConfigs:
+        if len(workflowIds) > 0:
+            markTrackedWorkflowMonitoringDAO.execute(workflowIds)
 
-                locked = int(config['released'] > 0)
+        return
 
-                bindsInsert.append( { 'RUN' : config['run'],
-                                      'LOCKED' : locked } )
-                bindsUpdate.append( { 'RUN' : config['run'],
-                                      'IN_DATASVC' : locked + 1 } )
+    def closeOutRealTimeWorkflows(self):
+        """
+        _closeOutRealTimeWorkflows_
 
-            insertRecoReleaseConfigsDAO = self.daoFactoryT0DataSvc(classname = "T0DataSvc.InsertRecoReleaseConfigs")
-            insertRecoReleaseConfigsDAO.execute(binds = bindsInsert, transaction = False)
+        Updates couch with the closeout status of Repack and Express
+        PromptReco should be closed out automatically
+
+        """
+        getNotClosedOutWorkflowsDAO = self.daoFactory(classname = "Tier0Feeder.GetNotClosedOutWorkflows")
+        workflows = getNotClosedOutWorkflowsDAO.execute()
 
-            updateRecoReleaseConfigsDAO = self.daoFactory(classname = "T0DataSvc.UpdateRecoReleaseConfigs")
-            updateRecoReleaseConfigsDAO.execute(binds = bindsUpdate, transaction = False)
+        if len(workflows) == 0:
+            logging.debug("No workflows to publish to couch monitoring, doing nothing")
+            return
+
+        closedWorkflows = {}
+        for workflow in workflows:
+            (workflowId, filesetId, filesetOpen, workflowName) = workflow
+            # find returns -1 if the string is not found
+            if workflowName.find('PromptReco') >= 0:
+                logging.debug("Closing out instantaneously PromptReco Workflow %s" % workflowName)
+                closedWorkflows[workflowName] = workflowId
+            else :
+                # Check if fileset (which you already know) is closed or not
+                # FIXME: No better way to do it? what comes from the DAO is a string, casting bool or int doesn't help much.
+                # Works like that :
+                if filesetOpen == '0':
+                    closedWorkflows[workflowName] = workflowId
+
+        if len(closedWorkflows) > 0:
+            self.updateClosedState(closedWorkflows)
 
         return
 
-    def lockDatasetsT0DataSvc(self):
+    def updateClosedState(self, workflows):
         """
-        _lockDatasetsT0DataSvc_
+        _updateClosedState_
 
-        Publish dataset information into the Tier0 Data Service.
+        Mark workflows (dictionary of workflow name to id) as Closed
 
         """
-        getDatasetLockedDAO = self.daoFactory(classname = "T0DataSvc.GetDatasetLocked")
-        datasetConfigs = getDatasetLockedDAO.execute(transaction = False)
+        markCloseoutWorkflowMonitoringDAO = self.daoFactory(classname = "Tier0Feeder.MarkCloseoutWorkflowMonitoring")
 
-        if len(datasetConfigs) > 0:
+        updated = self.localRequestCouchDB.updateRequestsStatus(workflows.keys(), "Closed")
 
-            bindsInsert = []
-            bindsUpdate = []
-            for config in datasetConfigs:
-                bindsInsert.append( { 'PATH' : config['path'] } )
-                bindsUpdate.append( { 'ID' : config['id'] } )
+        workflowIds = []
+        for workflowName in sorted(updated):
+            logging.debug("Successfully closed workflow %s" % workflowName)
+            workflowIds.append(workflows[workflowName])
 
-            insertDatasetLockedDAO = self.daoFactoryT0DataSvc(classname = "T0DataSvc.InsertDatasetLocked")
-            insertDatasetLockedDAO.execute(binds = bindsInsert, transaction = False)
+        if len(workflowIds) > 0:
+            markCloseoutWorkflowMonitoringDAO.execute(workflowIds)
 
-            updateDatasetLockedDAO = self.daoFactory(classname = "T0DataSvc.UpdateDatasetLocked")
-            updateDatasetLockedDAO.execute(binds = bindsUpdate, transaction = False)
+        return
+
+    def notifyStorageManager(self):
+        """
+        _notifyStorageManager_
+
+        Notify the StorageManager about finished streamers
+
+        """
+        SMNotificationAPI.notifyStorageManager(self.smNotifier,
+                                               batchSize = self.smNotificationBatchSize,
+                                               concurrency = self.smNotificationConcurrency)
 
         return
 
@@ -561,3 +811,6 @@ class Tier0FeederPoller(BaseWorkerThread):
 
         """
         logging.debug("terminating immediately")
+        self.scheduler.shutdown()
+        if self.specBuilderPool != None:
+            self.specBuilderPool.terminate()
@@ -0,0 +1,147 @@
+#!/usr/bin/env python
+"""
+_RequestDBBulkWriter_t_
+
+Testing the bulk methods of the RequestDBBulkWriter against
+the per workflow methods of the RequestDBWriter
+
+"""
+import unittest
+import os
+
+from WMCore.Configuration import loadConfigurationFile
+from WMCore.Database.CMSCouch import Document
+from WMCore.Services.UUID import makeUUID
+
+from T0Component.Tier0Feeder.RequestDBBulkWriter import RequestDBBulkWriter
+
+
+class RequestDBBulkWriterTest(unittest.TestCase):
+    """
+    _RequestDBBulkWriterTest_
+
+    Testing the bulk methods of the RequestDBBulkWriter
+    """
+
+    def setUp(self):
+        """
+        _setUp_
+
+        """
+        if 'WMAGENT_CONFIG' not in os.environ:
+            self.skipTest("You do not have WMAGENT_CONFIG in your environment")
+
+        wmAgentConfig = loadConfigurationFile(os.environ["WMAGENT_CONFIG"])
+
+        self.localRequestCouchDB = RequestDBBulkWriter(wmAgentConfig.AnalyticsDataCollector.localT0RequestDBURL,
+                                                       couchapp = wmAgentConfig.AnalyticsDataCollector.RequestCouchApp)
+
+        return
+
+    def getRequestDocument(self, workflowName):
+        """
+        _getRequestDocument_
+
+        Request document without the parts that differ between
+        requests (name, revision and status transition times)
+
+        """
+        doc = dict(self.localRequestCouchDB.couchDB.document(workflowName))
+
+        for key in [ "_id", "_rev", "RequestName" ]:
+            doc.pop(key, None)
+
+        transitions = []
+        for transition in doc.get("RequestTransition", []):
+            transition = dict(transition)
+            transition.pop("UpdateTime", None)
+            transitions.append(transition)
+        doc["RequestTransition"] = transitions
+
+        return doc
+
+    def test00(self):
+        """
+        _test00_
+
+        Test that bulk inserted and closed workflows have the same
+        documents as workflows inserted and closed one by one
+
+        """
+        workflowName = "Repack_Run176161_Stream%s" % makeUUID()
+        self.localRequestCouchDB.insertGenericRequest( { 'RequestName' : workflowName,
+                                                         'Run' : 176161 } )
+
+        bulkWorkflowNames = [ "Repack_Run176161_Stream%s" % makeUUID() for i in range(3) ]
+        docs = [ { 'RequestName' : x, 'Run' : 176161 } for x in bulkWorkflowNames ]
+
+        uploaded = self.localRequestCouchDB.insertGenericRequests(docs)
+        self.assertEqual(uploaded, set(bulkWorkflowNames),
+                         "ERROR: not all workflows were uploaded")
+
+        for bulkWorkflowName in bulkWorkflowNames:
+            self.assertEqual(self.getRequestDocument(bulkWorkflowName),
+                             self.getRequestDocument(workflowName),
+                             "ERROR: bulk inserted workflow differs from single inserted workflow")
+
+        # uploading again keeps the existing documents as they are
+        uploaded = self.localRequestCouchDB.insertGenericRequests(docs)
+        self.assertEqual(uploaded, set(bulkWorkflowNames),
+                         "ERROR: existing workflows not reported as uploaded")
+
+        for bulkWorkflowName in bulkWorkflowNames:
+            self.assertEqual(self.getRequestDocument(bulkWorkflowName),
+                             self.getRequestDocument(workflowName),
+                             "ERROR: workflow changed by uploading it again")
+
+        self.localRequestCouchDB.updateRequestStatus(workflowName, "Closed")
+
+        updated = self.localRequestCouchDB.updateRequestsStatus(bulkWorkflowNames, "Closed")
+        self.assertEqual(updated, set(bulkWorkflowNames),
+                         "ERROR: not all workflows were closed")
+
+        for bulkWorkflowName in bulkWorkflowNames:
+            self.assertEqual(self.getRequestDocument(bulkWorkflowName),
+                             self.getRequestDocument(workflowName),
+                             "ERROR: bulk closed workflow differs from single closed workflow")
+
+        self.assertEqual(self.getRequestDocument(workflowName)["RequestStatus"], "Closed",
+                         "ERROR: workflow not closed")
+
+        return
+
+    def test01(self):
+        """
+        _test01_
+
+        Test that requests inserted without status (status update after
+        the insert failed) are set to new when they are uploaded again,
+        with the documents committed in several chunks
+
+        """
+        self.localRequestCouchDB.bulkChunkSize = 2
+
+        workflowName = "Repack_Run176161_Stream%s" % makeUUID()
+        self.localRequestCouchDB.insertGenericRequest( { 'RequestName' : workflowName,
+                                                         'Run' : 176161 } )
+
+        bulkWorkflowNames = [ "Repack_Run176161_Stream%s" % makeUUID() for i in range(5) ]
+        docs = [ { 'RequestName' : x, 'Run' : 176161 } for x in bulkWorkflowNames ]
+
+        # insert without status update
+        for doc in docs[:3]:
+            self.localRequestCouchDB.couchDB.commitOne(Document(doc['RequestName'], doc))
+
+        uploaded = self.localRequestCouchDB.insertGenericRequests(docs)
+        self.assertEqual(uploaded, set(bulkWorkflowNames),
+                         "ERROR: not all workflows were uploaded")
+
+        for bulkWorkflowName in bulkWorkflowNames:
+            self.assertEqual(self.getRequestDocument(bulkWorkflowName),
+                             self.getRequestDocument(workflowName),
+                             "ERROR: bulk inserted workflow differs from single inserted workflow")
+
+        return
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1192,7 +1192,7 @@ class Tier0FeederTest(unittest.TestCase):
                 response = self.localRequestCouchDB.insertGenericRequest(doc)
                 if response == "OK" or "EXISTS":
                     logging.info(" Successfully uploaded request %s" % workflowName)
-                    self.markTrackedWorkflowMonitoringDAO.execute(workflowId)
+                    self.markTrackedWorkflowMonitoringDAO.execute([workflowId])
 
         return
 
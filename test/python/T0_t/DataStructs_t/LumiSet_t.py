@@ -0,0 +1,151 @@
+#!/usr/bin/env python
+"""
+_LumiSet_t_
+
+Testing the compact lumi set against plain sets of lumis
+
+"""
+import unittest
+import random
+
+from T0.DataStructs.LumiSet import LumiSet
+
+
+class LumiSetTest(unittest.TestCase):
+    """
+    _LumiSetTest_
+
+    Testing the compact lumi set against plain sets of lumis
+    """
+
+    def setUp(self):
+        """
+        _setUp_
+
+        """
+        random.seed(2468)
+
+        self.lumiSets = [ set(), set([ 1 ]), set([ 5 ]) ]
+        for i in range(200):
+            maxLumi = random.randint(1, 300)
+            fraction = random.random()
+            self.lumiSets.append(set([ x for x in range(1, maxLumi+1) if random.random() < fraction ]))
+
+        return
+
+    def test00(self):
+        """
+        _test00_
+
+        Test construction, membership, iteration, length, min and max
+
+        """
+        for lumis in self.lumiSets:
+
+            lumiSet = LumiSet(random.sample(sorted(lumis), len(lumis)))
+
+            self.assertEqual(list(lumiSet), sorted(lumis),
+                             "ERROR: wrong lumis in lumi set")
+            self.assertEqual(len(lumiSet), len(lumis),
+                             "ERROR: wrong lumi set length")
+            self.assertEqual(bool(lumiSet), bool(lumis),
+                             "ERROR: wrong lumi set truth value")
+            self.assertEqual(lumiSet, lumis,
+                             "ERROR: lumi set not equal to plain set")
+            self.assertEqual(lumiSet.min(), min(lumis) if lumis else None,
+                             "ERROR: wrong lowest lumi")
+            self.assertEqual(lumiSet.max(), max(lumis) if lumis else None,
+                             "ERROR: wrong highest lumi")
+
+            for lumi in range(-1, 305):
+                self.assertEqual(lumi in lumiSet, lumi in lumis,
+                                 "ERROR: wrong membership for lumi %d" % lumi)
+
+            self.assertEqual(LumiSet.fromRanges(lumiSet.ranges()), lumiSet,
+                             "ERROR: lumi set changed by round trip through ranges")
+
+            for first, last in lumiSet.ranges():
+                self.assertTrue(first - 1 not in lumis and last + 1 not in lumis,
+                                "ERROR: lumi ranges not merged")
+
+        return
+
+    def test01(self):
+        """
+        _test01_
+
+        Test union, adding lumis and overlapping ranges
+
+        """
+        for i in range(500):
+
+            lumis = random.choice(self.lumiSets)
+            otherLumis = random.choice(self.lumiSets)
+
+            self.assertEqual(LumiSet(lumis) | LumiSet(otherLumis), lumis | otherLumis,
+                             "ERROR: wrong union of lumi sets")
+
+            lumiSet = LumiSet(lumis)
+            lumiSet |= otherLumis
+            self.assertEqual(lumiSet, lumis | otherLumis,
+                             "ERROR: wrong in place union with plain set")
+
+            lumiSet = LumiSet(lumis)
+            for lumi in otherLumis:
+                lumiSet.add(lumi)
+            self.assertEqual(lumiSet, lumis | otherLumis,
+                             "ERROR: wrong lumi set after adding lumis")
+
+        lumiSet = LumiSet.fromRanges([ (10, 20), (1, 3), (15, 30), (4, 4), (32, 32) ])
+        self.assertEqual(lumiSet.ranges(), [ (1, 4), (10, 30), (32, 32) ],
+                         "ERROR: overlapping or adjacent ranges not merged")
+
+        return
+
+    def test02(self):
+        """
+        _test02_
+
+        Test iteration over the gaps
+
+        """
+        for lumis in self.lumiSets:
+
+            lumiSet = LumiSet(lumis)
+
+            for first, last in [ (1, None), (1, 400), (7, 150), (50, 49) ]:
+
+                if last == None:
+                    expected = LumiSet(set(range(first, (max(lumis) if lumis else 0) + 1)) - lumis)
+                else:
+                    expected = LumiSet(set(range(first, last + 1)) - lumis)
+
+                self.assertEqual(list(lumiSet.gaps(first, last)), expected.ranges(),
+                                 "ERROR: wrong gaps between %s and %s" % (first, last))
+
+        return
+
+    def test03(self):
+        """
+        _test03_
+
+        Test the end of the contiguous lumis starting at a lumi
+
+        """
+        for lumis in self.lumiSets:
+
+            lumiSet = LumiSet(lumis)
+
+            for lumi in range(0, 305):
+
+                expected = lumi
+                while expected in lumis:
+                    expected += 1
+
+                self.assertEqual(lumiSet.contiguousEnd(lumi), expected - 1,
+                                 "ERROR: wrong end of contiguous lumis from %d" % lumi)
+
+        return
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,57 @@
+#!/usr/bin/env python
+"""
+_FirstFitBenchmark_
+
+Benchmark the first fit packing against the per job rescan
+of the lumi for lumis with 5k streamers
+
+Standalone script, not part of the unit tests. Checks that
+both result in the same jobs, but never fails on timing.
+
+"""
+from __future__ import print_function
+import sys
+import time
+
+from FirstFit_t import FirstFitTest, referencePackFirstFit
+
+from T0.JobSplitting.FirstFit import packFirstFit
+
+
+def main():
+    """
+    _main_
+
+    """
+    test = FirstFitTest("test00")
+    test.setUp()
+
+    lumis = [ test.makeLumi(5000) for i in range(5) ]
+
+    identical = True
+
+    # about 100 (repack) and 5 (express) streamers per job
+    for maxEvents, maxSize in [ (100 * 1000, 100 * 1000 * 500000),
+                                (5 * 1000, None) ]:
+
+        startTime = time.time()
+        referenceJobs = [ referencePackFirstFit(fileList, maxSize = maxSize, maxEvents = maxEvents) for fileList in lumis ]
+        referenceTime = time.time() - startTime
+
+        startTime = time.time()
+        jobs = [ packFirstFit(fileList, maxSize = maxSize, maxEvents = maxEvents) for fileList in lumis ]
+        packTime = time.time() - startTime
+
+        if jobs != referenceJobs:
+            identical = False
+            print("ERROR: first fit packing results in different jobs")
+
+        print("%d lumis with 5k streamers, %d jobs per lumi : rescan %.1f ms, first fit %.1f ms per lumi" % (len(lumis),
+                                                                                                           len(jobs[0]),
+                                                                                                           1000 * referenceTime / len(lumis),
+                                                                                                           1000 * packTime / len(lumis)))
+
+    return 0 if identical else 1
+
+if __name__ == '__main__':
+    sys.exit(main())
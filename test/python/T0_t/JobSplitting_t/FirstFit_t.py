@@ -0,0 +1,139 @@
+#!/usr/bin/env python
+"""
+_FirstFit_t_
+
+Testing the first fit packing of large lumis against
+the per job rescan of the lumi it replaces
+
+"""
+import unittest
+import random
+
+from T0.JobSplitting.FirstFit import packFirstFit
+
+
+def referencePackFirstFit(fileList, maxSize = None, maxEvents = None):
+    """
+    _referencePackFirstFit_
+
+    Splitting of large lumis as done by the Repack,
+    Express and RepackMerge splitters before packFirstFit
+
+    """
+    lumiFileList = list(fileList)
+
+    jobs = []
+    while len(lumiFileList) > 0:
+
+        eventsTotal = 0
+        sizeTotal = 0
+        jobFileList = []
+        for fileInfo in lumiFileList:
+
+            # if first file, always use it
+            if len(jobFileList) == 0:
+                eventsTotal = fileInfo['events']
+                sizeTotal = fileInfo['filesize']
+                jobFileList.append(fileInfo)
+
+            # otherwise calculate new totals and check if to use file
+            else:
+                newEventsTotal = eventsTotal + fileInfo['events']
+                newSizeTotal = sizeTotal + fileInfo['filesize']
+
+                if (maxSize == None or newSizeTotal <= maxSize) and \
+                        (maxEvents == None or newEventsTotal <= maxEvents):
+
+                    eventsTotal = newEventsTotal
+                    sizeTotal = newSizeTotal
+                    jobFileList.append(fileInfo)
+
+        jobs.append((jobFileList, eventsTotal, sizeTotal))
+
+        for fileInfo in jobFileList:
+            lumiFileList.remove(fileInfo)
+
+    return jobs
+
+
+class FirstFitTest(unittest.TestCase):
+    """
+    _FirstFitTest_
+
+    Testing the first fit packing of large lumis
+    """
+
+    def setUp(self):
+        """
+        _setUp_
+
+        """
+        random.seed(97531)
+
+        return
+
+    def makeLumi(self, nFiles):
+        """
+        _makeLumi_
+
+        Streamers of one lumi, mostly similar sizes with some outliers
+
+        """
+        fileList = []
+        for i in range(nFiles):
+            if random.random() < 0.05:
+                events = random.randint(1, 20000)
+            else:
+                events = random.randint(800, 1200)
+            fileList.append( { 'id' : i,
+                               'lfn' : "/store/t0streamer/streamer_%d.dat" % i,
+                               'events' : events,
+                               'filesize' : events * random.randint(400000, 600000) } )
+
+        return fileList
+
+    def test00(self):
+        """
+        _test00_
+
+        Test that the first fit packing results in the same jobs
+
+        """
+        for i in range(300):
+
+            fileList = self.makeLumi(random.randint(1, 200))
+
+            totalEvents = sum([ x['events'] for x in fileList ])
+            totalSize = sum([ x['filesize'] for x in fileList ])
+
+            maxEvents = random.randint(1, totalEvents + 1000)
+            maxSize = random.randint(1, totalSize + 1000000)
+
+            for limits in [ { 'maxSize' : maxSize, 'maxEvents' : maxEvents },
+                            { 'maxEvents' : maxEvents },
+                            { 'maxSize' : maxSize } ]:
+
+                self.assertEqual(packFirstFit(fileList, **limits),
+                                 referencePackFirstFit(fileList, **limits),
+                                 "ERROR: first fit packing results in different jobs")
+
+        # enough jobs per lumi to go beyond the linear search
+        for i in range(20):
+
+            fileList = self.makeLumi(random.randint(500, 1500))
+
+            for limits in [ { 'maxSize' : 5 * 1000 * 500000, 'maxEvents' : 5 * 1000 },
+                            { 'maxEvents' : random.randint(2000, 10000) },
+                            { 'maxSize' : random.randint(1, 5) * 1000 * 500000 } ]:
+
+                self.assertEqual(packFirstFit(fileList, **limits),
+                                 referencePackFirstFit(fileList, **limits),
+                                 "ERROR: first fit packing results in different jobs")
+
+        self.assertEqual(packFirstFit([], maxSize = 1000), [],
+                         "ERROR: jobs for a lumi without files")
+
+        return
+
+if __name__ == '__main__':
+    unittest.main()
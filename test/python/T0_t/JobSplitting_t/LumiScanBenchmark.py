@@ -0,0 +1,56 @@
+#!/usr/bin/env python
+"""
+_LumiScanBenchmark_
+
+Benchmark the lumi scan of the Repack and RepackMerge splitters
+against the loop over every lumi for runs with 50k lumis
+
+Standalone script, not part of the unit tests. Checks that
+both result in the same jobs, but never fails on timing.
+
+"""
+from __future__ import print_function
+import sys
+import time
+
+from LumiScan_t import LumiScanTest, referenceScanLumis, runSplitterLoop
+
+from T0.JobSplitting.LumiScan import scanLumis
+
+
+def main():
+    """
+    _main_
+
+    """
+    test = LumiScanTest("test00")
+    test.setUp()
+
+    largeRuns = [ x for x in test.runs if max(x[2] or [ 0 ]) > 1000 ]
+
+    startTime = time.time()
+    referenceJobs = []
+    for availableFileLumiDict, insertTimes, usedLumis in largeRuns:
+        referenceJobs.append(runSplitterLoop(referenceScanLumis(availableFileLumiDict, usedLumis),
+                                             availableFileLumiDict, insertTimes, 500, True))
+    referenceTime = time.time() - startTime
+
+    startTime = time.time()
+    jobs = []
+    for availableFileLumiDict, insertTimes, usedLumis in largeRuns:
+        jobs.append(runSplitterLoop(scanLumis(availableFileLumiDict.keys(), usedLumis),
+                                    availableFileLumiDict, insertTimes, 500, True))
+    scanTime = time.time() - startTime
+
+    identical = (jobs == referenceJobs)
+    if not identical:
+        print("ERROR: lumi scan results in different jobs")
+
+    print("%d runs with 50k lumis : loop over lumis %.3f ms, lumi scan %.3f ms per run" % (len(largeRuns),
+                                                                                          1000 * referenceTime / len(largeRuns),
+                                                                                          1000 * scanTime / len(largeRuns)))
+
+    return 0 if identical else 1
+
+if __name__ == '__main__':
+    sys.exit(main())
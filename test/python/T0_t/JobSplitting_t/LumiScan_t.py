@@ -0,0 +1,227 @@
+#!/usr/bin/env python
+"""
+_LumiScan_t_
+
+Testing the lumi scan of the Repack and RepackMerge splitters
+against the loop over every lumi of the run it replaces
+
+"""
+import unittest
+import random
+
+from T0.JobSplitting.LumiScan import scanLumis, LUMI_DATA, LUMI_USED, LUMI_HOLE
+from T0.DataStructs.LumiSet import LumiSet
+
+
+def referenceScanLumis(availableLumis, usedLumis):
+    """
+    _referenceScanLumis_
+
+    Classification of every lumi as done by the
+    splitters before the lumi scan was introduced
+
+    """
+    maxUsedLumi = max(usedLumis) if usedLumis else 0
+    for lumi in range(1, 1+max(maxUsedLumi, max(availableLumis))):
+        if lumi in availableLumis:
+            yield (lumi, LUMI_DATA)
+        elif lumi in usedLumis:
+            yield (lumi, LUMI_USED)
+        else:
+            yield (lumi, LUMI_HOLE)
+
+
+def runSplitterLoop(lumiScan, availableFileLumiDict, insertTimes, maxLatency, filesetOpen):
+    """
+    _runSplitterLoop_
+
+    The lumi loop of the Repack and RepackMerge splitters, returns
+    the (lumis, forceClose) of every defineJobs call it makes
+
+    """
+    jobs = []
+
+    def getDataAge(filesByLumi):
+        return 1000 - max([ 0 ] + [ insertTimes[lumi] for lumi in filesByLumi ])
+
+    def defineJobs(filesByLumi, forceClose):
+        jobs.append((sorted(filesByLumi.keys()), forceClose))
+
+    haveLumiHole = False
+    filesByLumi = {}
+    for lumi, lumiType in lumiScan:
+
+        if lumiType == LUMI_DATA:
+
+            filesByLumi[lumi] = availableFileLumiDict[lumi]
+
+        elif lumiType == LUMI_USED:
+
+            if len(filesByLumi) > 0:
+
+                if haveLumiHole:
+                    if getDataAge(filesByLumi) > maxLatency:
+                        defineJobs(filesByLumi, True)
+                        filesByLumi = {}
+                    else:
+                        filesByLumi = {}
+                else:
+                    defineJobs(filesByLumi, True)
+                    filesByLumi = {}
+
+            haveLumiHole = False
+
+        else:
+
+            if len(filesByLumi) > 0:
+
+                if getDataAge(filesByLumi) > maxLatency:
+                    defineJobs(filesByLumi, True)
+                    filesByLumi = {}
+                elif not haveLumiHole:
+                    defineJobs(filesByLumi, False)
+                    filesByLumi = {}
+                else:
+                    filesByLumi = {}
+
+            haveLumiHole = True
+
+    if haveLumiHole:
+        if getDataAge(filesByLumi) > maxLatency:
+            defineJobs(filesByLumi, True)
+    else:
+        defineJobs(filesByLumi, not filesetOpen)
+
+    return jobs
+
+
+class LumiScanTest(unittest.TestCase):
+    """
+    _LumiScanTest_
+
+    Testing the lumi scan of the Repack and RepackMerge splitters
+    """
+
+    def setUp(self):
+        """
+        _setUp_
+
+        Synthetic runs with up to 50k lumis, data in a few
+        lumis only, a long used range and scattered used
+        lumis, empty lumis and holes
+
+        """
+        random.seed(4321)
+
+        self.runs = []
+
+        # small runs covering all lumi patterns
+        for i in range(500):
+            maxLumi = random.randint(1, 30)
+            self.runs.append(self.makeRun(maxLumi, random.random(), random.random()))
+
+        # large sparse runs
+        for i in range(20):
+            self.runs.append(self.makeRun(50000, 0.002, random.choice([ 0.5, 0.9, 0.999 ])))
+
+        return
+
+    def makeRun(self, maxLumi, dataFraction, usedFraction):
+        """
+        _makeRun_
+
+        """
+        availableFileLumiDict = {}
+        insertTimes = {}
+        usedLumis = set()
+        for lumi in range(1, maxLumi+1):
+            if random.random() < dataFraction:
+                availableFileLumiDict[lumi] = [ "streamer_%d" % lumi ]
+                insertTimes[lumi] = random.randint(0, 1000)
+            elif random.random() < usedFraction:
+                usedLumis.add(lumi)
+
+        if len(availableFileLumiDict) == 0:
+            lumi = random.randint(1, maxLumi)
+            usedLumis.discard(lumi)
+            availableFileLumiDict[lumi] = [ "streamer_%d" % lumi ]
+            insertTimes[lumi] = random.randint(0, 1000)
+
+        # some data in lumis that are also used
+        for lumi in random.sample(sorted(availableFileLumiDict.keys()), len(availableFileLumiDict) // 10):
+            usedLumis.add(lumi)
+
+        return (availableFileLumiDict, insertTimes, usedLumis)
+
+    def test00(self):
+        """
+        _test00_
+
+        Test that the lumi scan results in the same jobs
+
+        """
+        for availableFileLumiDict, insertTimes, usedLumis in self.runs:
+            for maxLatency in [ 0, 500, 1000 ]:
+                for filesetOpen in [ True, False ]:
+
+                    referenceJobs = runSplitterLoop(referenceScanLumis(availableFileLumiDict, usedLumis),
+                                                    availableFileLumiDict, insertTimes,
+                                                    maxLatency, filesetOpen)
+
+                    jobs = runSplitterLoop(scanLumis(availableFileLumiDict.keys(), usedLumis),
+                                           availableFileLumiDict, insertTimes,
+                                           maxLatency, filesetOpen)
+
+                    self.assertEqual(jobs, referenceJobs,
+                                     "ERROR: lumi scan results in different jobs")
+
+                    lumiSet = LumiSet(usedLumis)
+                    jobs = runSplitterLoop(scanLumis(availableFileLumiDict.keys(), lumiSet, lumiSet.max() or 0),
+                                           availableFileLumiDict, insertTimes,
+                                           maxLatency, filesetOpen)
+
+                    self.assertEqual(jobs, referenceJobs,
+                                     "ERROR: lumi scan over lumi set results in different jobs")
+
+        return
+
+    def test01(self):
+        """
+        _test01_
+
+        Test that starting the lumi scan behind the lumi cursor,
+        with only the used lumis above it, results in the same jobs
+
+        """
+        runsWithCursor = 0
+        for availableFileLumiDict, insertTimes, usedLumis in self.runs:
+
+            lumiCursor = min(LumiSet(usedLumis).contiguousEnd(1),
+                             min(availableFileLumiDict.keys()) - 1)
+            if lumiCursor > 0:
+                runsWithCursor += 1
+
+            lumiSet = LumiSet([ x for x in usedLumis if x > lumiCursor ])
+
+            for maxLatency in [ 0, 500, 1000 ]:
+                for filesetOpen in [ True, False ]:
+
+                    referenceJobs = runSplitterLoop(referenceScanLumis(availableFileLumiDict, usedLumis),
+                                                    availableFileLumiDict, insertTimes,
+                                                    maxLatency, filesetOpen)
+
+                    jobs = runSplitterLoop(scanLumis(availableFileLumiDict.keys(), lumiSet,
+                                                     lumiSet.max() or 0, lumiCursor + 1),
+                                           availableFileLumiDict, insertTimes,
+                                           maxLatency, filesetOpen)
+
+                    self.assertEqual(jobs, referenceJobs,
+                                     "ERROR: lumi scan behind lumi cursor results in different jobs")
+
+        self.assertTrue(runsWithCursor > 0,
+                        "ERROR: no run with a lumi cursor tested")
+
+        return
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,63 @@
+#!/usr/bin/env python
+"""
+_RunDependentParameterBenchmark_
+
+Benchmark the plain dictionary lookup of era/run dependent
+parameters against the precompiled parameters
+
+Standalone script, not part of the unit tests. Checks that
+both resolve to the same values, but never fails on timing.
+
+"""
+from __future__ import print_function
+import sys
+import time
+
+from RunDependentParameter_t import RunDependentParameterTest, referenceExtractConfigParameter
+
+from T0.RunConfig.Tier0Config import RunDependentParameter
+from T0.RunConfig.RunConfigAPI import extractConfigParameter
+
+
+def main():
+    """
+    _main_
+
+    Each parameter is resolved for the same (era, run) several
+    times like for the streams and datasets of a run
+
+    """
+    test = RunDependentParameterTest("test00")
+    test.setUp()
+
+    compiledParameters = [ RunDependentParameter(x) for x in test.parameters ]
+
+    startTime = time.time()
+    referenceValues = []
+    for era, run in test.lookups:
+        for i in range(5):
+            for parameter in test.parameters:
+                referenceValues.append(referenceExtractConfigParameter(parameter, era, run))
+    referenceTime = time.time() - startTime
+
+    startTime = time.time()
+    values = []
+    for era, run in test.lookups:
+        for i in range(5):
+            for parameter in compiledParameters:
+                values.append(extractConfigParameter(parameter, era, run))
+    compiledTime = time.time() - startTime
+
+    identical = (values == referenceValues)
+    if not identical:
+        print("ERROR: precompiled parameters resolve to different values")
+
+    lookups = len(values)
+    print("%d lookups : dictionary %.3f us, precompiled %.3f us per lookup" % (lookups,
+                                                                              1000000 * referenceTime / lookups,
+                                                                              1000000 * compiledTime / lookups))
+
+    return 0 if identical else 1
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,116 @@
+#!/usr/bin/env python
+"""
+_RunDependentParameter_t_
+
+Testing the precompiled era/run dependent parameters
+against the plain dictionary lookup
+
+"""
+import unittest
+import random
+import copy
+import pickle
+
+from T0.RunConfig.Tier0Config import RunDependentParameter
+from T0.RunConfig.RunConfigAPI import extractConfigParameter
+
+
+def referenceExtractConfigParameter(configParameter, era, run):
+    """
+    _referenceExtractConfigParameter_
+
+    extractConfigParameter before precompiled parameters
+
+    """
+    if isinstance(configParameter, dict):
+        if 'acqEra' in configParameter and era in configParameter['acqEra']:
+            return configParameter['acqEra'][era]
+        elif 'maxRun' in configParameter:
+            newConfigParameter = None
+            for maxRun in sorted(configParameter['maxRun'].keys()):
+                if run <= maxRun:
+                    newConfigParameter = configParameter['maxRun'][maxRun]
+            if newConfigParameter:
+                return newConfigParameter
+        return configParameter['default']
+    else:
+        return configParameter
+
+
+class RunDependentParameterTest(unittest.TestCase):
+    """
+    _RunDependentParameterTest_
+
+    Testing the precompiled era/run dependent parameters
+    """
+
+    def setUp(self):
+        """
+        _setUp_
+
+        """
+        random.seed(1234)
+
+        self.eras = [ "Run2016A", "Run2016B", "Run2016C", "Run2016D" ]
+
+        self.parameters = []
+        self.parameters.append( { 'default' : "GT_default" } )
+        self.parameters.append( { 'default' : 1, 'maxRun' : {} } )
+        self.parameters.append( { 'default' : 1, 'maxRun' : { 270000 : 0 } } )
+        self.parameters.append( { 'default' : "GT_default",
+                                  'acqEra' : { 'Run2016B' : "GT_B" } } )
+        for i in range(20):
+            parameter = { 'default' : "GT_default_%d" % i,
+                          'acqEra' : {},
+                          'maxRun' : {} }
+            for era in random.sample(self.eras, random.randint(0, 2)):
+                parameter['acqEra'][era] = "GT_%s_%d" % (era, i)
+            for j in range(random.randint(0, 50)):
+                parameter['maxRun'][random.randint(260000, 290000)] = "GT_%d_%d" % (i, j)
+            self.parameters.append(parameter)
+
+        self.lookups = []
+        for i in range(10000):
+            self.lookups.append((random.choice(self.eras), random.randint(255000, 295000)))
+
+        return
+
+    def test00(self):
+        """
+        _test00_
+
+        Test that precompiled parameters resolve like the plain dictionaries
+
+        """
+        for parameter in self.parameters:
+            compiled = RunDependentParameter(parameter)
+            self.assertEqual(compiled, parameter,
+                             "ERROR: precompiled parameter differs from dictionary")
+            self.assertTrue(copy.deepcopy(compiled) is compiled,
+                            "ERROR: precompiled parameter is copied")
+            self.assertEqual(pickle.loads(pickle.dumps(compiled, 2)), parameter,
+                             "ERROR: precompiled parameter changed by pickling")
+
+            for modify in [ lambda x: x.__setitem__('default', "GT_other"),
+                            lambda x: x.update( { 'default' : "GT_other" } ),
+                            lambda x: x.pop('default'),
+                            lambda x: x.setdefault('acqEra', {}),
+                            lambda x: x.clear() ]:
+                self.assertRaises(TypeError, modify, compiled)
+
+            for name in [ 'acqEra', 'maxRun' ]:
+                if name in compiled:
+                    self.assertRaises(TypeError, compiled[name].__setitem__, 'Run2016A', "GT_other")
+
+            self.assertEqual(compiled, parameter,
+                             "ERROR: precompiled parameter was modified")
+
+            for era, run in self.lookups[:1000] + self.lookups[:1000]:
+                self.assertEqual(extractConfigParameter(compiled, era, run),
+                                 referenceExtractConfigParameter(parameter, era, run),
+                                 "ERROR: wrong value for era %s and run %d" % (era, run))
+
+        return
+
+if __name__ == '__main__':
+    unittest.main()
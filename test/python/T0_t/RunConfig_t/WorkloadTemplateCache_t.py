@@ -0,0 +1,259 @@
+#!/usr/bin/env python
+"""
+_WorkloadTemplateCache_t_
+
+Testing workloads stamped out from cached templates
+against workloads built by the spec factory
+
+"""
+import unittest
+
+from T0.RunConfig.WorkloadTemplateCache import WorkloadTemplateCache
+from T0.RunConfig.WorkloadTemplateCache import makeSubstitution
+from T0.RunConfig.WorkloadTemplateCache import getSentinelRun
+
+
+class FakeSection(object):
+    """
+    _FakeSection_
+
+    Section of the test workload
+
+    """
+    pass
+
+
+class FakeWorkload(object):
+    """
+    _FakeWorkload_
+
+    Workload with values derived from the run number the
+    same ways the Repack, Express and PromptReco specs do
+
+    """
+    def __init__(self, workflowName, arguments):
+
+        run = arguments['RunNumber']
+        runString = str(run).zfill(9)
+        runDirectory = "/%s/%s/%s" % (runString[0:3], runString[3:6], runString[6:9])
+
+        self.workflowName = workflowName
+        self.runNumber = run
+        self.globalTagTransaction = arguments['GlobalTagTransaction']
+
+        self.task = FakeSection()
+        self.task.splitArgs = { 'runNumber' : run,
+                                'maxInputEvents' : 999 }
+        self.task.runWhitelist = [ run ]
+        self.task.outputModules = {}
+        for dataset in arguments['Datasets']:
+            outputModule = FakeSection()
+            outputModule.lfnBase = "%s/%s/RAW/v1%s" % (arguments['UnmergedLFNBase'], dataset, runDirectory)
+            outputModule.mergedLFNBase = "%s/%s/RAW/v1%s" % (arguments['MergedLFNBase'], dataset, runDirectory)
+            self.task.outputModules["write_%s_RAW" % dataset] = outputModule
+        self.task.steps = [ FakeSection(), FakeSection() ]
+        self.task.steps[0].lumis = set([ (run, 1), (run, 2) ])
+        self.task.steps[1].parent = self.task
+
+        return
+
+    def name(self):
+        return self.workflowName
+
+
+class FakeWorkloadFactory(object):
+    """
+    _FakeWorkloadFactory_
+
+    """
+    def factoryWorkloadConstruction(self, workflowName, arguments):
+        return FakeWorkload(workflowName, arguments)
+
+
+def makeArguments(run):
+    """
+    _makeArguments_
+
+    """
+    return { 'RunNumber' : run,
+             'GlobalTagTransaction' : "Express_%d" % run,
+             'UnmergedLFNBase' : "/store/unmerged/data",
+             'MergedLFNBase' : "/store/data",
+             'Datasets' : [ "MinimumBias", "ZeroBias" ] }
+
+
+class WorkloadTemplateCacheTest(unittest.TestCase):
+    """
+    _WorkloadTemplateCacheTest_
+
+    Testing workloads stamped out from cached templates
+    """
+
+    def assertSameWorkload(self, stamped, built, path = "workload", visited = None):
+        """
+        _assertSameWorkload_
+
+        Compare two workloads field by field
+
+        """
+        if visited == None:
+            visited = set()
+        if id(stamped) in visited:
+            return
+        visited.add(id(stamped))
+
+        if isinstance(stamped, dict):
+            self.assertEqual(set(stamped.keys()), set(built.keys()),
+                             "ERROR: different keys for %s" % path)
+            for key in stamped.keys():
+                self.assertSameWorkload(stamped[key], built[key], "%s[%r]" % (path, key), visited)
+        elif isinstance(stamped, (list, tuple)):
+            self.assertEqual(len(stamped), len(built),
+                             "ERROR: different length for %s" % path)
+            for i in range(len(stamped)):
+                self.assertSameWorkload(stamped[i], built[i], "%s[%d]" % (path, i), visited)
+        elif hasattr(stamped, "__dict__") and not isinstance(stamped, type):
+            self.assertEqual(type(stamped), type(built),
+                             "ERROR: different type for %s" % path)
+            self.assertSameWorkload(stamped.__dict__, built.__dict__, path, visited)
+        else:
+            self.assertEqual(stamped, built,
+                             "ERROR: different value for %s" % path)
+
+        return
+
+    def test00(self):
+        """
+        _test00_
+
+        Test the substitution of the run number in all its forms
+
+        """
+        substitute = makeSubstitution(176161, getSentinelRun(176161))
+
+        self.assertEqual(substitute( { 176161 : [ "Run176161", "/store/data/000/176/161/A" ],
+                                       'run' : 176161,
+                                       'other' : 176162,
+                                       'set' : set([ (176161, 1) ]) } ),
+                         { 999999 : [ "Run999999", "/store/data/000/999/999/A" ],
+                           'run' : 999999,
+                           'other' : 176162,
+                           'set' : set([ (999999, 1) ]) },
+                         "ERROR: wrong substitution")
+
+        self.assertEqual(substitute(True), True,
+                         "ERROR: boolean substituted")
+
+        return
+
+    def test01(self):
+        """
+        _test01_
+
+        Test that workloads stamped out from a template are
+        the same as workloads built by the spec factory
+
+        """
+        templateCache = WorkloadTemplateCache(size = 10)
+
+        for run in [ 176161, 176162, 180000, 176161, 1000000 ]:
+
+            workflowName = "Repack_Run%d_StreamA" % run
+
+            stamped = templateCache.getWorkload(FakeWorkloadFactory, workflowName,
+                                                makeArguments(run), run)
+            built = FakeWorkloadFactory().factoryWorkloadConstruction(workflowName,
+                                                                      makeArguments(run))
+
+            self.assertSameWorkload(stamped, built)
+
+        self.assertEqual(templateCache.usage(), { 'templates' : 2,
+                                                  'hits' : 3,
+                                                  'misses' : 2,
+                                                  'fallbacks' : 0 },
+                         "ERROR: workloads not stamped out from templates")
+
+        return
+
+    def test02(self):
+        """
+        _test02_
+
+        Test that Repack and Express workloads stamped out from
+        a template are the same as workloads built by their factory
+
+        """
+        from T0.WMSpec.StdSpecs.Repack import RepackWorkloadFactory
+        from T0.WMSpec.StdSpecs.Express import ExpressWorkloadFactory
+
+        def makeRepackArguments(run):
+            return { 'RunNumber' : run,
+                     'AcquisitionEra' : "Run2016B",
+                     'CMSSWVersion' : "CMSSW_8_0_8",
+                     'ScramArch' : "slc6_amd64_gcc530",
+                     'ProcessingVersion' : 1,
+                     'Memory' : 1000,
+                     'BlockCloseDelay' : 1200,
+                     'UnmergedLFNBase' : "/store/unmerged/data",
+                     'MergedLFNBase' : "/store/data",
+                     'Outputs' : [ { 'dataTier' : "RAW",
+                                     'eventContent' : "ALL",
+                                     'selectEvents' : [ "HLT_ZeroBias_v1" ],
+                                     'primaryDataset' : "ZeroBias" } ],
+                     'ValidStatus' : "VALID",
+                     'SiteWhitelist' : [ "T2_CH_CERN" ],
+                     'SiteBlacklist' : [] }
+
+        def makeExpressArguments(run):
+            return { 'RunNumber' : run,
+                     'AcquisitionEra' : "Run2016B",
+                     'CMSSWVersion' : "CMSSW_8_0_8",
+                     'ScramArch' : "slc6_amd64_gcc530",
+                     'RecoCMSSWVersion' : None,
+                     'RecoScramArch' : None,
+                     'ProcessingString' : "Express",
+                     'ProcessingVersion' : 1,
+                     'Scenario' : "pp",
+                     'Memory' : 2900,
+                     'GlobalTag' : "80X_dataRun2_Express_v6",
+                     'GlobalTagTransaction' : "Express_%d" % run,
+                     'StreamName' : "Express",
+                     'SpecialDataset' : "StreamExpress",
+                     'AlcaHarvestTimeout' : 12 * 3600,
+                     'AlcaHarvestDir' : None,
+                     'AlcaSkims' : [ "SiStripCalZeroBias" ],
+                     'DQMSequences' : [ "@common" ],
+                     'BlockCloseDelay' : 1200,
+                     'UnmergedLFNBase' : "/store/unmerged/express",
+                     'MergedLFNBase' : "/store/express",
+                     'Outputs' : [ { 'dataTier' : "FEVT",
+                                     'eventContent' : "FEVT",
+                                     'selectEvents' : [ "HLT_ZeroBias_v1" ],
+                                     'primaryDataset' : "StreamExpress" } ],
+                     'ValidStatus' : "VALID",
+                     'SiteWhitelist' : [ "T2_CH_CERN" ],
+                     'SiteBlacklist' : [] }
+
+        for factoryClass, makeSpecArguments, workflowPrefix in [ (RepackWorkloadFactory, makeRepackArguments, "Repack"),
+                                                                 (ExpressWorkloadFactory, makeExpressArguments, "Express") ]:
+
+            templateCache = WorkloadTemplateCache(size = 10)
+
+            for run in [ 176161, 176162, 180000 ]:
+
+                workflowName = "%s_Run%d_StreamA" % (workflowPrefix, run)
+
+                stamped = templateCache.getWorkload(factoryClass, workflowName,
+                                                    makeSpecArguments(run), run)
+                built = factoryClass().factoryWorkloadConstruction(workflowName,
+                                                                   makeSpecArguments(run))
+
+                self.assertSameWorkload(stamped, built)
+
+            self.assertEqual(templateCache.usage()['hits'], 2,
+                             "ERROR: workloads not stamped out from templates")
+
+        return
+
+if __name__ == '__main__':
+    unittest.main()
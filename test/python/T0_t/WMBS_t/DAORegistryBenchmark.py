@@ -0,0 +1,67 @@
+#!/usr/bin/env python
+"""
+_DAORegistryBenchmark_
+
+Benchmark the per cycle DAO setup overhead, comparing
+a new DAOFactory and DAO per call to the DAO registry
+
+Standalone script, not part of the unit tests. Needs the
+same database setup as the unit tests, never fails on timing.
+
+"""
+from __future__ import print_function
+import sys
+import threading
+import logging
+import time
+
+from WMCore.DAOFactory import DAOFactory
+
+from DAORegistry_t import DAORegistryTest
+
+from T0.WMBS.DAORegistry import getDAOFactory
+
+
+def main():
+    """
+    _main_
+
+    """
+    test = DAORegistryTest("test00")
+    test.setUp()
+
+    try:
+
+        myThread = threading.currentThread()
+
+        cycles = 100
+
+        startTime = time.time()
+        for i in range(cycles):
+            for classname in test.classnames:
+                daoFactory = DAOFactory(package = "T0.WMBS",
+                                        logger = logging,
+                                        dbinterface = myThread.dbi)
+                daoFactory(classname = classname)
+        factoryTime = (time.time() - startTime) / cycles
+
+        startTime = time.time()
+        for i in range(cycles):
+            for classname in test.classnames:
+                daoFactory = getDAOFactory(package = "T0.WMBS",
+                                           logger = logging,
+                                           dbinterface = myThread.dbi)
+                daoFactory(classname = classname)
+        registryTime = (time.time() - startTime) / cycles
+
+        print("DAO setup per cycle (%d DAOs) : DAOFactory %.3f ms, registry %.3f ms" % (len(test.classnames),
+                                                                                        1000 * factoryTime,
+                                                                                        1000 * registryTime))
+
+    finally:
+        test.tearDown()
+
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
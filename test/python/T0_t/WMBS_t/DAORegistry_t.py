@@ -0,0 +1,120 @@
+#!/usr/bin/env python
+"""
+_DAORegistry_t_
+
+Testing the DAO registry against DAOFactory
+
+"""
+import unittest
+import threading
+import logging
+
+from WMQuality.TestInit import TestInit
+from WMCore.DAOFactory import DAOFactory
+
+from T0.WMBS.DAORegistry import getDAOFactory
+
+
+class DAORegistryTest(unittest.TestCase):
+    """
+    _DAORegistryTest_
+
+    Testing the DAO registry
+    """
+
+    def setUp(self):
+        """
+        _setUp_
+
+        """
+        self.testInit = TestInit(__file__)
+        self.testInit.setLogging()
+        self.testInit.setDatabaseConnection()
+
+        # DAOs used by the Tier0Feeder streamer path and RunConfig in one cycle
+        self.classnames = [ "Tier0Feeder.FindNewRuns",
+                            "Tier0Feeder.FindNewRunStreams",
+                            "Tier0Feeder.FeedStreamers",
+                            "Tier0Feeder.MarkWorkflowsInjected",
+                            "RunConfig.GetRunInfo",
+                            "RunConfig.GetPhEDExConfig",
+                            "RunConfig.GetStreamOnlineVersion",
+                            "RunConfig.GetStreamDatasetTriggers",
+                            "RunLumiCloseout.FindHighContLumi",
+                            "RunLumiCloseout.InsertClosedLumi",
+                            "RunLumiCloseout.FinalCloseLumi",
+                            "RunLumiCloseout.CloseRunStreamFilesets",
+                            "RunLumiCloseout.CheckActiveSplitLumis",
+                            "SMNotification.GetFinishedStreamers",
+                            "SMNotification.MarkStreamersFinished" ]
+
+        return
+
+    def tearDown(self):
+        """
+        _tearDown_
+
+        """
+        self.testInit.clearDatabase()
+
+        return
+
+    def test00(self):
+        """
+        _test00_
+
+        Test that factories and DAOs are shared per database interface
+
+        """
+        myThread = threading.currentThread()
+
+        daoFactory = getDAOFactory(package = "T0.WMBS",
+                                   logger = logging,
+                                   dbinterface = myThread.dbi)
+
+        self.assertTrue(daoFactory is getDAOFactory(package = "T0.WMBS",
+                                                    logger = logging,
+                                                    dbinterface = myThread.dbi),
+                        "ERROR: DAO factory not shared")
+
+        dao = daoFactory(classname = "RunConfig.GetRunInfo")
+        self.assertTrue(dao is daoFactory(classname = "RunConfig.GetRunInfo"),
+                        "ERROR: DAO not shared")
+        self.assertTrue(dao.dbi is myThread.dbi,
+                        "ERROR: DAO uses wrong database interface")
+
+        self.assertFalse(daoFactory is getDAOFactory(package = "WMCore.WMBS",
+                                                     logger = logging,
+                                                     dbinterface = myThread.dbi),
+                         "ERROR: DAO factory shared between packages")
+
+        return
+
+    def test01(self):
+        """
+        _test01_
+
+        Test that the registry returns the same DAOs as DAOFactory
+
+        """
+        myThread = threading.currentThread()
+
+        daoFactory = DAOFactory(package = "T0.WMBS",
+                                logger = logging,
+                                dbinterface = myThread.dbi)
+
+        for classname in self.classnames:
+
+            dao = getDAOFactory(package = "T0.WMBS",
+                                logger = logging,
+                                dbinterface = myThread.dbi)(classname = classname)
+
+            self.assertEqual(type(dao), type(daoFactory(classname = classname)),
+                             "ERROR: registry returns wrong DAO for %s" % classname)
+            self.assertTrue(dao.dbi is myThread.dbi,
+                            "ERROR: DAO uses wrong database interface")
+
+        return
+
+if __name__ == '__main__':
+    unittest.main()
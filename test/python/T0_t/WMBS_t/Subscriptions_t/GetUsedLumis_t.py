@@ -0,0 +1,233 @@
+#!/usr/bin/env python
+"""
+_GetUsedLumis_t_
+
+Regression test for the single query GetUsedLumis DAO
+
+"""
+
+import unittest
+import threading
+import logging
+import random
+import time
+
+from WMCore.WMBS.File import File
+from WMCore.WMBS.Fileset import Fileset
+from WMCore.WMBS.Subscription import Subscription
+from WMCore.WMBS.Workflow import Workflow
+from WMCore.DataStructs.Run import Run
+
+from WMCore.DAOFactory import DAOFactory
+from WMCore.Services.UUID import makeUUID
+from WMQuality.TestInit import TestInit
+
+
+def referenceGetUsedLumis(dbi, subscription, checkStageoutToMerged):
+    """
+    _referenceGetUsedLumis_
+
+    GetUsedLumis before it was a single query, one
+    query per file state plus one for merged output
+
+    """
+    lumiSet = set()
+
+    for table in [ "wmbs_sub_files_acquired", "wmbs_sub_files_complete", "wmbs_sub_files_failed" ]:
+
+        sql = """SELECT wmbs_file_runlumi_map.lumi AS lumi
+                 FROM %s
+                 INNER JOIN wmbs_file_runlumi_map ON
+                   wmbs_file_runlumi_map.fileid = %s.fileid
+                 WHERE %s.subscription = :subscription
+                 """ % (table, table, table)
+
+        results = dbi.processData(sql, { 'subscription' : subscription },
+                                  transaction = False)[0].fetchall()
+
+        for result in results:
+            lumiSet.add(result[0])
+
+    if checkStageoutToMerged:
+
+        sql = """SELECT wmbs_file_runlumi_map.lumi AS lumi
+                 FROM wmbs_fileset_files
+                 INNER JOIN wmbs_file_runlumi_map ON
+                   wmbs_file_runlumi_map.fileid = wmbs_fileset_files.fileid
+                 WHERE wmbs_fileset_files.fileset =
+                   ( SELECT output_fileset
+                     FROM wmbs_workflow_output
+                     WHERE workflow_id =
+                       ( SELECT workflow
+                         FROM wmbs_subscription
+                         WHERE id = :subscription )
+                     AND output_identifier = 'Merged' )
+                 """
+
+        results = dbi.processData(sql, { 'subscription' : subscription },
+                                  transaction = False)[0].fetchall()
+
+        for result in results:
+            lumiSet.add(result[0])
+
+    return lumiSet
+
+
+class GetUsedLumisTest(unittest.TestCase):
+    """
+    _GetUsedLumisTest_
+
+    Regression test for the single query GetUsedLumis DAO
+    """
+
+    def setUp(self):
+        """
+        _setUp_
+
+        """
+        self.testInit = TestInit(__file__)
+        self.testInit.setLogging()
+        self.testInit.setDatabaseConnection()
+
+        self.testInit.setSchema(customModules = ["T0.WMBS"])
+
+        myThread = threading.currentThread()
+
+        daoFactory = DAOFactory(package = "T0.WMBS",
+                                logger = logging,
+                                dbinterface = myThread.dbi)
+
+        wmbsDaoFactory = DAOFactory(package = "WMCore.WMBS",
+                                    logger = logging,
+                                    dbinterface = myThread.dbi)
+
+        myThread.dbi.processData("""INSERT INTO wmbs_location
+                                    (id, site_name, state)
+                                    VALUES (1, 'SomeSite', 1)
+                                    """, transaction = False)
+        myThread.dbi.processData("""INSERT INTO wmbs_location_pnns
+                                    (location, pnn)
+                                    VALUES (1, 'SomePNN')
+                                    """, transaction = False)
+
+        insertRunDAO = daoFactory(classname = "RunConfig.InsertRun")
+        insertRunDAO.execute(binds = { 'RUN' : 1,
+                                       'TIME' : int(time.time()),
+                                       'HLTKEY' : "someHLTKey" },
+                             transaction = False)
+
+        self.fileset1 = Fileset(name = "TestFileset1")
+        self.fileset2 = Fileset(name = "TestFileset2")
+        self.fileset1.create()
+        self.fileset2.create()
+
+        workflow1 = Workflow(spec = "spec.xml", owner = "hufnagel", name = "TestWorkflow1", task="Test")
+        workflow1.create()
+
+        self.subscription1  = Subscription(fileset = self.fileset1,
+                                           workflow = workflow1,
+                                           split_algo = "RepackMerge",
+                                           type = "RepackMerge")
+        self.subscription1.create()
+
+        myThread.dbi.processData("""INSERT INTO wmbs_workflow_output
+                                    (WORKFLOW_ID, OUTPUT_IDENTIFIER, OUTPUT_FILESET)
+                                    VALUES (%d, 'Merged', %d)
+                                    """ % (workflow1.id, self.fileset2.id),
+                                 transaction = False)
+
+        self.getUsedLumisDAO = daoFactory(classname = "Subscriptions.GetUsedLumis")
+        self.acquireFilesDAO = wmbsDaoFactory(classname = "Subscriptions.AcquireFiles")
+        self.completeFilesDAO = wmbsDaoFactory(classname = "Subscriptions.CompleteFiles")
+        self.failFilesDAO = wmbsDaoFactory(classname = "Subscriptions.FailFiles")
+
+        return
+
+    def tearDown(self):
+        """
+        _tearDown_
+
+        """
+        self.testInit.clearDatabase()
+
+        return
+
+    def checkUsedLumis(self):
+        """
+        _checkUsedLumis_
+
+        """
+        myThread = threading.currentThread()
+
+        for checkStageoutToMerged in [ False, True ]:
+
+            usedLumis = self.getUsedLumisDAO.execute(self.subscription1['id'], checkStageoutToMerged,
+                                                     transaction = False)
+
+            self.assertEqual(usedLumis, referenceGetUsedLumis(myThread.dbi, self.subscription1['id'],
+                                                              checkStageoutToMerged),
+                             "ERROR: used lumis differ from the per file state queries")
+
+        return
+
+    def test00(self):
+        """
+        _test00_
+
+        Test used lumis without any used files
+
+        """
+        self.checkUsedLumis()
+
+        usedLumis = self.getUsedLumisDAO.execute(self.subscription1['id'], True,
+                                                 transaction = False)
+
+        self.assertEqual(len(usedLumis), 0,
+                         "ERROR: there should be no used lumis")
+
+        return
+
+    def test01(self):
+        """
+        _test01_
+
+        Test used lumis for acquired, complete, failed and merged
+        files with overlapping, repeated and multi lumi files
+
+        """
+        random.seed(1357)
+
+        for i in range(200):
+            lumis = sorted(random.sample(range(1, 300), random.randint(1, 3)))
+            newFile = File(makeUUID(), size = 1000, events = 100)
+            newFile.addRun(Run(1, *lumis))
+            newFile.setLocation("SomePNN", immediateSave = False)
+            newFile.create()
+            if random.random() < 0.2:
+                self.fileset2.addFile(newFile)
+            else:
+                self.fileset1.addFile(newFile)
+        self.fileset1.commit()
+        self.fileset2.commit()
+
+        self.checkUsedLumis()
+
+        for fileid in self.fileset1.getFiles(type = 'id'):
+            state = random.choice([ "available", "acquired", "complete", "failed" ])
+            if state == "available":
+                continue
+            self.acquireFilesDAO.execute(self.subscription1['id'], fileid,
+                                         transaction = False)
+            if state == "complete":
+                self.completeFilesDAO.execute(self.subscription1['id'], fileid,
+                                              transaction = False)
+            elif state == "failed":
+                self.failFilesDAO.execute(self.subscription1['id'], fileid,
+                                          transaction = False)
+
+        self.checkUsedLumis()
+
+        return
+
+if __name__ == '__main__':
+    unittest.main()